@@ -0,0 +1,115 @@
+"""Update throughput as the concurrency limit grows, with per-chat ordering checked
+
+Usage: python -m benchmarks.bench_concurrency [--chats 200] [--per-chat 5]
+                                              [--limits 1,2,4,8,16,32] [--latency 0.02]
+
+Runs ReminderBot in polling mode against FakeBotAPI once per limit in
+--limits (CONCURRENT_UPDATES). Every chat sends --per-chat /timezone
+commands naming different zones, all queued at once. Each one writes to
+the database and replies through the fake API, which answers after
+--latency seconds like a real network round trip. Reports updates per
+second, and counts chats whose replies arrived out of order or whose
+stored timezone is not the last one they sent.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_concurrency_')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from config import Config
+from database.db_handler import DatabaseHandler
+from main import ReminderBot
+from benchmarks.fake_bot_api import FakeBotAPI, command_update
+
+Config.load()
+
+ZONES = ('Europe/Kyiv', 'Europe/Warsaw', 'America/New_York', 'Asia/Tokyo', 'Europe/London')
+
+
+async def run(limit: int, args: argparse.Namespace) -> Dict[str, Any]:
+    fake = FakeBotAPI(latency=args.latency)
+    await fake.start()
+    Config.BOT_API_BASE_URL = f'http://127.0.0.1:{fake.port}'
+    Config.CONCURRENT_UPDATES = limit
+    bot = ReminderBot()
+    application = bot.application
+    await application.initialize()
+    await bot._post_init(application)
+    await application.updater.start_polling(
+        poll_interval=0, timeout=10, allowed_updates=bot.allowed_updates()
+    )
+    await application.start()
+
+    # Round-robin over chats, so each chat's updates are spread through the stream
+    chats = [500_000 + n for n in range(args.chats)]
+    sent_zones: Dict[int, List[str]] = defaultdict(list)
+    update_id = 0
+    for step in range(args.per_chat):
+        for n, chat_id in enumerate(chats):
+            zone = ZONES[(n + step) % len(ZONES)]
+            update_id += 1
+            sent_zones[chat_id].append(zone)
+            fake.updates.put_nowait(command_update(update_id, chat_id, f'/timezone {zone}'))
+    total = update_id
+
+    started = time.perf_counter()
+    deadline = time.monotonic() + 120
+    while len(fake.sent) < total and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    replied: Dict[int, List[str]] = defaultdict(list)
+    for _, chat_id, text in fake.sent:
+        replied[chat_id].append(text.rsplit(' ', 1)[-1])
+    out_of_order = sum(1 for chat_id in chats if replied[chat_id] != sent_zones[chat_id])
+    wrong_final = 0
+    async with DatabaseHandler() as db:
+        for chat_id in chats:
+            if await db.get_user_timezone(chat_id) != sent_zones[chat_id][-1]:
+                wrong_final += 1
+
+    await application.updater.stop()
+    await application.stop()
+    await bot._post_stop(application)
+    await application.shutdown()
+    await bot._post_shutdown(application)
+    await fake.stop()
+    return {
+        'handled': len(fake.sent),
+        'total': total,
+        'rate': len(fake.sent) / elapsed,
+        'out_of_order': out_of_order,
+        'wrong_final': wrong_final,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--per-chat', type=int, default=5)
+    parser.add_argument('--limits', default='1,2,4,8,16,32')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency, seconds')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.chats} chats x {args.per_chat} updates, fake API latency {args.latency * 1000:.0f} ms, "
+          f"max pending updates {Config.MAX_PENDING_UPDATES}")
+    baseline = None
+    for limit in (int(value) for value in args.limits.split(',')):
+        result = await run(limit, args)
+        baseline = baseline or result['rate']
+        print(f"  concurrency {limit:3}: {result['rate']:7.1f} updates/s ({result['rate'] / baseline:4.1f}x), "
+              f"handled {result['handled']}/{result['total']}, "
+              f"chats out of order {result['out_of_order']}, wrong final timezone {result['wrong_final']}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
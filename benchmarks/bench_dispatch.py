@@ -0,0 +1,156 @@
+"""Compare the heap dispatch engine with one JobQueue job per reminder
+
+Usage: python -m benchmarks.bench_dispatch [--count 100000] [--fire 2000]
+
+Reports memory per pending reminder, insert and cancel cost, and firing
+jitter (actual fire time minus scheduled time) for both approaches.
+The JobQueue baseline needs APScheduler, which the bot no longer
+depends on (pip install "python-telegram-bot[job-queue]"); without it
+only the engine is measured.
+"""
+import argparse
+import asyncio
+import gc
+import importlib.util
+import logging
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+
+from telegram.ext import Application
+from scheduler.dispatch_engine import DispatchEngine
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class EngineAdapter:
+    name = 'dispatch engine'
+
+    def __init__(self, on_fire: Callable[[int], None]):
+        async def on_due(batch):
+            for reminder_id, _ in batch:
+                on_fire(reminder_id)
+        self.engine = DispatchEngine(on_due, tick=1.0, max_batch=10000)
+
+    async def start(self) -> None:
+        self.engine.start()
+
+    async def stop(self) -> None:
+        await self.engine.stop()
+
+    def schedule(self, reminder_id: int, when: float) -> None:
+        self.engine.schedule(reminder_id, reminder_id, when)
+
+    def cancel(self, reminder_id: int) -> None:
+        self.engine.cancel(reminder_id)
+
+
+class JobQueueAdapter:
+    name = 'JobQueue run_once'
+
+    def __init__(self, on_fire: Callable[[int], None]):
+        self.application = Application.builder().token(os.environ['BOT_TOKEN']).build()
+        self.jobs: Dict[int, object] = {}
+
+        async def callback(context):
+            on_fire(context.job.data)
+        self.callback = callback
+
+    async def start(self) -> None:
+        await self.application.job_queue.start()
+
+    async def stop(self) -> None:
+        await self.application.job_queue.stop(wait=False)
+
+    def schedule(self, reminder_id: int, when: float) -> None:
+        self.jobs[reminder_id] = self.application.job_queue.run_once(
+            self.callback, when=max(0.0, when - time.time()), data=reminder_id
+        )
+
+    def cancel(self, reminder_id: int) -> None:
+        self.jobs.pop(reminder_id).schedule_removal()
+
+
+async def measure(adapter_cls, count: int, fire_count: int) -> Dict[str, float]:
+    fired: Dict[int, float] = {}
+    adapter = adapter_cls(lambda reminder_id: fired.setdefault(reminder_id, time.time()))
+    await adapter.start()
+
+    far_future = time.time() + 10 * 86400
+    ids = list(range(count))
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for reminder_id in ids:
+        adapter.schedule(reminder_id, far_future + reminder_id)
+    insert_time = time.perf_counter() - start
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    victims = random.sample(ids, count // 10)
+    start = time.perf_counter()
+    for reminder_id in victims:
+        adapter.cancel(reminder_id)
+    cancel_time = time.perf_counter() - start
+
+    # Firing jitter measured against the remaining background load
+    window = 2.0
+    origin = time.time() + 0.5
+    expected = {}
+    for n in range(fire_count):
+        reminder_id = count + n
+        expected[reminder_id] = origin + window * n / fire_count
+        adapter.schedule(reminder_id, expected[reminder_id])
+    await asyncio.sleep(0.5 + window + 1.5)
+    await adapter.stop()
+
+    jitter = [(fired[i] - when) * 1000 for i, when in expected.items() if i in fired]
+    return {
+        'bytes_per_reminder': (used - base) / count,
+        'insert_us': insert_time / count * 1e6,
+        'cancel_us': cancel_time / len(victims) * 1e6,
+        'fired': len(jitter),
+        'jitter_p50_ms': percentile(jitter, 50),
+        'jitter_p99_ms': percentile(jitter, 99),
+        'jitter_mean_ms': statistics.fmean(jitter) if jitter else 0.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100_000, help='pending reminders')
+    parser.add_argument('--fire', type=int, default=2000, help='reminders fired for jitter')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{args.count} pending reminders, {args.fire} fired over 2s")
+    adapters = [EngineAdapter]
+    if importlib.util.find_spec('apscheduler') is not None:
+        adapters.append(JobQueueAdapter)
+    else:
+        print("APScheduler is not installed, skipping the JobQueue baseline")
+    for adapter_cls in adapters:
+        result = await measure(adapter_cls, args.count, args.fire)
+        print(f"\n{adapter_cls.name}")
+        print(f"  memory per pending reminder: {result['bytes_per_reminder']:.0f} B")
+        print(f"  insert: {result['insert_us']:.2f} us   cancel: {result['cancel_us']:.2f} us")
+        print(
+            f"  jitter over {result['fired']}/{args.fire} fired: "
+            f"p50 {result['jitter_p50_ms']:.1f} ms, p99 {result['jitter_p99_ms']:.1f} ms, "
+            f"mean {result['jitter_mean_ms']:.1f} ms"
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""Cost and memory of inbound flood control
+
+Usage: python -m benchmarks.bench_flood [--users 1000000] [--updates 20000]
+
+Takes a token for each of --users distinct users from the bucket store
+bounded by the default FLOOD_TRACKED_USERS and from one keeping every
+user, reporting microseconds per take and the memory the buckets hold
+(tracemalloc). Then times FloodControl's whole check of --updates /new
+updates from distinct users, and runs them through
+Application.process_update to a no-op /new handler: without flood
+control, with it but no limit on /new, under the limit and from one
+flooding user whose updates are dropped. Variants alternate over several
+rounds and the best round of each is reported.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import time
+import tracemalloc
+from typing import List, Tuple
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+
+from telegram import Bot, Update
+from telegram.ext import Application, CommandHandler
+from config import Config
+from handlers.flood_control import FloodControl
+from benchmarks.fake_bot_api import FakeBotAPI, command_update
+
+Config.load()
+
+# Variants are measured interleaved this many times and the best kept
+ROUNDS = 5
+
+
+def updates(count: int, bot: Bot = None) -> List[Update]:
+    return [Update.de_json(command_update(n, n + 1, '/new'), bot) for n in range(count)]
+
+
+def bucket_store(tracked: int, users: int, measure_memory: bool) -> Tuple[float, int]:
+    """µs per token taken, or MiB held if measuring memory, and buckets kept"""
+    flood = FloodControl(Config.FLOOD_LIMITS, tracked)
+    interval, tolerance = flood._limits[flood._index['new']]
+    kinds = len(flood._limits)
+    take = flood.buckets.take
+    now = time.monotonic()
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+    started = time.perf_counter()
+    for user_id in range(1, users + 1):
+        take(user_id * kinds, interval, tolerance, now)
+    spent = time.perf_counter() - started
+    if measure_memory:
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return held / 1024 / 1024, len(flood.buckets)
+    return spent / users * 1_000_000, len(flood.buckets)
+
+
+def check(batch: List[Update]) -> float:
+    """µs per FloodControl.admit, each user seen for the first time"""
+    admit = FloodControl(Config.FLOOD_LIMITS, Config.FLOOD_TRACKED_USERS).admit
+    now = time.monotonic()
+    started = time.perf_counter()
+    for update in batch:
+        admit(update, now)
+    return (time.perf_counter() - started) / len(batch) * 1_000_000
+
+
+async def per_update(application: Application, batch: List[Update]) -> float:
+    process = application.process_update
+    started = time.perf_counter()
+    for update in batch:
+        await process(update)
+    return (time.perf_counter() - started) / len(batch) * 1_000_000
+
+
+async def dispatch(args: argparse.Namespace) -> None:
+    fake = FakeBotAPI()
+    await fake.start()
+    handled = 0
+
+    async def new_handler(update, context) -> None:
+        nonlocal handled
+        handled += 1
+
+    def build(flood: FloodControl = None) -> Application:
+        application = (
+            Application.builder().token(os.environ['BOT_TOKEN']).base_url(fake.base_url)
+            .updater(None).job_queue(None).build()
+        )
+        if flood is not None:
+            application.add_handler(flood, group=-1)
+        application.add_handler(CommandHandler('new', new_handler))
+        return application
+
+    # Every update comes from a different user; command handlers need the bot's name
+    bot = Bot(os.environ['BOT_TOKEN'], base_url=fake.base_url)
+    await bot.initialize()
+    spread = updates(args.updates, bot)
+    flooding = spread[:1] * args.updates
+    unlimited = dict(Config.FLOOD_LIMITS, new=(0.0, 1))
+    variants: List[tuple] = [
+        ('no flood control', lambda: build(), spread),
+        ('no limit on /new', lambda: build(FloodControl(unlimited, Config.FLOOD_TRACKED_USERS)), spread),
+        ('under the limit', lambda: build(FloodControl(Config.FLOOD_LIMITS, args.updates * 2)), spread),
+        ('flooding, dropped', lambda: build(FloodControl(Config.FLOOD_LIMITS, Config.FLOOD_TRACKED_USERS)), flooding),
+    ]
+    best = {name: float('inf') for name, _, _ in variants}
+    reached = {}
+    for _ in range(ROUNDS):
+        for name, factory, batch in variants:
+            application: Application = factory()
+            await application.initialize()
+            handled = 0
+            best[name] = min(best[name], await per_update(application, batch))
+            reached[name] = handled
+            await application.shutdown()
+    await bot.shutdown()
+    await fake.stop()
+    print(f"Application.process_update, {args.updates:,} updates, best of {ROUNDS} rounds:")
+    for name, _, _ in variants:
+        print(f"  {name:18} {best[name]:7.2f} µs per update, {reached[name]:,} reached the handler")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--updates', type=int, default=20_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"Bucket store, {args.users:,} distinct users taking a token each:")
+    for name, tracked in (
+        (f'FLOOD_TRACKED_USERS={Config.FLOOD_TRACKED_USERS:,}', Config.FLOOD_TRACKED_USERS),
+        ('every user kept', args.users * 2),
+    ):
+        cost = min(bucket_store(tracked, args.users, measure_memory=False)[0] for _ in range(ROUNDS))
+        held, kept = bucket_store(tracked, args.users, measure_memory=True)
+        print(f"  {name:28} {cost:.2f} µs per take, {kept:,} buckets in {held:.1f} MiB")
+    batch = updates(args.updates)
+    print(f"Whole check of a /new update: {min(check(batch) for _ in range(ROUNDS)):.2f} µs")
+    asyncio.run(dispatch(args))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
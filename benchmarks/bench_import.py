@@ -0,0 +1,122 @@
+"""Bulk /import and /export against adding reminders one by one
+
+Usage: python -m benchmarks.bench_import [--rows 10000] [--baseline-rows 500]
+
+Writes a CSV of --rows reminders (dates over the next 30 days, some
+delays and daily rules) and imports it through ReminderTransfer with the
+group-commit writer running, as /import does after the download, then
+exports it again. The same is repeated for five times as many rows with
+tracemalloc on, to show that peak memory does not grow with the file.
+The baseline stores --baseline-rows reminders the way the /new dialog
+does, one writer.add_reminder and scheduler.add per reminder.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Tuple
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_import_')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from telegram.ext import Application
+from config import Config
+from database.db_handler import DatabaseHandler, dispose_engine
+from database.writer import GroupCommitWriter
+from handlers.reminder_transfer import ReminderTransfer
+from scheduler.reminder_scheduler import ReminderScheduler
+from utils.time_parser import get_timezone
+
+Config.load()
+
+
+def write_csv(path: str, rows: int) -> None:
+    random.seed(rows)
+    # Local times are read in the user's timezone
+    now = datetime.now(get_timezone(Config.DEFAULT_TIMEZONE))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('time,text,recurrence\n')
+        for n in range(rows):
+            kind = n % 10
+            if kind == 0:
+                f.write(f',daily {n},щодня {n % 24}:{n % 60:02d}\n')
+            elif kind == 1:
+                f.write(f'{n % 48 + 1} годин,delay {n},\n')
+            else:
+                moment = now + timedelta(minutes=random.randrange(10, 30 * 24 * 60))
+                f.write(f'{moment:%d.%m.%Y %H:%M},reminder {n},\n')
+
+
+async def timed_import(transfer: ReminderTransfer, user_id: int, path: str) -> Tuple[float, int]:
+    started = time.perf_counter()
+    result = await transfer.import_file(user_id, path, 'csv', Config.DEFAULT_TIMEZONE)
+    return time.perf_counter() - started, result.imported
+
+
+async def timed_export(transfer: ReminderTransfer, user_id: int) -> Tuple[float, int]:
+    started = time.perf_counter()
+    count = await transfer.export(user_id, os.path.join(_tmpdir, f'export-{user_id}.csv'), 'csv', Config.DEFAULT_TIMEZONE)
+    return time.perf_counter() - started, count
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--baseline-rows', type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    await DatabaseHandler.init_db()
+    scheduler = ReminderScheduler(Application.builder().token(os.environ['BOT_TOKEN']).build())
+    # Only the window is registered, as in a running bot
+    scheduler._horizon = datetime.utcnow() + scheduler.window
+    writer = GroupCommitWriter()
+    writer.start()
+    transfer = ReminderTransfer(scheduler, writer)
+
+    small, large = os.path.join(_tmpdir, 'small.csv'), os.path.join(_tmpdir, 'large.csv')
+    write_csv(small, args.rows)
+    write_csv(large, args.rows * 5)
+
+    started = time.perf_counter()
+    for n in range(args.baseline_rows):
+        reminder = await writer.add_reminder(
+            user_id=1, text=f'one by one {n}', reminder_time=datetime.utcnow() + timedelta(hours=n % 48 + 1)
+        )
+        scheduler.add(reminder)
+    one_by_one = args.baseline_rows / (time.perf_counter() - started)
+    print(f"one by one (/new path): {one_by_one:,.0f} reminders/s")
+
+    seconds, imported = await timed_import(transfer, 2, small)
+    print(f"import  {imported:,} rows: {seconds:.2f} s, {imported / seconds:,.0f} rows/s "
+          f"({imported / seconds / one_by_one:.0f}x one by one)")
+    seconds, exported = await timed_export(transfer, 2)
+    print(f"export  {exported:,} rows: {seconds:.2f} s, {exported / seconds:,.0f} rows/s")
+
+    for user_id, path, rows in ((3, small, args.rows), (4, large, args.rows * 5)):
+        tracemalloc.start()
+        await timed_import(transfer, user_id, path)
+        imported_peak = tracemalloc.get_traced_memory()[1]
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await timed_export(transfer, user_id)
+        exported_peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        print(f"peak memory, {rows:,} rows: import {imported_peak / 1024 / 1024:.1f} MiB, "
+              f"export {exported_peak / 1024 / 1024:.1f} MiB")
+    print(f"scheduler registered {len(scheduler.engine):,} reminders due within the window")
+
+    await writer.stop()
+    await dispose_engine()
+    shutil.rmtree(_tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""/list and due-scan latency on a large history, before and after migrations
+
+Usage: python -m benchmarks.bench_indexes [--rows 10000000] [--users 100000]
+
+Builds a reminders table with the pre-index schema in a temporary SQLite
+file, fills it with mostly fired (inactive) history plus a small pending
+set, times the hot queries, upgrades it with DatabaseHandler.init_db()
+and times them again, printing the EXPLAIN QUERY PLAN of each phase.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_indexes_')
+DB_PATH = os.path.join(_tmpdir, 'bench.db')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from database.db_handler import DatabaseHandler, dispose_engine
+
+# Schema as created before indexes were declared on the model
+LEGACY_SCHEMA = """
+CREATE TABLE reminders (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    text VARCHAR NOT NULL,
+    reminder_time DATETIME NOT NULL,
+    is_active BOOLEAN,
+    created_at DATETIME
+)
+"""
+
+
+def seed(rows: int, users: int, pending_ratio: float) -> None:
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute(LEGACY_SCHEMA)
+    now = datetime.utcnow()
+    fmt = '%Y-%m-%d %H:%M:%S.%f'
+
+    def generate():
+        for n in range(rows):
+            active = random.random() < pending_ratio
+            offset = timedelta(minutes=random.randint(1, 60 * 24 * 30))
+            when = now + offset if active else now - offset * 12
+            yield (random.randint(1, users), f'reminder {n}', when.strftime(fmt), active, when.strftime(fmt))
+
+    conn.executemany(
+        'INSERT INTO reminders (user_id, text, reminder_time, is_active, created_at) VALUES (?, ?, ?, ?, ?)',
+        generate()
+    )
+    conn.commit()
+    conn.close()
+
+
+async def measure(users: int, samples: int) -> dict:
+    list_times = []
+    async with DatabaseHandler() as db:
+        for user_id in random.sample(range(1, users + 1), samples):
+            start = time.perf_counter()
+            await db.get_active_reminders(user_id)
+            list_times.append((time.perf_counter() - start) * 1000)
+        due_times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            await db.get_due_reminders(limit=1000)
+            due_times.append((time.perf_counter() - start) * 1000)
+    return {
+        'list_p50': statistics.median(list_times),
+        'list_max': max(list_times),
+        'due_p50': statistics.median(due_times),
+        'plans': await DatabaseHandler.explain_hot_paths(),
+    }
+
+
+def report(label: str, result: dict) -> None:
+    print(f"\n{label}")
+    print(f"  /list:    p50 {result['list_p50']:.2f} ms, max {result['list_max']:.2f} ms")
+    print(f"  due scan: p50 {result['due_p50']:.2f} ms")
+    for name, plan in result['plans'].items():
+        print(f"  plan {name}: {plan}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--pending', type=float, default=0.01, help='share of active rows')
+    parser.add_argument('--samples', type=int, default=50, help='/list calls per phase')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed(args.rows, args.users, args.pending)
+    print(f"Seeded {args.rows} rows for {args.users} users in {time.perf_counter() - start:.1f}s")
+
+    report('Before migration', await measure(args.users, args.samples))
+    start = time.perf_counter()
+    await DatabaseHandler.init_db()
+    print(f"\nMigration took {time.perf_counter() - start:.1f}s")
+    report('After migration', await measure(args.users, args.samples))
+    await dispose_engine()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""/list page latency for a light and a heavy user
+
+Usage: python -m benchmarks.bench_list [--heavy 50000] [--light 5]
+
+Seeds a temporary SQLite database with one user owning --heavy pending
+reminders and one owning --light, then times ReminderList.render for the
+first page, a page deep into the heavy user's list reached through its
+cursor, and a step back, both from the database and from the reminder
+cache, and prints the largest rendered message and the cache counters.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_list_')
+DB_PATH = os.path.join(_tmpdir, 'bench.db')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from database.cache import get_reminder_cache
+from database.db_handler import DatabaseHandler, dispose_engine
+from handlers.reminder_list import ReminderList, encode_cursor
+
+HEAVY_USER, LIGHT_USER = 1, 2
+
+
+async def seed(heavy: int, light: int) -> list:
+    await DatabaseHandler.init_db()
+    start = datetime.utcnow() + timedelta(hours=1)
+    rows = [(HEAVY_USER, start + timedelta(minutes=n)) for n in range(heavy)]
+    rows += [(LIGHT_USER, start + timedelta(minutes=n)) for n in range(light)]
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            'INSERT INTO reminders (user_id, text, reminder_time, is_active) VALUES (?, ?, ?, 1)',
+            [(user_id, f'reminder {n} ' * 20, when.strftime('%Y-%m-%d %H:%M:%S.%f'))
+             for n, (user_id, when) in enumerate(rows)]
+        )
+        conn.execute('ANALYZE')
+    return [when for user_id, when in rows if user_id == HEAVY_USER]
+
+
+async def timed(coro_factory, samples: int, cached: bool) -> tuple:
+    times = []
+    for _ in range(samples):
+        if not cached:
+            get_reminder_cache().clear()
+        start = time.perf_counter()
+        result = await coro_factory()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--heavy', type=int, default=50_000)
+    parser.add_argument('--light', type=int, default=5)
+    parser.add_argument('--samples', type=int, default=50)
+    args = parser.parse_args()
+
+    heavy_times = await seed(args.heavy, args.light)
+    view = ReminderList()
+    # Ids follow insertion order, so the heavy user's n-th reminder has id n + 1
+    middle = len(heavy_times) // 2
+    cursor = encode_cursor(heavy_times[middle], middle + 1)
+
+    print(f"/list with {args.heavy} vs {args.light} reminders, page size {view.page_size}")
+    longest = 0
+    for label, factory in (
+        ('light user, first page', lambda: view.render(LIGHT_USER)),
+        ('heavy user, first page', lambda: view.render(HEAVY_USER)),
+        (f'heavy user, page at #{middle}', lambda: view.render(HEAVY_USER, after=cursor)),
+        (f'heavy user, back from #{middle}', lambda: view.render(HEAVY_USER, before=cursor)),
+    ):
+        median, (text, _) = await timed(factory, args.samples, cached=False)
+        cached, _ = await timed(factory, args.samples, cached=True)
+        longest = max(longest, len(text))
+        print(f"  {label:32} {median:6.2f} ms, cached {cached:6.2f} ms")
+    print(f"  longest message: {longest} characters")
+    print(f"  cache: {get_reminder_cache().stats()}")
+    await dispose_engine()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
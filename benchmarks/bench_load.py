@@ -0,0 +1,284 @@
+"""End-to-end load test of the bot against a local fake Bot API
+
+Usage: python -m benchmarks.bench_load [--users 100] [--sessions 3] [--think 0]
+                                       [--fire-in 5] [--fire-spread 15]
+                                       [--json results.json] [--max-p99 MS]
+                                       [--min-rate N] [--max-lateness S]
+
+Starts FakeBotAPI in this process and the bot, unchanged, as a child
+process polling it (main.ReminderBot.run with BOT_API_BASE_URL pointing
+here). Each synthetic user runs --sessions times through /new, the
+reminder text, the "delay" button, a delay of a few seconds and /list,
+sending each update once the reply to the previous one arrived. Reports
+updates per second, reply latency per step, how late the reminders fired
+after the requested delay (counted from sending it), and the bot's peak
+RSS and CPU time.
+The --max-*/--min-* thresholds make it exit non-zero, so the run can
+gate performance changes.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import signal
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ.setdefault('LOAD_DB', os.path.join(tempfile.mkdtemp(prefix='bench_load_'), 'bench.db'))
+os.environ['DATABASE_URL'] = f"sqlite:///{os.environ['LOAD_DB']}"
+os.environ['RUN_MODE'] = 'polling'
+
+from benchmarks.fake_bot_api import BOT_USER, FakeBotAPI
+
+REMINDER_PREFIX = '🔔'
+ERROR_PREFIX = 'Вибачте'
+STEPS = ('new', 'text', 'time_type', 'delay', 'list')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run_worker() -> None:
+    """Child process: the bot exactly as `python main.py` runs it"""
+    from main import ReminderBot
+
+    # Per-request INFO logs from httpx would dominate the profile
+    logging.getLogger().setLevel(logging.WARNING)
+    ReminderBot().run()
+
+
+class LoadGenerator:
+    """Synthetic users talking to the bot through FakeBotAPI"""
+
+    def __init__(self, fake: FakeBotAPI, args: argparse.Namespace):
+        self.fake = fake
+        self.args = args
+        self._update_id = 0
+        self._replies: Dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.timeouts = 0
+        self.errors = 0
+        # Reminder text -> wall-clock time it was asked to fire at
+        self.expected: Dict[str, float] = {}
+        self.lateness: List[float] = []
+        fake.on_message = self._on_message
+
+    def _on_message(self, method: str, chat_id: int, message: Dict[str, Any]) -> None:
+        text = message['text']
+        if text.startswith(REMINDER_PREFIX):
+            # One reminder per message, or a numbered list when combined
+            for line in text.split('\n\n', 1)[1].split('\n'):
+                key = line.split('. ', 1)[-1]
+                if key in self.expected:
+                    self.lateness.append(time.time() - self.expected.pop(key))
+            return
+        if text.startswith(ERROR_PREFIX):
+            self.errors += 1
+        self._replies[chat_id].put_nowait(message)
+
+    def _next_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}
+
+    def _message(self, user_id: int, text: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        message = {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return {'update_id': update_id, 'message': message}
+
+    def _callback(self, user_id: int, reply: Dict[str, Any], data: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        return {'update_id': update_id, 'callback_query': {
+            'id': str(update_id),
+            'from': self._user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': reply['message_id'],
+                'date': reply['date'],
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': BOT_USER,
+                'text': reply['text'],
+            },
+        }}
+
+    async def _step(self, step: str, user_id: int, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send one update and wait for the bot's reply to it"""
+        started = time.perf_counter()
+        self.fake.updates.put_nowait(update)
+        try:
+            reply = await asyncio.wait_for(self._replies[user_id].get(), 30)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        self.latencies[step].append((time.perf_counter() - started) * 1000)
+        if self.args.think:
+            await asyncio.sleep(random.expovariate(1 / self.args.think))
+        return reply
+
+    async def user(self, user_id: int) -> None:
+        for session in range(self.args.sessions):
+            key = f'load-{user_id}-{session}'
+            delay = self.args.fire_in + random.randrange(self.args.fire_spread + 1)
+            if await self._step('new', user_id, self._message(user_id, '/new')) is None:
+                return
+            reply = await self._step('text', user_id, self._message(user_id, key))
+            if reply is None:
+                return
+            if await self._step('time_type', user_id, self._callback(user_id, reply, 'time_type:delay')) is None:
+                return
+            self.expected[key] = time.time() + delay
+            if await self._step('delay', user_id, self._message(user_id, f'{delay} сек')) is None:
+                return
+            await self._step('list', user_id, self._message(user_id, '/list'))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    fake = FakeBotAPI(latency=args.latency)
+    await fake.start()
+    load = LoadGenerator(fake, args)
+    log_path = os.path.join(os.path.dirname(os.environ['LOAD_DB']), 'bot.log')
+    with open(log_path, 'w') as log:
+        bot = await asyncio.create_subprocess_exec(
+            sys.executable, '-W', 'ignore', '-m', 'benchmarks.bench_load', '--worker',
+            env=dict(os.environ, BOT_API_BASE_URL=f'http://127.0.0.1:{fake.port}'),
+            stdout=log, stderr=log
+        )
+
+    # Ready once the bot polls for updates
+    deadline = time.monotonic() + 30
+    while not fake.calls['getUpdates']:
+        if bot.returncode is not None or time.monotonic() > deadline:
+            raise SystemExit(f"Bot did not start, see {log_path}")
+        await asyncio.sleep(0.05)
+
+    first_user = 300_000
+    started = time.perf_counter()
+    await asyncio.gather(*(load.user(first_user + n) for n in range(args.users)))
+    elapsed = time.perf_counter() - started
+    updates = sum(len(values) for values in load.latencies.values())
+
+    # Wait for the reminders still due
+    expected = len(load.expected) + len(load.lateness)
+    deadline = time.monotonic() + args.fire_in + args.fire_spread + 30
+    while load.expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+
+    bot.send_signal(signal.SIGTERM)
+    await bot.wait()
+    await fake.stop()
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    all_latencies = [value for values in load.latencies.values() for value in values]
+    return {
+        'users': args.users,
+        'sessions': args.sessions,
+        'updates': updates,
+        'elapsed_s': elapsed,
+        'updates_per_s': updates / elapsed,
+        'timeouts': load.timeouts,
+        'errors': load.errors,
+        'latency_ms': {
+            step: {
+                'p50': percentile(load.latencies[step], 50),
+                'p95': percentile(load.latencies[step], 95),
+                'p99': percentile(load.latencies[step], 99),
+            }
+            for step in STEPS
+        },
+        'p50_ms': percentile(all_latencies, 50),
+        'p99_ms': percentile(all_latencies, 99),
+        'reminders_expected': expected,
+        'reminders_fired': len(load.lateness),
+        'lateness_p50_s': percentile(load.lateness, 50),
+        'lateness_p99_s': percentile(load.lateness, 99),
+        'lateness_max_s': max(load.lateness, default=0.0),
+        # ru_maxrss is in KiB on Linux
+        'bot_peak_rss_mib': usage.ru_maxrss / 1024,
+        'bot_cpu_s': usage.ru_utime + usage.ru_stime,
+        'bot_exit_code': bot.returncode,
+    }
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(f"{result['users']} users x {result['sessions']} sessions: {result['updates']} updates "
+          f"in {result['elapsed_s']:.1f}s ({result['updates_per_s']:,.0f} updates/s), "
+          f"{result['timeouts']} timeouts, {result['errors']} errors")
+    for step, latency in result['latency_ms'].items():
+        print(f"  {step:10} p50 {latency['p50']:6.1f} ms, p95 {latency['p95']:6.1f} ms, "
+              f"p99 {latency['p99']:6.1f} ms")
+    print(f"  {'all':10} p50 {result['p50_ms']:6.1f} ms, p99 {result['p99_ms']:6.1f} ms")
+    print(f"reminders fired: {result['reminders_fired']}/{result['reminders_expected']}, "
+          f"late by p50 {result['lateness_p50_s']:.2f}s, p99 {result['lateness_p99_s']:.2f}s, "
+          f"max {result['lateness_max_s']:.2f}s")
+    print(f"bot process: peak RSS {result['bot_peak_rss_mib']:.0f} MiB, CPU {result['bot_cpu_s']:.1f}s, "
+          f"exit code {result['bot_exit_code']}")
+
+
+def failures(result: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    failed = []
+    if result['timeouts'] or result['errors']:
+        failed.append(f"{result['timeouts']} timeouts and {result['errors']} errors")
+    if result['reminders_fired'] < result['reminders_expected']:
+        failed.append(f"only {result['reminders_fired']}/{result['reminders_expected']} reminders fired")
+    if args.max_p99 is not None and result['p99_ms'] > args.max_p99:
+        failed.append(f"p99 {result['p99_ms']:.1f} ms above {args.max_p99} ms")
+    if args.min_rate is not None and result['updates_per_s'] < args.min_rate:
+        failed.append(f"{result['updates_per_s']:.0f} updates/s below {args.min_rate}")
+    if args.max_lateness is not None and result['lateness_max_s'] > args.max_lateness:
+        failed.append(f"reminders up to {result['lateness_max_s']:.2f}s late, limit {args.max_lateness}s")
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--sessions', type=int, default=3, help='reminders created per user')
+    parser.add_argument('--think', type=float, default=0.0, help='mean pause between a user\'s updates, seconds')
+    parser.add_argument('--fire-in', type=int, default=5, help='minimum reminder delay, seconds')
+    parser.add_argument('--fire-spread', type=int, default=15, help='random extra delay, seconds')
+    parser.add_argument('--latency', type=float, default=0.0, help='fake API latency, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--max-p99', type=float, help='fail above this reply p99, ms')
+    parser.add_argument('--min-rate', type=float, help='fail below this many updates/s')
+    parser.add_argument('--max-lateness', type=float, help='fail if a reminder fires this many seconds late')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+        return
+    random.seed(args.seed)
+    result = asyncio.run(run(args))
+    report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    failed = failures(result, args)
+    for reason in failed:
+        print(f"FAIL: {reason}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
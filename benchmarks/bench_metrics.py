@@ -0,0 +1,84 @@
+"""Overhead of the metrics instrumentation
+
+Usage: python -m benchmarks.bench_metrics [--calls 200000]
+
+Times a no-op coroutine called directly and through the `timed` wrapper
+that instruments handlers and DatabaseHandler, a cached /list render with
+DatabaseHandler instrumented and with its plain methods restored, and how
+long rendering the registry takes once every handler and operation has a
+series.
+"""
+import argparse
+import asyncio
+import inspect
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_metrics_')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from database.db_handler import DatabaseHandler, dispose_engine
+from handlers.reminder_list import ReminderList
+from utils.metrics import DB_ERRORS, DB_SECONDS, HANDLER_ERRORS, HANDLER_SECONDS, REGISTRY, timed
+
+
+async def noop() -> None:
+    pass
+
+
+async def per_call(factory, calls: int) -> float:
+    """Microseconds per awaited call"""
+    started = time.perf_counter()
+    for _ in range(calls):
+        await factory()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    wrapped = timed(HANDLER_SECONDS, HANDLER_ERRORS, 'bench_noop')(noop)
+    plain = await per_call(noop, args.calls)
+    instrumented = await per_call(wrapped, args.calls)
+    print(f"no-op coroutine: {plain:.2f} µs plain, {instrumented:.2f} µs timed "
+          f"(+{instrumented - plain:.2f} µs per call)")
+
+    await DatabaseHandler.init_db()
+    async with DatabaseHandler() as db:
+        for n in range(10):
+            await db.add_reminder(1, f'bench {n}', datetime.utcnow() + timedelta(hours=n + 1))
+    view = ReminderList()
+    await view.render(1)
+    calls = args.calls // 20
+    cached_timed = await per_call(lambda: view.render(1), calls)
+    instrumented_methods = {
+        name: method for name, method in vars(DatabaseHandler).items() if hasattr(method, '__wrapped__')
+    }
+    for name, method in instrumented_methods.items():
+        setattr(DatabaseHandler, name, inspect.unwrap(method))
+    cached_plain = await per_call(lambda: view.render(1), calls)
+    for name, method in instrumented_methods.items():
+        setattr(DatabaseHandler, name, method)
+    print(f"cached /list render: {cached_plain:.1f} µs plain, {cached_timed:.1f} µs instrumented "
+          f"({(cached_timed - cached_plain) / cached_plain * 100:+.1f}%)")
+
+    for n in range(40):
+        HANDLER_SECONDS.observe(f'handler_{n}', n / 1000)
+        DB_SECONDS.observe(f'operation_{n}', n / 1000)
+        DB_ERRORS.inc(f'operation_{n}')
+    started = time.perf_counter()
+    body = REGISTRY.render()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"render: {elapsed:.2f} ms for {len(body.splitlines())} lines ({len(body) / 1024:.0f} KiB)")
+    await dispose_engine()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Per-update overhead and flush latency of DatabasePersistence
+
+Usage: python -m benchmarks.bench_persistence [--rate 500] [--seconds 10] [--users 2000]
+
+Drives DatabasePersistence the way the application does: every simulated
+update changes one user's user_data and conversation state and hands both
+over. Reports the time spent in the persistence calls per update, how often
+and how long flushes took, and compares with writing every update through
+to the database immediately.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_persistence_')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from database.db_handler import DatabaseHandler, dispose_engine
+from database.persistence import CONVERSATION, USER, DatabasePersistence
+
+CONVERSATION_NAME = 'new_reminder'
+STATES = ['waiting_for_reminder_text', 'choosing_time_type', 'entering_delay_time', None]
+
+
+def user_data(user_id: int, state: str) -> dict:
+    return {'state': state, 'reminder_text': f'reminder of user {user_id}'}
+
+
+async def write_behind(rate: float, seconds: float, users: int) -> dict:
+    persistence = DatabasePersistence()
+    await persistence.get_user_data()
+    costs = []
+    started = time.perf_counter()
+    for n in range(int(rate * seconds)):
+        delay = started + n / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        user_id = random.randint(1, users)
+        state = random.choice(STATES)
+        begin = time.perf_counter()
+        await persistence.update_user_data(user_id, user_data(user_id, state))
+        await persistence.update_conversation(CONVERSATION_NAME, (user_id, user_id), state)
+        costs.append((time.perf_counter() - begin) * 1_000_000)
+    await persistence.flush()
+    return {'costs': costs, **persistence.stats()}
+
+
+async def write_through(count: int, users: int) -> list:
+    costs = []
+    async with DatabaseHandler() as db:
+        for _ in range(count):
+            user_id = random.randint(1, users)
+            state = random.choice(STATES)
+            begin = time.perf_counter()
+            await db.store_persisted({
+                (USER, str(user_id)): json.dumps(user_data(user_id, state)),
+                (CONVERSATION + CONVERSATION_NAME, f'[{user_id}, {user_id}]'): None if state is None else json.dumps(state),
+            })
+            costs.append((time.perf_counter() - begin) * 1_000_000)
+    return costs
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=500, help='updates per second')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    result = await write_behind(args.rate, args.seconds, args.users)
+    costs = result['costs']
+    print(f"{len(costs)} updates at {args.rate:.0f}/s over {args.users} users")
+    print(f"  write-behind per update: p50 {statistics.median(costs):.1f} µs, "
+          f"p99 {percentile(costs, 99):.1f} µs, max {max(costs):.1f} µs")
+    print(f"  flushes: {result['flushes']} writing {result['flushed_entries']} entries, "
+          f"last {result['last_flush_ms']:.1f} ms, max {result['max_flush_ms']:.1f} ms")
+
+    through = await write_through(min(len(costs), 2000), args.users)
+    print(f"  write-through per update: p50 {statistics.median(through) / 1000:.2f} ms, "
+          f"p99 {percentile(through, 99) / 1000:.2f} ms")
+    await dispose_engine()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Overhead of slow-update tracing and of the sampling profiler
+
+Usage: python -m benchmarks.bench_profiling [--calls 200000] [--seconds 3]
+
+Times a no-op handler and a time parse plain, through the tracing
+wrappers with tracing disabled (SLOW_UPDATE_THRESHOLD=0) and inside a
+traced update, then a cached /list render the same three ways. Finally
+parses times in a loop for --seconds in total with and without a
+profiling session sampling the thread. Variants alternate over several
+rounds and the best round of each is reported.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_profiling_')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from database.db_handler import DatabaseHandler, dispose_engine
+from handlers.reminder_list import ReminderList
+from utils import profiling
+from utils.profiling import TRACER, SamplingProfiler, trace_updates
+from utils.time_parser import parse_delay_time
+
+# Variants are measured interleaved this many times and the best kept
+ROUNDS = 5
+
+
+class Handlers:
+    async def noop(self, update, context) -> None:
+        pass
+
+
+class TracedHandlers(Handlers):
+    noop = Handlers.noop
+
+
+trace_updates(TracedHandlers)
+
+
+async def per_call(factory, calls: int) -> float:
+    """Microseconds per awaited call"""
+    started = time.perf_counter()
+    for _ in range(calls):
+        await factory()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def per_sync_call(func, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+async def in_trace(factory):
+    """Run `factory` as the body of a traced update"""
+    token = profiling._current.set(profiling.UpdateTrace('bench', None))
+    try:
+        return await factory()
+    finally:
+        profiling._current.reset(token)
+
+
+def parse_loop(seconds: float) -> int:
+    parses = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            parse_delay_time('1г 30хв')
+        parses += 100
+    return parses
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    plain_handlers, traced_handlers = Handlers(), TracedHandlers()
+    TRACER.threshold = 0.0
+    plain = await per_call(lambda: plain_handlers.noop(None, None), args.calls)
+    disabled = await per_call(lambda: traced_handlers.noop(None, None), args.calls)
+    # Above zero but never reached, so nothing is logged
+    TRACER.threshold = 3600.0
+    enabled = await per_call(lambda: traced_handlers.noop(None, None), args.calls)
+    print(f"no-op handler: {plain:.2f} µs plain, {disabled:.2f} µs tracing off, {enabled:.2f} µs traced")
+
+    parse_plain = per_sync_call(lambda: parse_delay_time.__wrapped__('1г 30хв'), args.calls)
+    parse_off = per_sync_call(lambda: parse_delay_time('1г 30хв'), args.calls)
+    token = profiling._current.set(profiling.UpdateTrace('bench', None))
+    parse_traced = per_sync_call(lambda: parse_delay_time('1г 30хв'), args.calls)
+    profiling._current.reset(token)
+    print(f"parse_delay_time: {parse_plain:.2f} µs plain, {parse_off:.2f} µs tracing off, "
+          f"{parse_traced:.2f} µs traced")
+
+    await DatabaseHandler.init_db()
+    async with DatabaseHandler() as db:
+        for n in range(10):
+            await db.add_reminder(1, f'bench {n}', datetime.utcnow() + timedelta(hours=n + 1))
+    view = ReminderList()
+    await view.render(1)
+    calls = args.calls // 20 // ROUNDS
+    # Peel the phase wrappers off to get the untraced baseline
+    traced_methods = {
+        name: method for name, method in vars(DatabaseHandler).items() if hasattr(method, '__wrapped__')
+    }
+    render = {'plain': [], 'off': [], 'traced': []}
+    for _ in range(ROUNDS):
+        render['off'].append(await per_call(lambda: view.render(1), calls))
+        render['traced'].append(await per_call(lambda: in_trace(lambda: view.render(1)), calls))
+        for name, method in traced_methods.items():
+            setattr(DatabaseHandler, name, method.__wrapped__)
+        render['plain'].append(await per_call(lambda: view.render(1), calls))
+        for name, method in traced_methods.items():
+            setattr(DatabaseHandler, name, method)
+    render_plain, render_off, render_traced = (min(render[key]) for key in ('plain', 'off', 'traced'))
+    print(f"cached /list render: {render_plain:.1f} µs plain, {render_off:.1f} µs tracing off "
+          f"({(render_off - render_plain) / render_plain * 100:+.1f}%), {render_traced:.1f} µs traced "
+          f"({(render_traced - render_plain) / render_plain * 100:+.1f}%)")
+    await dispose_engine()
+
+    profiler = SamplingProfiler(os.path.join(_tmpdir, 'profiles'))
+    chunk = args.seconds / ROUNDS
+    parse_loop(0.5)
+    baseline = profiled = samples = 0
+    for _ in range(ROUNDS):
+        baseline = max(baseline, parse_loop(chunk))
+        session = asyncio.ensure_future(profiler.run(chunk + 0.2))
+        # Let the sampler thread start before measuring
+        await asyncio.sleep(0.1)
+        profiled = max(profiled, parse_loop(chunk))
+        path, session_samples = await session
+        samples += session_samples
+    print(f"time parsing: {baseline / chunk:,.0f}/s without, {profiled / chunk:,.0f}/s while "
+          f"sampling every {profiler.interval * 1000:g} ms ({(profiled - baseline) / baseline * 100:+.1f}%), "
+          f"{samples} samples in {ROUNDS} sessions, {os.path.getsize(path) / 1024:.0f} KiB per file")
+    shutil.rmtree(_tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
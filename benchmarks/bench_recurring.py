@@ -0,0 +1,108 @@
+"""Cost of many recurring reminders firing on the same minute
+
+Usage: python -m benchmarks.bench_recurring [--rules 100000] [--timezones 5]
+
+Seeds a temporary SQLite database with --rules daily rules spread over a
+few timezones, all due now, and pushes them through DeliveryPipeline with
+a no-op bot and the rate limits lifted, so only the scheduler's own work is
+measured: claiming, computing next occurrences and advancing the rows.
+Reports the pipeline time, the cost of next-occurrence computation with
+and without the per-minute cache, and checks that the table still holds
+one row per rule with nothing left due.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_recurring_')
+DB_PATH = os.path.join(_tmpdir, 'bench.db')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from config import Config
+from database.db_handler import DatabaseHandler, dispose_engine
+from scheduler.delivery import DeliveryPipeline
+from utils import recurrence
+
+Config.load()
+
+TIMEZONES = ['Europe/Kyiv', 'Europe/Warsaw', 'America/New_York', 'Asia/Tokyo', 'UTC']
+
+
+class NullBot:
+    """Accepts every message instantly"""
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        pass
+
+
+async def seed(rules: int, timezones: int) -> list:
+    await DatabaseHandler.init_db()
+    due = datetime.utcnow().replace(second=0, microsecond=0)
+    zones = TIMEZONES[:timezones]
+    rows = [
+        (user_id, f'rule {user_id}', due, True, '0 9 * * *', random.choice(zones))
+        for user_id in range(1, rules + 1)
+    ]
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            'INSERT INTO reminders (user_id, text, reminder_time, is_active, recurrence, timezone) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(u, t, d.strftime('%Y-%m-%d %H:%M:%S.%f'), a, r, z) for u, t, d, a, r, z in rows]
+        )
+    return rows
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=100_000)
+    parser.add_argument('--timezones', type=int, default=5, choices=range(1, len(TIMEZONES) + 1))
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rows = await seed(args.rules, args.timezones)
+    print(f"{args.rules} daily rules across {args.timezones} timezones due on the same minute")
+
+    now = datetime.utcnow()
+    start = time.perf_counter()
+    for _, _, due, _, rule, zone in rows:
+        recurrence._next_occurrence.__wrapped__(rule, zone, max(due, now).replace(second=0, microsecond=0))
+    uncached = time.perf_counter() - start
+    recurrence._next_occurrence.cache_clear()
+    start = time.perf_counter()
+    for _, _, due, _, rule, zone in rows:
+        recurrence.next_occurrence(rule, zone, max(due, now))
+    cached = time.perf_counter() - start
+    recurrence._next_occurrence.cache_clear()
+    print(f"  next occurrence: {uncached * 1000:.0f} ms uncached, {cached * 1000:.0f} ms with the per-minute cache")
+
+    Config.DELIVERY_GLOBAL_RATE = Config.DELIVERY_CHAT_RATE = 1e9
+    advanced = []
+    pipeline = DeliveryPipeline(NullBot(), on_retry=lambda *a: None, on_advance=lambda *a: advanced.append(a))
+    batch = [(user_id, user_id) for user_id in range(1, args.rules + 1)]
+    start = time.perf_counter()
+    for offset in range(0, len(batch), pipeline.batch_size):
+        await pipeline.process(batch[offset:offset + pipeline.batch_size])
+    elapsed = time.perf_counter() - start
+    print(f"  pipeline: {len(advanced)} advanced in {elapsed:.2f}s ({len(advanced) / elapsed:,.0f} rules/s)")
+
+    async with DatabaseHandler() as db:
+        left = len(await db.get_due_reminders())
+    with sqlite3.connect(DB_PATH) as conn:
+        total, distinct = conn.execute(
+            'SELECT COUNT(*), COUNT(DISTINCT reminder_time) FROM reminders WHERE is_active'
+        ).fetchone()
+    print(f"  rows: {total} active ({distinct} distinct next fire times), due after run: {left}")
+    next_fire = min(fire_at for _, _, fire_at in advanced)
+    print(f"  earliest next occurrence: {next_fire} UTC (in {(next_fire - now) / timedelta(hours=1):.1f} h)")
+    await dispose_engine()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
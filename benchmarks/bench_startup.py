@@ -0,0 +1,157 @@
+"""Time from process start to ready and to the first update handled
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--reminders 10000]
+                                          [--json results.json]
+
+Starts the bot, unchanged, as a child process (`main.main()` with
+BOT_API_BASE_URL pointing at a FakeBotAPI in this process) against a
+database holding --reminders pending reminders, with a /start update
+already waiting. Reports medians over --runs starts of: the child's
+import of main, time until it first polls getUpdates (ready), time until
+the reply to /start arrives, RSS when ready and time to exit after
+SIGTERM. A bare `python -c pass` is timed as the floor.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ.setdefault('STARTUP_DB', os.path.join(tempfile.mkdtemp(prefix='bench_startup_'), 'bench.db'))
+os.environ['DATABASE_URL'] = f"sqlite:///{os.environ['STARTUP_DB']}"
+os.environ['RUN_MODE'] = 'polling'
+
+from benchmarks.fake_bot_api import FakeBotAPI, command_update
+
+CHAT_ID = 700_000
+
+
+def run_worker() -> None:
+    """Child process: report the import time of main, then run it as `python main.py` does"""
+    started = time.perf_counter()
+    import main
+    print(json.dumps({'import_ms': (time.perf_counter() - started) * 1000}), flush=True)
+    logging.getLogger().setLevel(logging.WARNING)
+    main.main()
+
+
+def rss_mib(pid: int) -> float:
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def seed(count: int) -> None:
+    from config import Config
+    from database.db_handler import DatabaseHandler, Reminder, dispose_engine
+
+    Config.load()
+    await DatabaseHandler.init_db()
+    now = datetime.utcnow()
+    async with DatabaseHandler() as db:
+        for first in range(0, count, 5000):
+            # Spread over two hours, so half falls in the scheduler's window
+            await db.apply_writes([
+                Reminder(user_id=n % 1000, text=f'reminder {n}', reminder_time=now + timedelta(seconds=60 + n * 7200 // count))
+                for n in range(first, min(first + 5000, count))
+            ], (), ())
+    await dispose_engine()
+
+
+async def start_once() -> Dict[str, float]:
+    fake = FakeBotAPI()
+    await fake.start()
+    fake.updates.put_nowait(command_update(1, CHAT_ID, '/start'))
+    started = time.perf_counter()
+    bot = await asyncio.create_subprocess_exec(
+        sys.executable, '-W', 'ignore', '-m', 'benchmarks.bench_startup', '--worker',
+        env=dict(os.environ, BOT_API_BASE_URL=f'http://127.0.0.1:{fake.port}'),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    report = json.loads(await bot.stdout.readline())
+
+    deadline = time.monotonic() + 60
+    while not fake.calls['getUpdates']:
+        if bot.returncode is not None or time.monotonic() > deadline:
+            raise SystemExit("Bot did not start")
+        await asyncio.sleep(0.001)
+    ready = time.perf_counter() - started
+    rss = rss_mib(bot.pid)
+    while not fake.sent:
+        if time.monotonic() > deadline:
+            raise SystemExit("Bot did not answer /start")
+        await asyncio.sleep(0.001)
+    first_reply = time.perf_counter() - started
+
+    stopping = time.perf_counter()
+    bot.send_signal(signal.SIGTERM)
+    await bot.wait()
+    stopped = time.perf_counter() - stopping
+    await fake.stop()
+    return {
+        'import_ms': report['import_ms'],
+        'ready_ms': ready * 1000,
+        'first_reply_ms': first_reply * 1000,
+        'rss_mib': rss,
+        'shutdown_ms': stopped * 1000,
+    }
+
+
+def bare_interpreter_ms(runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    await seed(args.reminders)
+    runs: List[Dict[str, float]] = [await start_once() for _ in range(args.runs)]
+    result: Dict[str, Any] = {
+        key: statistics.median(run[key] for run in runs) for key in runs[0]
+    }
+    result['python_ms'] = bare_interpreter_ms(args.runs)
+    result['runs'] = args.runs
+    result['reminders'] = args.reminders
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--reminders', type=int, default=10_000, help='pending reminders in the database')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+        return
+    result = asyncio.run(run(args))
+    print(f"median of {result['runs']} starts, {result['reminders']:,} pending reminders "
+          f"(bare interpreter {result['python_ms']:.0f} ms)")
+    print(f"  import main   {result['import_ms']:7.0f} ms")
+    print(f"  ready         {result['ready_ms']:7.0f} ms")
+    print(f"  first reply   {result['first_reply_ms']:7.0f} ms")
+    print(f"  RSS at ready  {result['rss_mib']:7.0f} MiB")
+    print(f"  shutdown      {result['shutdown_ms']:7.0f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""Operation latency and recovery time of the SQLite and embedded memory stores
+
+Usage: python -m benchmarks.bench_storage [--reminders 1000000] [--users 10000]
+                                          [--ops 1000] [--tail 50000]
+                                          [--backends sqlite,memory]
+
+Runs each backend in its own child process, so peak RSS and startup are
+measured separately. The child loads --reminders pending reminders
+through DatabaseHandler.apply_writes, times single operations through the
+same DatabaseHandler interface the bot uses (add, /list page, due scan,
+snooze, deactivate), then measures recovery: reopening after a clean
+shutdown, and after a crash with --tail writes since the last snapshot
+(for SQLite, a copy of the files with them still in the WAL). Recovery ends when the
+first /list page is served.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+
+from config import Config
+from database import db_handler, memory_store
+from database.db_handler import DatabaseHandler, Reminder, dispose_engine
+
+Config.load()
+
+LOAD_BATCH = 5000
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def disk_usage(path: str) -> int:
+    if os.path.isfile(path):
+        return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+async def timed(ops: int, operation: Callable[[int], Any]) -> Dict[str, float]:
+    latencies = []
+    for n in range(ops):
+        started = time.perf_counter()
+        await operation(n)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {'p50': percentile(latencies, 50), 'p99': percentile(latencies, 99)}
+
+
+async def crash(path: str) -> None:
+    """Leave the files as a crash would and point DATABASE_URL at them"""
+    if db_handler.uses_memory_store():
+        # Written records are on disk, the snapshot is the one taken after loading
+        store = memory_store.get_memory_store()
+        store.journal.close()
+        memory_store._store = None
+        return
+    # Commits since the last checkpoint are only in the WAL
+    crashed = path + '.crashed'
+    for suffix in ('', '-wal'):
+        if os.path.exists(path + suffix):
+            shutil.copyfile(path + suffix, crashed + suffix)
+    await dispose_engine()
+    Config.DATABASE_URL = f'sqlite:///{crashed}'
+
+
+async def reopen(user_id: int) -> float:
+    started = time.perf_counter()
+    await DatabaseHandler.init_db()
+    async with DatabaseHandler() as db:
+        await db.get_reminders_page(user_id, 10)
+    return time.perf_counter() - started
+
+
+async def load(args: argparse.Namespace, now: datetime, horizon: int) -> float:
+    """Insert --reminders pending reminders in large batches; returns seconds taken"""
+    started = time.perf_counter()
+    async with DatabaseHandler() as db:
+        for first in range(0, args.reminders, LOAD_BATCH):
+            batch = [
+                Reminder(
+                    user_id=random.randrange(args.users),
+                    text=f'reminder {n}',
+                    # A small share already due, the rest over the next month
+                    reminder_time=now + timedelta(seconds=random.randrange(-600, horizon))
+                )
+                for n in range(first, min(first + LOAD_BATCH, args.reminders))
+            ]
+            await db.apply_writes(batch, (), ())
+    return time.perf_counter() - started
+
+
+async def exercise(args: argparse.Namespace, now: datetime, horizon: int) -> Dict[str, Dict[str, float]]:
+    """Time single operations, then write --tail reminders after the last snapshot"""
+    ids = list(range(1, args.reminders + 1))
+    latency = {}
+    async with DatabaseHandler() as db:
+        latency['add'] = await timed(args.ops, lambda n: db.add_reminder(
+            random.randrange(args.users), f'added {n}', now + timedelta(seconds=random.randrange(horizon))
+        ))
+        latency['list_page'] = await timed(args.ops, lambda n: db.get_reminders_page(
+            random.randrange(args.users), 10
+        ))
+        latency['due_scan'] = await timed(args.ops, lambda n: db.get_claimable_ids('bench', 100))
+        sample = random.sample(ids, 2 * args.ops)
+        rows = {reminder.id: reminder for reminder in [await db.get_reminder(i) for i in sample]}
+        latency['snooze'] = await timed(args.ops, lambda n: db.apply_writes([], (), (), [(
+            sample[n], rows[sample[n]].user_id, now + timedelta(hours=1)
+        )]))
+        latency['deactivate'] = await timed(args.ops, lambda n: db.deactivate_reminder(sample[args.ops + n]))
+
+        for first in range(0, args.tail, LOAD_BATCH):
+            await db.apply_writes([
+                Reminder(user_id=random.randrange(args.users), text=f'tail {n}',
+                         reminder_time=now + timedelta(seconds=random.randrange(horizon)))
+                for n in range(first, min(first + LOAD_BATCH, args.tail))
+            ], (), ())
+    return latency
+
+
+async def run_backend(args: argparse.Namespace) -> Dict[str, Any]:
+    # Snapshots only where the benchmark asks for them
+    Config.JOURNAL_SNAPSHOT_RECORDS = 0
+    random.seed(args.seed)
+    now = datetime.utcnow()
+    horizon = 30 * 86400
+    await DatabaseHandler.init_db()
+
+    load_s = await load(args, now, horizon)
+    if db_handler.uses_memory_store():
+        await memory_store.get_memory_store().snapshot()
+
+    latency = await exercise(args, now, horizon)
+
+    size = disk_usage(args.path)
+    await crash(args.path)
+    recovery_crash_s = await reopen(0)
+    await dispose_engine()
+    recovery_clean_s = await reopen(0)
+    await dispose_engine()
+    return {
+        'load_s': load_s,
+        'latency_ms': latency,
+        'recovery_crash_s': recovery_crash_s,
+        'recovery_clean_s': recovery_clean_s,
+        'disk_mib': size / 2 ** 20,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reminders', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--ops', type=int, default=1000, help='timed calls per operation')
+    parser.add_argument('--tail', type=int, default=50_000, help='writes after the last snapshot before the crash')
+    parser.add_argument('--backends', default='sqlite,memory')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        Config.DATABASE_URL = f'sqlite:///{args.path}' if args.worker == 'sqlite' else f'memory://{args.path}'
+        print(json.dumps(asyncio.run(run_backend(args))))
+        return
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_storage_')
+    paths = {'sqlite': os.path.join(tmpdir, 'bench.db'), 'memory': os.path.join(tmpdir, 'store')}
+    print(f"{args.reminders:,} reminders of {args.users:,} users, {args.ops} calls per operation, "
+          f"{args.tail:,} writes replayed after a crash")
+    results = {}
+    try:
+        for backend in args.backends.split(','):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_storage', '--worker', backend, '--path', paths[backend]]
+                + sys.argv[1:],
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            results[backend] = result = json.loads(output.splitlines()[-1])
+            print(f"{backend}: loaded in {result['load_s']:.1f}s, {result['disk_mib']:.0f} MiB on disk, "
+                  f"peak RSS {result['peak_rss_mib']:.0f} MiB")
+            for name, latency in result['latency_ms'].items():
+                print(f"  {name:11} p50 {latency['p50']:7.3f} ms, p99 {latency['p99']:7.3f} ms")
+            print(f"  recovery after crash {result['recovery_crash_s']:.2f}s, "
+                  f"after clean shutdown {result['recovery_clean_s']:.2f}s")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
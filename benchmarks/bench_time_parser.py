@@ -0,0 +1,83 @@
+"""Time parsing and /list formatting throughput, legacy functions vs TimeParser
+
+Usage: python -m benchmarks.bench_time_parser [--parses 100000] [--rows 10000]
+
+Times parse_delay_time on a mix of Ukrainian delay inputs and formatting of
+a large reminder list, comparing the previous per-call implementation
+(regexes compiled and timezone resolved on every call, kept below as the
+baseline) with the precompiled TimeParser and its format_many().
+"""
+import argparse
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+
+import pytz
+from utils.time_parser import DEFAULT_TIMEZONE, format_many, format_reminder_time, get_parser
+
+INPUTS = ['1г 30хв', '2 години', '45 хвилин', '3 год 5 хв', 'через 10 хвилин', '1 година 1 хвилина']
+
+
+def legacy_parse_delay_time(delay_str: str) -> datetime:
+    tz = pytz.timezone(DEFAULT_TIMEZONE)
+    current_time = datetime.now(tz)
+    hours = 0
+    minutes = 0
+    hours_match = re.search(r'(\d+)\s*(?:г|год|година|години|годин)', delay_str, re.IGNORECASE)
+    if hours_match:
+        hours = int(hours_match.group(1))
+    minutes_match = re.search(r'(\d+)\s*(?:хв|хвилина|хвилини|хвилин)', delay_str, re.IGNORECASE)
+    if minutes_match:
+        minutes = int(minutes_match.group(1))
+    if hours == 0 and minutes == 0:
+        raise ValueError("No valid time units found")
+    return current_time + timedelta(hours=hours, minutes=minutes)
+
+
+def legacy_format_reminder_time(dt: datetime) -> str:
+    tz = pytz.timezone(DEFAULT_TIMEZONE)
+    if dt.tzinfo is None:
+        dt = pytz.utc.localize(dt).astimezone(tz)
+    return dt.strftime("%d.%m.%Y %H:%M")
+
+
+def rate(func, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--parses', type=int, default=100_000)
+    parser.add_argument('--rows', type=int, default=10_000, help='reminders in the formatted list')
+    args = parser.parse_args()
+
+    inputs = [random.choice(INPUTS) for _ in range(args.parses)]
+    engine = get_parser()
+    print(f"parse_delay_time over {args.parses} inputs")
+    print(f"  legacy:     {rate(legacy_parse_delay_time, inputs):>10,.0f} parses/s")
+    print(f"  TimeParser: {rate(engine.parse_delay, inputs):>10,.0f} parses/s")
+    print(f"  grammar:    {rate(engine.parse_delay_seconds, inputs):>10,.0f} parses/s (without now())")
+
+    now = datetime.utcnow()
+    rows = [now + timedelta(minutes=random.randint(1, 60 * 24 * 365)) for _ in range(args.rows)]
+    assert [legacy_format_reminder_time(dt) for dt in rows] == format_many(rows)
+    print(f"formatting a {args.rows}-row list")
+    for label, render in (
+        ('legacy', lambda: [legacy_format_reminder_time(dt) for dt in rows]),
+        ('per row', lambda: [format_reminder_time(dt) for dt in rows]),
+        ('format_many', lambda: format_many(rows)),
+    ):
+        start = time.perf_counter()
+        render()
+        print(f"  {label:12} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""Replay updates through polling and webhook modes and compare latency
+
+Usage: python -m benchmarks.bench_webhook [--updates 2000] [--rate 200]
+                                          [--replay recorded.jsonl]
+
+Runs ReminderBot against FakeBotAPI twice: once fetching updates with
+getUpdates long polling and once receiving them on a local webhook
+endpoint. Latency is measured from injecting an update to the bot's reply
+reaching the fake API. Without --replay a synthetic mix of /start, /help
+and /list commands from distinct users is used.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_webhook_')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from config import Config
+from main import ReminderBot
+from benchmarks.fake_bot_api import FakeBotAPI, command_update
+
+Config.load()
+
+SECRET = 'bench-secret'
+
+
+def synthetic_updates(count: int) -> List[Dict[str, Any]]:
+    commands = ['/start', '/help', '/list']
+    return [command_update(n + 1, 100_000 + n, commands[n % 3]) for n in range(count)]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def run_mode(mode: str, updates: List[Dict[str, Any]], rate: float) -> Dict[str, float]:
+    fake = FakeBotAPI()
+    await fake.start()
+    Config.BOT_API_BASE_URL = f'http://127.0.0.1:{fake.port}'
+    bot = ReminderBot()
+    application = bot.application
+    await application.initialize()
+    await bot._post_init(application)
+
+    port = free_port()
+    if mode == 'webhook':
+        Config.WEBHOOK_URL = f'http://127.0.0.1:{port}'
+        Config.WEBHOOK_LISTEN = '127.0.0.1'
+        Config.WEBHOOK_PORT = port
+        Config.WEBHOOK_PATH = 'hook'
+        Config.WEBHOOK_SECRET_TOKEN = SECRET
+        await application.updater.start_webhook(**bot.webhook_options())
+    else:
+        await application.updater.start_polling(
+            poll_interval=0, timeout=10, allowed_updates=bot.allowed_updates()
+        )
+    await application.start()
+
+    injected: Dict[int, deque] = defaultdict(deque)
+    connections: asyncio.Queue = asyncio.Queue()
+    if mode == 'webhook':
+        for _ in range(Config.WEBHOOK_MAX_CONNECTIONS):
+            connections.put_nowait(await asyncio.open_connection('127.0.0.1', port))
+
+    async def inject(update: Dict[str, Any]) -> None:
+        injected[update['message']['chat']['id']].append(time.time())
+        if mode != 'webhook':
+            fake.updates.put_nowait(update)
+            return
+        # Raw keep-alive HTTP keeps the injector's own overhead out of the numbers
+        reader, writer = await connections.get()
+        body = json.dumps(update).encode()
+        writer.write(
+            f'POST /hook HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+            f'X-Telegram-Bot-Api-Secret-Token: {SECRET}\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+            + body
+        )
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = next(
+            (int(line.split(b':')[1]) for line in head.split(b'\r\n') if line.lower().startswith(b'content-length')),
+            0
+        )
+        await reader.readexactly(length)
+        connections.put_nowait((reader, writer))
+
+    started = time.time()
+    tasks = []
+    for n, update in enumerate(updates):
+        delay = started + n / rate - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(inject(update)))
+    await asyncio.gather(*tasks)
+
+    deadline = time.time() + 30
+    while len(fake.sent) < len(updates) and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    while not connections.empty():
+        connections.get_nowait()[1].close()
+
+    latencies = []
+    for sent_at, chat_id, _ in sorted(fake.sent):
+        if injected[chat_id]:
+            latencies.append((sent_at - injected[chat_id].popleft()) * 1000)
+
+    await application.updater.stop()
+    await application.stop()
+    await bot._post_stop(application)
+    await application.shutdown()
+    await bot._post_shutdown(application)
+    await fake.stop()
+    return {
+        'handled': len(latencies),
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'max': max(latencies, default=0.0),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=200, help='updates per second')
+    parser.add_argument('--replay', help='JSON lines file with recorded updates')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    else:
+        updates = synthetic_updates(args.updates)
+
+    print(f"{len(updates)} updates at {args.rate:.0f}/s, concurrent_updates={Config.CONCURRENT_UPDATES}")
+    for mode in ('polling', 'webhook'):
+        result = await run_mode(mode, updates, args.rate)
+        print(f"  {mode:8} handled {result['handled']}/{len(updates)}: "
+              f"p50 {result['p50']:.1f} ms, p99 {result['p99']:.1f} ms, max {result['max']:.1f} ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
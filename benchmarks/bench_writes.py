@@ -0,0 +1,96 @@
+"""Reminder inserts: per-call commits versus the group-commit writer
+
+Usage: python -m benchmarks.bench_writes [--writes 5000] [--clients 50] [--synchronous NORMAL]
+
+Runs --clients concurrent coroutines, each adding reminders back to back
+the way /new does, first through DatabaseHandler.add_reminder with one
+transaction per call and then through GroupCommitWriter, each against a
+fresh temporary SQLite database. Reports inserts per second and the
+acknowledgement latency a handler waits for.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+
+from config import Config
+from database.db_handler import DatabaseHandler, dispose_engine
+from database.writer import GroupCommitWriter
+
+Config.load()
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(mode: str, writes: int, clients: int) -> dict:
+    Config.DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_writes_'), 'bench.db')}"
+    await DatabaseHandler.init_db()
+    writer = GroupCommitWriter()
+    if mode == 'group':
+        writer.start()
+    when = datetime.utcnow() + timedelta(days=1)
+    latencies, errors = [], 0
+
+    async def add(n: int) -> None:
+        if mode == 'group':
+            await writer.add_reminder(n % 1000, f'reminder {n}', when)
+        else:
+            async with DatabaseHandler() as db:
+                await db.add_reminder(n % 1000, f'reminder {n}', when)
+
+    async def client(offset: int) -> None:
+        nonlocal errors
+        for n in range(offset, writes, clients):
+            begin = time.perf_counter()
+            try:
+                await add(n)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - begin) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(offset) for offset in range(clients)))
+    elapsed = time.perf_counter() - started
+    await writer.stop()
+    stats = writer.stats()
+    await dispose_engine()
+    return {
+        'rate': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': percentile(latencies, 99),
+        'errors': errors,
+        'commits': stats['commits'] if mode == 'group' else len(latencies),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--journal-mode', default=Config.SQLITE_JOURNAL_MODE)
+    parser.add_argument('--synchronous', default=Config.SQLITE_SYNCHRONOUS)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    Config.SQLITE_JOURNAL_MODE = args.journal_mode
+    Config.SQLITE_SYNCHRONOUS = args.synchronous
+
+    print(f"{args.writes} inserts from {args.clients} concurrent clients, "
+          f"journal_mode={args.journal_mode}, synchronous={args.synchronous}")
+    for mode in ('per-call', 'group'):
+        result = await run(mode, args.writes, args.clients)
+        print(f"  {mode:9} {result['rate']:8,.0f} inserts/s, ack p50 {result['p50']:6.1f} ms, "
+              f"p99 {result['p99']:6.1f} ms, {result['commits']} commits, {result['errors']} errors")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
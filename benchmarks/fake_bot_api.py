@@ -0,0 +1,227 @@
+"""Minimal local stand-in for the Telegram Bot API
+
+Speaks just enough HTTP/1.1 for python-telegram-bot's httpx client: every
+request to /bot<token>/<method> is answered from an in-process handler,
+outgoing messages are recorded, and Telegram's flood limits can be
+enforced so that rate limiting and retry_after handling get exercised.
+"""
+import asyncio
+import json
+import time
+import urllib.parse
+from collections import Counter, defaultdict, deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_reminder_bot'}
+
+
+def command_update(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    """Build a private-chat message update carrying a bot command"""
+    user = {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': user,
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+def document_update(update_id: int, user_id: int, file_id: str, file_name: str) -> Dict[str, Any]:
+    """Build a private-chat message update carrying a file stored in FakeBotAPI.files"""
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+        'document': {'file_id': file_id, 'file_unique_id': file_id, 'file_name': file_name},
+    }}
+
+
+class FakeBotAPI:
+    """In-process fake Bot API server recording every call"""
+
+    def __init__(
+        self,
+        enforce_limits: bool = False,
+        global_rate: int = 30,
+        chat_rate: int = 1,
+        latency: float = 0.0
+    ):
+        self.enforce_limits = enforce_limits
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.sent: List[Tuple[float, int, str]] = []
+        self.files: Dict[str, bytes] = {}
+        self.rejected = 0
+        self.updates: asyncio.Queue = asyncio.Queue()
+        # Called with (method, chat_id, message) for every message sent or edited
+        self.on_message: Optional[Callable[[str, int, Dict[str, Any]], None]] = None
+        self._message_id = 0
+        self._global_window: Deque[float] = deque()
+        self._chat_last: Dict[int, float] = defaultdict(float)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.Task] = set()
+        self.port = 0
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/bot'
+
+    @property
+    def base_file_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/file/bot'
+
+    async def start(self, port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._clients):
+                task.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+
+    # Bot API methods
+
+    def _next_message(self, chat_id: int, text: str = '') -> Dict[str, Any]:
+        self._message_id += 1
+        return {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': text,
+        }
+
+    def _message(self, method: str, chat_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        message = self._next_message(chat_id, params.get('text', ''))
+        if self.on_message is not None:
+            self.on_message(method, chat_id, message)
+        return message
+
+    def _throttle(self, chat_id: int) -> Optional[int]:
+        """Return retry_after seconds when Telegram would reject the send"""
+        if not self.enforce_limits:
+            return None
+        now = time.monotonic()
+        window = self._global_window
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        # Same small tolerance for timer jitter that Telegram grants in practice
+        if len(window) >= self.global_rate or now - self._chat_last[chat_id] < 0.95 / self.chat_rate:
+            self.rejected += 1
+            return 1
+        window.append(now)
+        self._chat_last[chat_id] = now
+        return None
+
+    async def _call(self, method: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': BOT_USER}
+        if method in ('sendMessage', 'sendDocument'):
+            chat_id = int(params['chat_id'])
+            retry_after = self._throttle(chat_id)
+            if retry_after is not None:
+                return 429, {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f'Too Many Requests: retry after {retry_after}',
+                    'parameters': {'retry_after': retry_after},
+                }
+            self.sent.append((time.time(), chat_id, params.get('text', '')))
+            return 200, {'ok': True, 'result': self._message(method, chat_id, params)}
+        if method in ('editMessageText', 'editMessageReplyMarkup'):
+            chat_id = int(params.get('chat_id', 0))
+            return 200, {'ok': True, 'result': self._message(method, chat_id, params)}
+        if method == 'getUpdates':
+            return 200, {'ok': True, 'result': await self._get_updates(params)}
+        if method == 'getFile':
+            file_id = params['file_id']
+            return 200, {'ok': True, 'result': {
+                'file_id': file_id,
+                'file_unique_id': file_id,
+                'file_size': len(self.files.get(file_id, b'')),
+                'file_path': file_id,
+            }}
+        return 200, {'ok': True, 'result': True}
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        timeout = float(params.get('timeout', 0))
+        updates = []
+        try:
+            updates.append(await asyncio.wait_for(self.updates.get(), timeout or 0.01))
+        except asyncio.TimeoutError:
+            return updates
+        limit = int(params.get('limit', 100))
+        while len(updates) < limit and not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return updates
+
+    # HTTP plumbing
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                _, path, _ = request_line.split(' ', 2)
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._route(path, headers, body)
+                writer.write(
+                    f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n'
+                    f'Content-Length: {len(payload)}\r\n\r\n'.encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _route(self, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+        path = urllib.parse.urlsplit(path).path
+        if path.startswith('/file/bot'):
+            file_id = path.split('/', 3)[3]
+            return 200, self.files.get(file_id, b'')
+
+        method = path.rsplit('/', 1)[-1]
+        status, result = await self._call(method, self._parse(headers, body))
+        return status, json.dumps(result).encode()
+
+    @staticmethod
+    def _parse(headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        content_type = headers.get('content-type', '')
+        if content_type.startswith('application/json'):
+            return json.loads(body or b'{}')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+            )
+            params = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                params[name] = part.get_content() if part.get_filename() is None else part.get_payload(decode=True)
+            return params
+        return {k: v[0] for k, v in urllib.parse.parse_qs(body.decode()).items()}
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""Run several bot workers against one database while killing them at random
+
+Usage: python -m benchmarks.multiworker_harness [--workers 3] [--reminders 2000]
+                                                [--duration 30] [--graceful]
+
+Seeds a temporary SQLite database (WAL mode) with reminders due over the
+next --duration seconds, starts FakeBotAPI in this process and spawns
+--workers bot processes, each owning a shard of users. Every --kill-every
+seconds a random worker is killed (SIGKILL, or SIGTERM with --graceful)
+and restarted shortly after. Once everything is due plus one claim lease
+the delivered texts are checked: no reminder may be lost. Delivery is
+at-least-once, so a SIGKILL can repeat sends that were in flight when the
+process died; graceful stops drain them and should report no duplicates.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import signal
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict
+
+# Workers inherit HARNESS_DB, so they all open the supervisor's file
+if 'HARNESS_DB' not in os.environ:
+    os.environ['HARNESS_DB'] = os.path.join(tempfile.mkdtemp(prefix='multiworker_'), 'harness.db')
+DB_PATH = os.environ['HARNESS_DB']
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ.setdefault('CLAIM_LEASE', '5')
+os.environ.setdefault('CLAIM_SWEEP_INTERVAL', '1')
+os.environ.setdefault('SCHEDULER_MISSED_GRACE', '3600')
+os.environ.setdefault('ARCHIVE_INTERVAL', '0')
+
+from config import Config
+from benchmarks.fake_bot_api import FakeBotAPI
+
+Config.load()
+
+TEXT = re.compile(r'harness-(\d+)')
+
+
+async def run_worker() -> None:
+    """Worker process: run the scheduler until SIGTERM"""
+    from main import ReminderBot
+
+    bot = ReminderBot()
+    application = bot.application
+    await application.initialize()
+    await bot._post_init(application)
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    await stop.wait()
+    # Same order as Application.run_*: delivery drains before the bot's client closes
+    await bot._post_stop(application)
+    await application.shutdown()
+    await bot._post_shutdown(application)
+
+
+async def seed(reminders: int, users: int, duration: float) -> None:
+    from database.db_handler import DatabaseHandler, dispose_engine
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute('PRAGMA journal_mode=WAL')
+    await DatabaseHandler.init_db()
+    start = datetime.utcnow() + timedelta(seconds=2)
+    async with DatabaseHandler() as db:
+        for n in range(reminders):
+            when = start + timedelta(seconds=random.uniform(0, duration))
+            await db.add_reminder(random.randint(1, users), f'harness-{n}', when)
+    await dispose_engine()
+
+
+async def spawn(index: int, count: int, generation: int, base_url: str) -> asyncio.subprocess.Process:
+    env = dict(
+        os.environ,
+        WORKER_INDEX=str(index),
+        WORKER_COUNT=str(count),
+        WORKER_ID=f'worker-{index}-{generation}',
+        BOT_API_BASE_URL=base_url,
+    )
+    return await asyncio.create_subprocess_exec(
+        sys.executable, '-W', 'ignore', '-m', 'benchmarks.multiworker_harness', '--worker', env=env
+    )
+
+
+async def supervise(args: argparse.Namespace) -> int:
+    await seed(args.reminders, args.users, args.duration)
+    fake = FakeBotAPI(latency=args.latency)
+    await fake.start()
+
+    generations = Counter()
+    workers: Dict[int, asyncio.subprocess.Process] = {}
+    for index in range(args.workers):
+        workers[index] = await spawn(index, args.workers, 0, fake.base_url)
+
+    kills = 0
+    deadline = time.monotonic() + 2 + args.duration
+    while time.monotonic() < deadline:
+        await asyncio.sleep(args.kill_every)
+        index = random.randrange(args.workers)
+        victim = workers[index]
+        victim.send_signal(signal.SIGTERM if args.graceful else signal.SIGKILL)
+        await victim.wait()
+        kills += 1
+        await asyncio.sleep(args.restart_delay)
+        generations[index] += 1
+        workers[index] = await spawn(index, args.workers, generations[index], fake.base_url)
+
+    # Let the last reminders fire and any orphaned lease expire
+    settle = time.monotonic() + Config.CLAIM_LEASE + 2 * Config.CLAIM_SWEEP_INTERVAL + 5
+    delivered = Counter()
+    while time.monotonic() < settle:
+        await asyncio.sleep(0.5)
+        # A combined message carries several reminders
+        delivered = Counter(
+            int(match.group(1)) for _, _, text in fake.sent for match in TEXT.finditer(text)
+        )
+        if len(delivered) == args.reminders and time.monotonic() > settle - 5:
+            break
+
+    for process in workers.values():
+        process.send_signal(signal.SIGTERM)
+    await asyncio.gather(*(process.wait() for process in workers.values()))
+    await fake.stop()
+
+    lost = args.reminders - len(delivered)
+    duplicates = sum(count - 1 for count in delivered.values() if count > 1)
+    mode = 'SIGTERM' if args.graceful else 'SIGKILL'
+    print(f"{args.reminders} reminders, {args.workers} workers, {kills} kills ({mode})")
+    print(f"  delivered: {len(delivered)}, lost: {lost}, duplicate sends: {duplicates}")
+    return 1 if lost or (args.graceful and duplicates) else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--reminders', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30, help='seconds over which reminders fall due')
+    parser.add_argument('--kill-every', type=float, default=4)
+    parser.add_argument('--restart-delay', type=float, default=1)
+    parser.add_argument('--latency', type=float, default=0.01, help='fake API latency, seconds')
+    parser.add_argument('--graceful', action='store_true', help='stop workers with SIGTERM')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.worker:
+        asyncio.run(run_worker())
+    else:
+        sys.exit(asyncio.run(supervise(args)))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -1,5 +1,6 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import os
+import socket
 from dotenv import load_dotenv
 import sys
 
@@ -9,13 +10,155 @@ class Config:
     DATABASE_URL: str = 'sqlite:///reminder_bot.db'
     DEFAULT_TIMEZONE: str = 'Europe/Kiev'
 
+    # Database connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # SQLite journal and fsync policy; WAL lets readers run beside the writer
+    # and NORMAL only syncs at checkpoints, which WAL keeps crash-safe
+    SQLITE_JOURNAL_MODE: str = 'WAL'
+    SQLITE_SYNCHRONOUS: str = 'NORMAL'
+    # Group commit of reminder writes: seconds the writer waits for more
+    # writes after the first one and most writes per transaction
+    WRITE_BATCH_WINDOW: float = 0.002
+    WRITE_BATCH_SIZE: int = 500
+    # Embedded store (DATABASE_URL=memory:///path/to/dir): seconds a journal
+    # write waits for more records, 'off' to skip fsync (writes still reach
+    # the OS, so only a machine crash loses them) and journal records
+    # between snapshots
+    JOURNAL_SYNC_WINDOW: float = 0.0
+    JOURNAL_FSYNC: str = 'batch'
+    JOURNAL_SNAPSHOT_RECORDS: int = 100000
+
+    # Scheduler: seconds of reminders kept in memory, rows per DB batch and
+    # how late an overdue reminder may still be delivered after a restart
+    SCHEDULER_WINDOW: int = 3600
+    SCHEDULER_BATCH_SIZE: int = 1000
+    SCHEDULER_MISSED_GRACE: int = 900
+    # Longest the dispatch engine sleeps between deadline checks, seconds
+    DISPATCH_TICK: float = 1.0
+
+    # Outbound delivery: Bot API limits (messages per second), due batches
+    # buffered ahead of the sender and retry policy for failed sends
+    DELIVERY_GLOBAL_RATE: float = 30.0
+    DELIVERY_CHAT_RATE: float = 1.0
+    DELIVERY_QUEUE_SIZE: int = 100
+    DELIVERY_MAX_RETRIES: int = 5
+    DELIVERY_RETRY_DELAY: float = 30.0
+    # Seconds delivery waits to combine a chat's reminders due together into
+    # one message (0 only combines those handed over at once), and the most
+    # reminders per combined message
+    DELIVERY_COALESCE_WINDOW: float = 0.5
+    DELIVERY_COALESCE_MAX: int = 10
+
+    # Retention: seconds between archive runs (0 disables), rows moved per
+    # transaction, days archived reminders are kept and pages freed per run.
+    # SQLite files created without incremental auto-vacuum are only
+    # converted, with a full VACUUM before the bot starts, when
+    # ARCHIVE_VACUUM_CONVERT is set
+    ARCHIVE_INTERVAL: int = 3600
+    ARCHIVE_BATCH_SIZE: int = 5000
+    ARCHIVE_RETENTION_DAYS: int = 90
+    ARCHIVE_VACUUM_PAGES: int = 2000
+    ARCHIVE_VACUUM_CONVERT: bool = False
+
+    # Update delivery: 'polling' or 'webhook'. Webhook mode serves
+    # WEBHOOK_URL/WEBHOOK_PATH from an embedded server on WEBHOOK_LISTEN:WEBHOOK_PORT
+    RUN_MODE: str = 'polling'
+    WEBHOOK_URL: Optional[str] = None
+    WEBHOOK_LISTEN: str = '0.0.0.0'
+    WEBHOOK_PORT: int = 8443
+    WEBHOOK_PATH: str = 'telegram'
+    WEBHOOK_SECRET_TOKEN: Optional[str] = None
+    WEBHOOK_MAX_CONNECTIONS: int = 40
+    # Updates handled in parallel (one at a time per chat), updates taken
+    # but not yet finished before polling or the webhook wait, and HTTP
+    # connections to the Bot API
+    CONCURRENT_UPDATES: int = 8
+    MAX_PENDING_UPDATES: int = 256
+    CONNECTION_POOL_SIZE: int = 16
+    # Alternative Bot API server, e.g. a self-hosted one
+    BOT_API_BASE_URL: Optional[str] = None
+
+    # Inbound flood control, per user and kind of update (a command by name,
+    # 'callback' for button presses, 'document' for files sent to /import,
+    # 'default' for the rest): updates
+    # allowed per second and in a burst, 0 per second for no limit. Users
+    # whose buckets are kept (bounds memory; 0 disables flood control) and
+    # seconds an excess update may wait for a token, holding one of
+    # CONCURRENT_UPDATES, before it is dropped
+    FLOOD_LIMITS: Dict[str, Tuple[float, int]] = {
+        'new': (0.2, 5),
+        'list': (0.5, 5),
+        'export': (0.05, 3),
+        'document': (0.05, 3),
+        'callback': (2.0, 10),
+        'default': (1.0, 10),
+    }
+    FLOOD_TRACKED_USERS: int = 100000
+    FLOOD_MAX_DELAY: float = 0.0
+
+    # Conversation, user and chat data: seconds between hand-overs from the
+    # application and between flushes, and pending entries forcing a flush
+    PERSISTENCE_INTERVAL: float = 5.0
+    PERSISTENCE_FLUSH_SIZE: int = 500
+
+    # Prometheus metrics served on http://METRICS_HOST:METRICS_PORT/metrics;
+    # 0 disables the endpoint
+    METRICS_HOST: str = '127.0.0.1'
+    METRICS_PORT: int = 0
+
+    # Updates taking longer than this many seconds are logged with the time
+    # spent parsing, in the database and sending; 0 disables tracing
+    SLOW_UPDATE_THRESHOLD: float = 1.0
+    # Sampling profiler, started by SIGUSR1 or /profile [seconds] from one
+    # of ADMIN_IDS: default and longest session, seconds between samples
+    # and where collapsed-stack files are written
+    ADMIN_IDS: List[int] = []
+    PROFILE_SECONDS: float = 30.0
+    PROFILE_MAX_SECONDS: float = 300.0
+    PROFILE_INTERVAL: float = 0.01
+    PROFILE_DIR: str = 'profiles'
+
+    # Seconds after delivery a reminder can still be snoozed; the retention
+    # service archives fired reminders only once this has passed
+    SNOOZE_WINDOW: int = 86400
+
+    # Reminders shown per /list page, 1 to 40
+    LIST_PAGE_SIZE: int = 10
+    # /import and /export: rows per database batch (and scheduler batch on
+    # import) and most rows read from one imported file
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_MAX_ROWS: int = 50000
+    # Cache of users' pending reminders: reminders kept over all users
+    # (caps memory) and seconds a user's entry lives; 0 disables it
+    REMINDER_CACHE_ROWS: int = 50000
+    REMINDER_CACHE_TTL: float = 60.0
+
+    # Multi-worker deployments: every process gets a unique WORKER_ID and
+    # owns the users with user_id % WORKER_COUNT == WORKER_INDEX. Due
+    # reminders are leased for CLAIM_LEASE seconds while being sent and
+    # reminders overdue by more than that are taken over from dead workers
+    WORKER_ID: str = f'{socket.gethostname()}-{os.getpid()}'
+    WORKER_COUNT: int = 1
+    WORKER_INDEX: int = 0
+    CLAIM_LEASE: int = 60
+    CLAIM_SWEEP_INTERVAL: float = 5.0
+
+    # Set once load_environment has run; importing this module reads nothing,
+    # entry points and the database layer call load() on first use
+    _loaded: bool = False
+
     # Command list
     COMMANDS: Dict[str, str] = {
         'start': 'Почати роботу з ботом',
         'help': 'Показати довідку',
         'new': 'Створити нове нагадування',
         'list': 'Показати всі активні нагадування',
-        'cancel': 'Скасувати поточну операцію'
+        'cancel': 'Скасувати поточну операцію',
+        'timezone': 'Встановити часовий пояс',
+        'export': 'Вивантажити нагадування у файл',
+        'import': 'Завантажити нагадування з файлу'
     }
 
     # Message texts
@@ -27,6 +170,9 @@ class Config:
         'help': """Доступні команди:
 /new - Створити нове нагадування
 /list - Показати всі активні нагадування
+/timezone - Показати або змінити часовий пояс
+/export - Вивантажити нагадування у файл CSV (або /export jsonl)
+/import - Завантажити нагадування з файлу
 /cancel - Скасувати поточну операцію""",
         'reminder_text': 'Введіть текст нагадування:',
         'choose_time': 'Оберіть спосіб встановлення часу:',
@@ -35,12 +181,34 @@ class Config:
         'invalid_time': 'Невірний формат часу. Спробуйте ще раз.',
         'reminder_set': 'Нагадування встановлено на {}',
         'no_active_reminders': 'У вас немає активних нагадувань',
+        'list_header': 'Ваші активні нагадування:\n',
         'operation_cancelled': 'Операцію скасовано',
         'invalid_operation': 'Немає активних операцій для скасування.',
         'reminder_deleted': 'Нагадування видалено.',
         'reminder_not_found': 'Помилка: нагадування не знайдено.',
-        'enter_snooze_time': 'На скільки часу відкласти нагадування?',
-        'reminder_management': 'Що бажаєте зробити з цим нагадуванням?'
+        'enter_snooze_time': 'На скільки часу відкласти нагадування? (наприклад: 30хв, 2 години або 18:00)',
+        'reminder_snoozed': '⏰ Відкладено до {}',
+        'reminder_item_snoozed': '⏰ «{}» відкладено до {}',
+        'reminder_management': 'Що бажаєте зробити з цим нагадуванням?',
+        'timezone_current': 'Ваш часовий пояс: {}\nЩоб змінити його, надішліть, наприклад, /timezone Europe/Warsaw',
+        'timezone_set': 'Часовий пояс змінено на {}',
+        'timezone_invalid': 'Невідомий часовий пояс. Вкажіть назву на кшталт Europe/Kyiv або America/New_York.',
+        'enter_recurrence': 'Як часто нагадувати? Наприклад: щодня 9:00, по буднях 8:30, '
+                            'щотижня пн 10:00, щомісяця 1 9:00 або правило cron (0 9 * * 1-5)',
+        'invalid_recurrence': 'Не вдалося розпізнати правило повторення. Спробуйте ще раз.',
+        'profile_started': 'Профілювання запущено на {:g} с',
+        'profile_running': 'Профілювання вже триває',
+        'profile_done': 'Профіль готовий: {} вибірок, файл {}',
+        'export_done': 'Нагадувань у файлі: {}',
+        'import_prompt': 'Надішліть файл .csv або .jsonl з колонками time, text, recurrence, timezone. '
+                         'time — «ДД.ММ.РРРР ГГ:ХХ», «ГГ:ХХ» або затримка («2 години»), recurrence — '
+                         'правило повторення замість часу (наприклад, «щодня 9:00»). Файл з /export '
+                         'можна завантажити без змін.',
+        'import_unsupported': 'Підтримуються лише файли .csv та .jsonl',
+        'import_not_requested': 'Щоб завантажити нагадування з файлу, спершу надішліть /import',
+        'import_done': 'Імпортовано нагадувань: {}',
+        'import_errors': 'Пропущено рядків з помилками: {} (рядки {})',
+        'import_truncated': 'Прочитано лише перші {} рядків файлу'
     }
 
     @classmethod
@@ -53,13 +221,101 @@ class Config:
             sys.exit(1)
 
         cls.BOT_TOKEN = os.getenv('BOT_TOKEN')
-        if not cls.BOT_TOKEN:
-            print("No BOT_TOKEN found in .env file")
-            sys.exit(1)
-        
+        cls.RUN_MODE = os.getenv('RUN_MODE', cls.RUN_MODE).lower()
+        cls.WEBHOOK_URL = os.getenv('WEBHOOK_URL', cls.WEBHOOK_URL)
+        cls.WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', cls.WEBHOOK_LISTEN)
+        cls.WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', cls.WEBHOOK_PORT)))
+        cls.WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', cls.WEBHOOK_PATH).strip('/')
+        cls.WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', cls.WEBHOOK_SECRET_TOKEN)
+        cls.WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', cls.WEBHOOK_MAX_CONNECTIONS))
+        cls.CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', cls.CONCURRENT_UPDATES))
+        cls.MAX_PENDING_UPDATES = int(os.getenv('MAX_PENDING_UPDATES', cls.MAX_PENDING_UPDATES))
+        cls.CONNECTION_POOL_SIZE = int(os.getenv('CONNECTION_POOL_SIZE', cls.CONNECTION_POOL_SIZE))
+        cls.BOT_API_BASE_URL = os.getenv('BOT_API_BASE_URL', cls.BOT_API_BASE_URL)
+
         db_url = os.getenv('DATABASE_URL')
         if db_url:
             cls.DATABASE_URL = db_url
 
-# Load environment variables on module import
-Config.load_environment()
\ No newline at end of file
+        cls.DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', cls.DB_POOL_SIZE))
+        cls.DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', cls.DB_MAX_OVERFLOW))
+        cls.DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', cls.DB_POOL_TIMEOUT))
+        cls.SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', cls.SQLITE_JOURNAL_MODE)
+        cls.SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', cls.SQLITE_SYNCHRONOUS)
+        cls.WRITE_BATCH_WINDOW = float(os.getenv('WRITE_BATCH_WINDOW', cls.WRITE_BATCH_WINDOW))
+        cls.WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', cls.WRITE_BATCH_SIZE))
+        cls.JOURNAL_SYNC_WINDOW = float(os.getenv('JOURNAL_SYNC_WINDOW', cls.JOURNAL_SYNC_WINDOW))
+        cls.JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', cls.JOURNAL_FSYNC).lower()
+        cls.JOURNAL_SNAPSHOT_RECORDS = int(os.getenv('JOURNAL_SNAPSHOT_RECORDS', cls.JOURNAL_SNAPSHOT_RECORDS))
+        cls.SCHEDULER_WINDOW = int(os.getenv('SCHEDULER_WINDOW', cls.SCHEDULER_WINDOW))
+        cls.SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', cls.SCHEDULER_BATCH_SIZE))
+        cls.SCHEDULER_MISSED_GRACE = int(os.getenv('SCHEDULER_MISSED_GRACE', cls.SCHEDULER_MISSED_GRACE))
+        cls.DISPATCH_TICK = float(os.getenv('DISPATCH_TICK', cls.DISPATCH_TICK))
+        cls.DELIVERY_GLOBAL_RATE = float(os.getenv('DELIVERY_GLOBAL_RATE', cls.DELIVERY_GLOBAL_RATE))
+        cls.DELIVERY_CHAT_RATE = float(os.getenv('DELIVERY_CHAT_RATE', cls.DELIVERY_CHAT_RATE))
+        cls.DELIVERY_QUEUE_SIZE = int(os.getenv('DELIVERY_QUEUE_SIZE', cls.DELIVERY_QUEUE_SIZE))
+        cls.DELIVERY_MAX_RETRIES = int(os.getenv('DELIVERY_MAX_RETRIES', cls.DELIVERY_MAX_RETRIES))
+        cls.DELIVERY_RETRY_DELAY = float(os.getenv('DELIVERY_RETRY_DELAY', cls.DELIVERY_RETRY_DELAY))
+        cls.DELIVERY_COALESCE_WINDOW = float(os.getenv('DELIVERY_COALESCE_WINDOW', cls.DELIVERY_COALESCE_WINDOW))
+        cls.DELIVERY_COALESCE_MAX = int(os.getenv('DELIVERY_COALESCE_MAX', cls.DELIVERY_COALESCE_MAX))
+        cls.ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', cls.ARCHIVE_INTERVAL))
+        cls.ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', cls.ARCHIVE_BATCH_SIZE))
+        cls.ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', cls.ARCHIVE_RETENTION_DAYS))
+        cls.ARCHIVE_VACUUM_PAGES = int(os.getenv('ARCHIVE_VACUUM_PAGES', cls.ARCHIVE_VACUUM_PAGES))
+        cls.ARCHIVE_VACUUM_CONVERT = os.getenv(
+            'ARCHIVE_VACUUM_CONVERT', str(cls.ARCHIVE_VACUUM_CONVERT)
+        ).lower() in ('1', 'true', 'yes')
+        flood_limits = os.getenv('FLOOD_LIMITS')
+        if flood_limits:
+            # e.g. "new=0.2/5, callback=2/10": per second/burst, merged with the defaults
+            cls.FLOOD_LIMITS = dict(cls.FLOOD_LIMITS)
+            for item in flood_limits.replace(',', ' ').split():
+                kind, _, limit = item.partition('=')
+                rate, _, burst = limit.partition('/')
+                cls.FLOOD_LIMITS[kind.strip().lower()] = (float(rate), int(burst or 1))
+        cls.FLOOD_TRACKED_USERS = int(os.getenv('FLOOD_TRACKED_USERS', cls.FLOOD_TRACKED_USERS))
+        cls.FLOOD_MAX_DELAY = float(os.getenv('FLOOD_MAX_DELAY', cls.FLOOD_MAX_DELAY))
+        cls.PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', cls.PERSISTENCE_INTERVAL))
+        cls.PERSISTENCE_FLUSH_SIZE = int(os.getenv('PERSISTENCE_FLUSH_SIZE', cls.PERSISTENCE_FLUSH_SIZE))
+        cls.METRICS_HOST = os.getenv('METRICS_HOST', cls.METRICS_HOST)
+        cls.METRICS_PORT = int(os.getenv('METRICS_PORT', cls.METRICS_PORT))
+        cls.SLOW_UPDATE_THRESHOLD = float(os.getenv('SLOW_UPDATE_THRESHOLD', cls.SLOW_UPDATE_THRESHOLD))
+        admin_ids = os.getenv('ADMIN_IDS')
+        if admin_ids:
+            cls.ADMIN_IDS = [int(user_id) for user_id in admin_ids.replace(',', ' ').split()]
+        cls.PROFILE_SECONDS = float(os.getenv('PROFILE_SECONDS', cls.PROFILE_SECONDS))
+        cls.PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', cls.PROFILE_MAX_SECONDS))
+        cls.PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', cls.PROFILE_INTERVAL))
+        cls.PROFILE_DIR = os.getenv('PROFILE_DIR', cls.PROFILE_DIR)
+        cls.SNOOZE_WINDOW = int(os.getenv('SNOOZE_WINDOW', cls.SNOOZE_WINDOW))
+        cls.LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', cls.LIST_PAGE_SIZE))
+        cls.IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', cls.IMPORT_BATCH_SIZE))
+        cls.IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', cls.IMPORT_MAX_ROWS))
+        cls.REMINDER_CACHE_ROWS = int(os.getenv('REMINDER_CACHE_ROWS', cls.REMINDER_CACHE_ROWS))
+        cls.REMINDER_CACHE_TTL = float(os.getenv('REMINDER_CACHE_TTL', cls.REMINDER_CACHE_TTL))
+        cls.WORKER_ID = os.getenv('WORKER_ID', cls.WORKER_ID)
+        cls.WORKER_COUNT = int(os.getenv('WORKER_COUNT', cls.WORKER_COUNT))
+        cls.WORKER_INDEX = int(os.getenv('WORKER_INDEX', cls.WORKER_INDEX))
+        cls.CLAIM_LEASE = int(os.getenv('CLAIM_LEASE', cls.CLAIM_LEASE))
+        cls.CLAIM_SWEEP_INTERVAL = float(os.getenv('CLAIM_SWEEP_INTERVAL', cls.CLAIM_SWEEP_INTERVAL))
+        cls._loaded = True
+
+    @classmethod
+    def load(cls) -> None:
+        """Load environment variables on first use; later calls do nothing"""
+        if not cls._loaded:
+            cls.load_environment()
+
+    @classmethod
+    def validate(cls) -> None:
+        """Exit if settings the bot cannot run without are missing"""
+        if not cls.BOT_TOKEN:
+            print("No BOT_TOKEN found in .env file")
+            sys.exit(1)
+        if cls.RUN_MODE == 'webhook' and not cls.WEBHOOK_URL:
+            print("RUN_MODE=webhook requires WEBHOOK_URL")
+            sys.exit(1)
+        if not 1 <= cls.LIST_PAGE_SIZE <= 40:
+            # More items would not fit one message with readable texts
+            print("LIST_PAGE_SIZE must be between 1 and 40")
+            sys.exit(1)
\ No newline at end of file
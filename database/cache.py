@@ -0,0 +1,143 @@
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+from config import Config
+
+class _UserEntry:
+    __slots__ = ('version', 'expires_at', 'values', 'rows')
+
+    def __init__(self, version: int, expires_at: float):
+        self.version = version
+        self.expires_at = expires_at
+        self.values: Dict[Hashable, Any] = {}
+        # The entry itself counts as one row
+        self.rows = 1
+
+class ReminderCache:
+    """Bounded LRU/TTL cache of per-user query results: pending reminders and settings
+
+    Entries are grouped per user, so a write touching a user drops exactly
+    that user's results. Memory is capped by `max_rows`, the number of
+    cached reminders over all users plus one per user; the least recently
+    used users are evicted to stay under it. Results expire
+    after `ttl` seconds, which also bounds staleness from writes made by
+    other workers.
+
+    A reader takes a `token` before querying and passes it to `put`; a
+    result is dropped if the user was invalidated meanwhile, so a query
+    racing a write never caches the old state.
+    """
+
+    def __init__(self, max_rows: int, ttl: float):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._users: 'OrderedDict[int, _UserEntry]' = OrderedDict()
+        self._versions = itertools.count(1)
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0 and self.ttl > 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, eviction and invalidation counters and current size"""
+        return {
+            'users': len(self._users),
+            'rows': self.rows,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def get(self, user_id: int, key: Hashable) -> Optional[Any]:
+        entry = self._entry(user_id)
+        if entry is None or key not in entry.values:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._users.move_to_end(user_id)
+        return entry.values[key]
+
+    def find(self, user_id: int, predicate) -> Optional[Any]:
+        """First cached reminder of the user matching `predicate`"""
+        entry = self._entry(user_id)
+        if entry is not None:
+            for value in entry.values.values():
+                for reminder in self._reminders(value):
+                    if predicate(reminder):
+                        self.hits += 1
+                        return reminder
+        self.misses += 1
+        return None
+
+    def token(self, user_id: int) -> int:
+        """Version of the user's entry to pass to `put` after querying"""
+        if not self.enabled:
+            return 0
+        entry = self._entry(user_id)
+        if entry is None:
+            entry = self._users[user_id] = _UserEntry(next(self._versions), time.monotonic() + self.ttl)
+            self.rows += entry.rows
+            self._evict()
+        return entry.version
+
+    def put(self, user_id: int, key: Hashable, value: Any, token: int) -> None:
+        entry = self._users.get(user_id)
+        if entry is None or entry.version != token:
+            return
+        rows = len(self._reminders(value))
+        if key in entry.values:
+            rows -= len(self._reminders(entry.values[key]))
+        entry.values[key] = value
+        entry.rows += rows
+        self.rows += rows
+        self._users.move_to_end(user_id)
+        self._evict()
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        """Drop everything cached about these users"""
+        for user_id in set(user_ids):
+            entry = self._users.pop(user_id, None)
+            if entry is not None:
+                self.rows -= entry.rows
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._users.clear()
+        self.rows = 0
+
+    def _evict(self) -> None:
+        while self.rows > self.max_rows and self._users:
+            _, evicted = self._users.popitem(last=False)
+            self.rows -= evicted.rows
+            self.evictions += 1
+
+    def _entry(self, user_id: int) -> Optional[_UserEntry]:
+        entry = self._users.get(user_id)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._users[user_id]
+            self.rows -= entry.rows
+            entry = None
+        return entry
+
+    @staticmethod
+    def _reminders(value: Any) -> List[Any]:
+        # Cached values are reminder lists, (reminders, more) pages or settings
+        if isinstance(value, tuple):
+            value = value[0]
+        return value if isinstance(value, list) else []
+
+_cache: Optional[ReminderCache] = None
+
+def get_reminder_cache() -> ReminderCache:
+    """Return the process-wide reminder cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        _cache = ReminderCache(Config.REMINDER_CACHE_ROWS, Config.REMINDER_CACHE_TTL)
+    return _cache
\ No newline at end of file
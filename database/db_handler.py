@@ -1,11 +1,41 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-from config import DATABASE_URL
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index, Select, and_, event, or_, select, delete, insert, update, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from datetime import datetime, timedelta
+import logging
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+import pytz
+from config import Config
+from database.cache import get_reminder_cache
+from utils.metrics import DB_ERRORS, DB_SECONDS, instrument
+from utils.profiling import trace_phase
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Sync drivers from DATABASE_URL mapped onto their asyncio counterparts
+ASYNC_DRIVERS: Dict[str, str] = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+# DATABASE_URL prefix selecting the embedded store in database.memory_store;
+# the rest is its directory, none keeps everything in memory only
+MEMORY_SCHEME = 'memory://'
+
+# (worker count, worker index) used to partition users between workers
+Shard = Tuple[int, int]
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+# Whether init_db has checked the schema of the current engine
+_schema_ready = False
+
 class Reminder(Base):
     __tablename__ = 'reminders'
 
@@ -15,59 +45,637 @@ class Reminder(Base):
     reminder_time = Column(DateTime, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Delivery lease held by the worker currently sending the reminder
+    claimed_by = Column(String)
+    lease_expires_at = Column(DateTime)
+    # Cron rule of a recurring reminder, evaluated in `timezone`; for those
+    # reminder_time is the next occurrence and is advanced after each delivery
+    recurrence = Column(String)
+    timezone = Column(String)
+
+    # Partial indexes cover only pending rows, so fired history does not
+    # slow down /list or the due scan; other dialects get plain indexes
+    __table_args__ = (
+        Index(
+            'ix_reminders_user_active_time', 'user_id', 'reminder_time', 'id',
+            sqlite_where=is_active == True, postgresql_where=is_active == True
+        ),
+        Index(
+            'ix_reminders_active_time', 'reminder_time', 'id',
+            sqlite_where=is_active == True, postgresql_where=is_active == True
+        ),
+    )
+
+# Columns set when reminders are inserted in bulk
+INSERT_COLUMNS = ('user_id', 'text', 'reminder_time', 'is_active', 'created_at', 'recurrence', 'timezone')
+
+class ArchivedReminder(Base):
+    """Fired reminders moved out of the hot table by the retention service"""
+    __tablename__ = 'reminders_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    text = Column(String, nullable=False)
+    reminder_time = Column(DateTime, nullable=False)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class UserSettings(Base):
+    """Per-user preferences; users without a row get the defaults"""
+    __tablename__ = 'user_settings'
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    timezone = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PersistedData(Base):
+    """JSON snapshots of bot, user, chat and conversation data"""
+    __tablename__ = 'persisted_data'
+
+    namespace = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    data = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def active_reminders_query(user_id: int, now: datetime) -> Select:
+    """Pending reminders of one user, served by ix_reminders_user_active_time"""
+    return select(Reminder).where(
+        Reminder.user_id == user_id,
+        Reminder.is_active == True,
+        Reminder.reminder_time > now
+    ).order_by(Reminder.reminder_time, Reminder.id)
+
+# Position of a reminder in /list order, used as a keyset pagination cursor
+ListCursor = Tuple[datetime, int]
 
+def reminders_page_query(
+    user_id: int,
+    now: datetime,
+    limit: int,
+    after: Optional[ListCursor] = None,
+    before: Optional[ListCursor] = None
+) -> Select:
+    """One /list page after or before a cursor; rows come newest first for `before`"""
+    key = tuple_(Reminder.reminder_time, Reminder.id)
+    # A single lower bound on reminder_time lets the index seek straight to
+    # the cursor; the row value comparison then only breaks ties
+    if after is not None and after[0] > now:
+        query = select(Reminder).where(
+            Reminder.user_id == user_id,
+            Reminder.is_active == True,
+            Reminder.reminder_time >= after[0]
+        ).order_by(Reminder.reminder_time, Reminder.id)
+    else:
+        query = active_reminders_query(user_id, now)
+    if before is not None:
+        query = query.where(Reminder.reminder_time <= before[0], key < before).order_by(None).order_by(
+            Reminder.reminder_time.desc(), Reminder.id.desc()
+        )
+    elif after is not None:
+        query = query.where(key > after)
+    return query.limit(limit)
+
+def due_reminders_query(now: datetime) -> Select:
+    """Pending reminders due at `now`, served by ix_reminders_active_time"""
+    return select(Reminder).where(
+        Reminder.is_active == True,
+        Reminder.reminder_time <= now
+    ).order_by(Reminder.reminder_time, Reminder.id)
+
+def shard_filter(shard: Optional[Shard]):
+    """Restrict a query to the users owned by one worker"""
+    if shard is None or shard[0] <= 1:
+        return None
+    count, index = shard
+    return Reminder.user_id % count == index
+
+def claimable_filter(worker_id: str, now: datetime):
+    """Due, active and not leased by another live worker"""
+    return and_(
+        Reminder.is_active == True,
+        Reminder.reminder_time <= now,
+        or_(
+            Reminder.lease_expires_at == None,
+            Reminder.lease_expires_at < now,
+            Reminder.claimed_by == worker_id
+        )
+    )
+
+def to_utc(dt: datetime) -> datetime:
+    """Normalize datetime to naive UTC as stored in the database"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(pytz.utc).replace(tzinfo=None)
+    return dt
+
+def get_async_url(database_url: str) -> str:
+    """Convert configured database URL to its asyncio driver variant"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver:
+        url = url.set(drivername=driver)
+    return url.render_as_string(hide_password=False)
+
+def get_engine() -> AsyncEngine:
+    """Return the process-wide pooled async engine, creating it on first use"""
+    global _engine, _sessionmaker
+    if _engine is None:
+        Config.load()
+        url = make_url(get_async_url(Config.DATABASE_URL))
+        options = {}
+        if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_MAX_OVERFLOW,
+                pool_timeout=Config.DB_POOL_TIMEOUT,
+                pool_pre_ping=url.get_backend_name() != 'sqlite'
+            )
+        _engine = create_async_engine(url, **options)
+        if url.get_backend_name() == 'sqlite':
+            event.listen(_engine.sync_engine, 'connect', _configure_sqlite)
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+def _configure_sqlite(dbapi_connection, connection_record) -> None:
+    """Per-connection SQLite settings"""
+    cursor = dbapi_connection.cursor()
+    # Only takes effect on a fresh file; see RetentionService.convert_to_incremental
+    cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    cursor.execute(f'PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}')
+    cursor.close()
+
+def get_sessionmaker() -> async_sessionmaker:
+    """Return session factory bound to the shared engine"""
+    get_engine()
+    return _sessionmaker
+
+def uses_memory_store() -> bool:
+    """Whether DATABASE_URL selects the embedded journaled store instead of SQL"""
+    Config.load()
+    return Config.DATABASE_URL.startswith(MEMORY_SCHEME)
+
+async def dispose_engine() -> None:
+    """Close all pooled connections, or sync and snapshot the embedded store"""
+    global _engine, _sessionmaker, _schema_ready
+    if uses_memory_store():
+        from database.memory_store import close_memory_store
+        await close_memory_store()
+    _schema_ready = False
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _sessionmaker = None
+
+@trace_phase('db', skip=('close',))
+@instrument(DB_SECONDS, DB_ERRORS, skip=('close',))
 class DatabaseHandler:
+    """Asyncio data layer; every operation runs in its own short-lived session
+
+    Reads of a user's pending reminders go through the process-wide
+    ReminderCache; every write that changes them invalidates the users
+    it touched. With a memory:// DATABASE_URL the handler is a
+    MemoryDatabaseHandler with the same interface.
+    """
+
+    def __new__(cls):
+        if cls is DatabaseHandler and uses_memory_store():
+            from database.memory_store import MemoryDatabaseHandler
+            cls = MemoryDatabaseHandler
+        return super().__new__(cls)
+
     def __init__(self):
-        self.engine = create_engine(DATABASE_URL)
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        self.session_factory = get_sessionmaker()
+        self.cache = get_reminder_cache()
+
+    async def __aenter__(self) -> 'DatabaseHandler':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    @staticmethod
+    async def init_db() -> None:
+        """Create database schema and apply pending migrations, once per engine"""
+        global _schema_ready
+        if uses_memory_store():
+            from database.memory_store import get_memory_store
+            await get_memory_store().open()
+            return
+        if _schema_ready:
+            return
+        from database.migrations import run_migrations
+        async with get_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(run_migrations)
+
+        if get_engine().dialect.name == 'sqlite':
+            for name, plan in (await DatabaseHandler.explain_hot_paths()).items():
+                if 'INDEX' not in plan:
+                    logger.warning(f"Query {name} does not use an index: {plan}")
+        _schema_ready = True
 
-    def add_reminder(self, user_id: int, text: str, reminder_time: datetime) -> Reminder:
+    @staticmethod
+    async def explain_hot_paths() -> Dict[str, str]:
+        """Return SQLite query plans of /list and the due scan"""
+        now = datetime.utcnow()
+        queries = {
+            'active_reminders': active_reminders_query(0, now),
+            'reminders_page': reminders_page_query(0, now, 10, after=(now + timedelta(days=1), 0)),
+            'due_reminders': due_reminders_query(now),
+        }
+        plans = {}
+        async with get_engine().connect() as conn:
+            for name, query in queries.items():
+                compiled = query.compile(dialect=conn.dialect)
+                params = tuple(compiled.params[key] for key in compiled.positiontup)
+                rows = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params)
+                plans[name] = '; '.join(row[-1] for row in rows)
+        return plans
+
+    async def add_reminder(
+        self,
+        user_id: int,
+        text: str,
+        reminder_time: datetime,
+        recurrence: Optional[str] = None,
+        timezone: Optional[str] = None
+    ) -> Reminder:
         """Add new reminder to database"""
         reminder = Reminder(
             user_id=user_id,
             text=text,
-            reminder_time=reminder_time
+            reminder_time=to_utc(reminder_time),
+            recurrence=recurrence,
+            timezone=timezone
         )
-        self.session.add(reminder)
-        self.session.commit()
+        async with self.session_factory.begin() as session:
+            session.add(reminder)
+        self.cache.invalidate([user_id])
         return reminder
 
-    def get_active_reminders(self, user_id: int) -> list:
+    async def get_user_timezone(self, user_id: int) -> Optional[str]:
+        """Timezone chosen by the user, None for the default"""
+        timezone = self.cache.get(user_id, 'timezone')
+        if timezone is None:
+            token = self.cache.token(user_id)
+            async with self.session_factory() as session:
+                timezone = await session.scalar(
+                    select(UserSettings.timezone).where(UserSettings.user_id == user_id)
+                ) or ''
+            self.cache.put(user_id, 'timezone', timezone, token)
+        return timezone or None
+
+    async def set_user_timezone(self, user_id: int, timezone: Optional[str]) -> None:
+        """Store the user's timezone; None resets it to the default"""
+        async with self.session_factory.begin() as session:
+            await session.merge(UserSettings(user_id=user_id, timezone=timezone))
+        self.cache.invalidate([user_id])
+
+    async def load_persisted(self, namespace: str) -> Dict[str, str]:
+        """Serialized entries of one persistence namespace by key"""
+        async with self.session_factory() as session:
+            rows = await session.execute(
+                select(PersistedData.key, PersistedData.data).where(PersistedData.namespace == namespace)
+            )
+            return dict(rows.all())
+
+    async def store_persisted(self, entries: Dict[Tuple[str, str], Optional[str]]) -> None:
+        """Write many (namespace, key) entries in one transaction; None deletes
+
+        Rows are replaced with one DELETE and one multi-row INSERT per
+        namespace, which works the same on every dialect.
+        """
+        by_namespace: Dict[str, Dict[str, Optional[str]]] = {}
+        for (namespace, key), data in entries.items():
+            by_namespace.setdefault(namespace, {})[key] = data
+        now = datetime.utcnow()
+        async with self.session_factory.begin() as session:
+            for namespace, items in by_namespace.items():
+                await session.execute(delete(PersistedData).where(
+                    PersistedData.namespace == namespace,
+                    PersistedData.key.in_(list(items))
+                ))
+                rows = [
+                    {'namespace': namespace, 'key': key, 'data': data, 'updated_at': now}
+                    for key, data in items.items() if data is not None
+                ]
+                if rows:
+                    await session.execute(insert(PersistedData), rows)
+
+    async def get_reminder(self, reminder_id: int) -> Optional[Reminder]:
+        """Get reminder by id"""
+        async with self.session_factory() as session:
+            return await session.get(Reminder, reminder_id)
+
+    async def get_user_reminder(self, user_id: int, reminder_id: int) -> Optional[Reminder]:
+        """A pending reminder of the user, from the cache when it is on a cached page"""
+        reminder = self.cache.find(user_id, lambda cached: cached.id == reminder_id)
+        if reminder is None:
+            reminder = await self.get_reminder(reminder_id)
+            if reminder is None or reminder.user_id != user_id or not reminder.is_active:
+                return None
+        return reminder
+
+    async def get_active_reminders(self, user_id: int) -> list:
         """Get all active reminders for user"""
-        return self.session.query(Reminder).filter(
-            Reminder.user_id == user_id,
-            Reminder.is_active == True,
-            Reminder.reminder_time > datetime.utcnow()
-        ).all()
+        reminders = self.cache.get(user_id, 'all')
+        if reminders is None:
+            token = self.cache.token(user_id)
+            async with self.session_factory() as session:
+                result = await session.scalars(active_reminders_query(user_id, datetime.utcnow()))
+                reminders = list(result)
+            self.cache.put(user_id, 'all', reminders, token)
+        return reminders
 
-    def get_due_reminders(self) -> list:
-        """Get all due reminders"""
-        return self.session.query(Reminder).filter(
-            Reminder.is_active == True,
-            Reminder.reminder_time <= datetime.utcnow()
-        ).all()
+    async def get_reminders_page(
+        self,
+        user_id: int,
+        limit: int,
+        after: Optional[ListCursor] = None,
+        before: Optional[ListCursor] = None
+    ) -> Tuple[List[Reminder], bool]:
+        """Up to `limit` active reminders next to a cursor, plus whether more follow
 
-    def deactivate_reminder(self, reminder_id: int):
+        The cost depends on the page size only, not on how many reminders
+        the user has.
+        """
+        key = ('page', limit, after, before)
+        page = self.cache.get(user_id, key)
+        if page is not None:
+            return page
+        token = self.cache.token(user_id)
+        query = reminders_page_query(user_id, datetime.utcnow(), limit + 1, after=after, before=before)
+        async with self.session_factory() as session:
+            reminders = list(await session.scalars(query))
+        more = len(reminders) > limit
+        reminders = reminders[:limit]
+        if before is not None:
+            reminders.reverse()
+        self.cache.put(user_id, key, (reminders, more), token)
+        return reminders, more
+
+    async def iter_user_reminders(self, user_id: int, batch_size: int = 1000) -> AsyncIterator[List[Reminder]]:
+        """Stream a user's pending reminders in /list order, bypassing the cache
+
+        Each batch is one keyset-paginated query, so exporting a large list
+        holds a single batch at a time.
+        """
+        now = datetime.utcnow()
+        cursor: Optional[ListCursor] = None
+        while True:
+            query = reminders_page_query(user_id, now, batch_size, after=cursor)
+            async with self.session_factory() as session:
+                batch = list(await session.scalars(query))
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            cursor = (batch[-1].reminder_time, batch[-1].id)
+
+    async def get_due_reminders(
+        self,
+        reminder_ids: Optional[List[int]] = None,
+        limit: Optional[int] = None
+    ) -> list:
+        """Get due reminders, optionally restricted to the given ids"""
+        query = due_reminders_query(datetime.utcnow())
+        if reminder_ids is not None:
+            query = query.where(Reminder.id.in_(reminder_ids))
+        if limit is not None:
+            query = query.limit(limit)
+        async with self.session_factory() as session:
+            return list(await session.scalars(query))
+
+    async def get_claimable_ids(
+        self,
+        worker_id: str,
+        limit: int,
+        shard: Optional[Shard] = None,
+        takeover_after: Optional[timedelta] = None
+    ) -> List[int]:
+        """Ids of due reminders this worker may claim
+
+        Covers the worker's own shard plus, with `takeover_after`, reminders
+        of any shard that have been overdue for that long (their owner is
+        presumed dead).
+        """
+        now = datetime.utcnow()
+        query = select(Reminder.id).where(claimable_filter(worker_id, now))
+        own = shard_filter(shard)
+        if own is not None:
+            if takeover_after is not None:
+                own = or_(own, Reminder.reminder_time < now - takeover_after)
+            query = query.where(own)
+        query = query.order_by(Reminder.reminder_time).limit(limit)
+        async with self.session_factory() as session:
+            return list(await session.scalars(query))
+
+    async def claim_reminders(
+        self,
+        reminder_ids: List[int],
+        worker_id: str,
+        lease: timedelta
+    ) -> List[Reminder]:
+        """Atomically lease due reminders to `worker_id` and return the ones won"""
+        if not reminder_ids:
+            return []
+        now = datetime.utcnow()
+        candidates = (
+            select(Reminder.id)
+            .where(Reminder.id.in_(reminder_ids), claimable_filter(worker_id, now))
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_factory.begin() as session:
+            result = await session.scalars(
+                update(Reminder)
+                .where(Reminder.id.in_(candidates.scalar_subquery()))
+                .values(claimed_by=worker_id, lease_expires_at=now + lease)
+                .returning(Reminder),
+                execution_options={'synchronize_session': False}
+            )
+            return sorted(result, key=lambda r: (r.reminder_time, r.id))
+
+    async def iter_active_reminders(
+        self,
+        until: datetime,
+        since: Optional[datetime] = None,
+        batch_size: int = 1000,
+        shard: Optional[Shard] = None
+    ) -> AsyncIterator[List[Reminder]]:
+        """Stream active reminders due before `until` in keyset-paginated batches"""
+        cursor: Optional[Tuple[datetime, int]] = None
+        own = shard_filter(shard)
+        while True:
+            query = select(Reminder).where(
+                Reminder.is_active == True,
+                Reminder.reminder_time < until
+            )
+            if since is not None:
+                query = query.where(Reminder.reminder_time >= since)
+            if own is not None:
+                query = query.where(own)
+            if cursor is not None:
+                query = query.where(tuple_(Reminder.reminder_time, Reminder.id) > cursor)
+            query = query.order_by(Reminder.reminder_time, Reminder.id).limit(batch_size)
+
+            async with self.session_factory() as session:
+                batch = list(await session.scalars(query))
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            cursor = (batch[-1].reminder_time, batch[-1].id)
+
+    async def deactivate_reminder(self, reminder_id: int) -> bool:
         """Deactivate reminder after it's done"""
-        reminder = self.session.query(Reminder).get(reminder_id)
-        if reminder:
-            reminder.is_active = False
-            self.session.commit()
+        async with self.session_factory.begin() as session:
+            result = await session.execute(
+                update(Reminder)
+                .where(Reminder.id == reminder_id, Reminder.is_active == True)
+                .values(is_active=False)
+                .returning(Reminder.user_id)
+            )
+            user_ids = list(result.scalars())
+        self.cache.invalidate(user_ids)
+        return bool(user_ids)
+
+    async def deactivate_reminders(
+        self,
+        reminder_ids: Iterable[int],
+        claimed_by: Optional[str] = None
+    ) -> int:
+        """Deactivate many reminders in one statement
+
+        With `claimed_by` only rows still leased to that worker are touched.
+        """
+        reminder_ids = list(reminder_ids)
+        if not reminder_ids:
+            return 0
+        query = update(Reminder).where(Reminder.id.in_(reminder_ids), Reminder.is_active == True)
+        if claimed_by is not None:
+            query = query.where(Reminder.claimed_by == claimed_by)
+        async with self.session_factory.begin() as session:
+            result = await session.execute(query.values(is_active=False).returning(Reminder.user_id))
+            user_ids = list(result.scalars())
+        self.cache.invalidate(user_ids)
+        return len(user_ids)
+
+    async def advance_reminders(
+        self,
+        next_times: Dict[datetime, List[int]],
+        claimed_by: Optional[str] = None
+    ) -> int:
+        """Move recurring reminders to their next occurrence and release their lease
 
-    def delete_reminder(self, reminder_id: int, user_id: int) -> bool:
+        `next_times` groups reminder ids by their next fire time, so rules
+        firing together are advanced with one UPDATE per distinct time.
+        """
+        user_ids = []
+        async with self.session_factory.begin() as session:
+            for fire_at, reminder_ids in next_times.items():
+                query = update(Reminder).where(
+                    Reminder.id.in_(reminder_ids),
+                    Reminder.is_active == True
+                )
+                if claimed_by is not None:
+                    query = query.where(Reminder.claimed_by == claimed_by)
+                result = await session.execute(query.values(
+                    reminder_time=to_utc(fire_at),
+                    claimed_by=None,
+                    lease_expires_at=None
+                ).returning(Reminder.user_id))
+                user_ids.extend(result.scalars())
+        self.cache.invalidate(user_ids)
+        return len(user_ids)
+
+    async def apply_writes(
+        self,
+        new_reminders: List[Reminder],
+        deactivations: Iterable[int],
+        deletions: Iterable[Tuple[int, int]],
+        snoozes: Iterable[Tuple[int, int, datetime]] = ()
+    ) -> Tuple[List[Reminder], Set[int], Set[int], Dict[int, Reminder]]:
+        """Insert, deactivate, delete and snooze reminders in one transaction
+
+        `deletions` are (reminder_id, user_id) pairs and `snoozes`
+        (reminder_id, user_id, new time) triples. Returns the inserted
+        reminders with their ids, the ids actually deactivated and deleted
+        and the snoozed reminders by id.
+        """
+        deactivations, deletions = list(deactivations), list(deletions)
+        deactivated, deleted, snoozed = set(), set(), {}
+        user_ids = [reminder.user_id for reminder in new_reminders]
+        async with self.session_factory.begin() as session:
+            if new_reminders:
+                now = datetime.utcnow()
+                for reminder in new_reminders:
+                    reminder.reminder_time = to_utc(reminder.reminder_time)
+                    reminder.is_active = True
+                    reminder.created_at = now
+                # Rows come back in parameter order, across insertmanyvalues pages too
+                result = await session.execute(
+                    insert(Reminder.__table__).returning(Reminder.id, sort_by_parameter_order=True),
+                    [
+                        {column: getattr(reminder, column) for column in INSERT_COLUMNS}
+                        for reminder in new_reminders
+                    ]
+                )
+                for reminder, reminder_id in zip(new_reminders, result.scalars()):
+                    reminder.id = reminder_id
+            if deactivations:
+                result = await session.execute(
+                    update(Reminder)
+                    .where(Reminder.id.in_(deactivations), Reminder.is_active == True)
+                    .values(is_active=False)
+                    .returning(Reminder.id, Reminder.user_id)
+                )
+                for reminder_id, user_id in result:
+                    deactivated.add(reminder_id)
+                    user_ids.append(user_id)
+            if deletions:
+                result = await session.execute(
+                    delete(Reminder)
+                    .where(tuple_(Reminder.id, Reminder.user_id).in_(deletions))
+                    .returning(Reminder.id, Reminder.user_id)
+                )
+                for reminder_id, user_id in result:
+                    deleted.add(reminder_id)
+                    user_ids.append(user_id)
+            for reminder_id, user_id, snooze_until in snoozes:
+                # Moves the row in place, reviving it if it already fired
+                reminder = await session.scalar(
+                    update(Reminder)
+                    .where(Reminder.id == reminder_id, Reminder.user_id == user_id)
+                    .values(
+                        reminder_time=to_utc(snooze_until),
+                        is_active=True,
+                        claimed_by=None,
+                        lease_expires_at=None
+                    )
+                    .returning(Reminder),
+                    execution_options={'synchronize_session': False}
+                )
+                if reminder is not None:
+                    snoozed[reminder_id] = reminder
+                    user_ids.append(user_id)
+        self.cache.invalidate(user_ids)
+        return new_reminders, deactivated, deleted, snoozed
+
+    async def delete_reminder(self, reminder_id: int, user_id: int) -> bool:
         """Delete reminder"""
-        reminder = self.session.query(Reminder).filter(
-            Reminder.id == reminder_id,
-            Reminder.user_id == user_id
-        ).first()
-        if reminder:
-            self.session.delete(reminder)
-            self.session.commit()
-            return True
-        return False
-
-    def close(self):
-        """Close database session"""
-        self.session.close()
\ No newline at end of file
+        async with self.session_factory.begin() as session:
+            result = await session.execute(
+                delete(Reminder).where(
+                    Reminder.id == reminder_id,
+                    Reminder.user_id == user_id
+                )
+            )
+        self.cache.invalidate([user_id])
+        return result.rowcount > 0
+
+    async def close(self) -> None:
+        """Release handler; sessions are returned to the pool per operation"""
+        self.session_factory = None
\ No newline at end of file
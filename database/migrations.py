@@ -0,0 +1,81 @@
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select
+from sqlalchemy.engine import Connection
+from database.db_handler import PersistedData, Reminder, UserSettings
+
+logger = logging.getLogger(__name__)
+
+schema_metadata = MetaData()
+
+schema_version = Table(
+    'schema_version',
+    schema_metadata,
+    Column('version', Integer, nullable=False)
+)
+
+def _index(name: str):
+    return next(index for index in Reminder.__table__.indexes if index.name == name)
+
+def _add_hot_path_indexes(conn: Connection) -> None:
+    """Partial indexes for /list and the due scan on existing databases"""
+    _index('ix_reminders_user_active_time').create(conn, checkfirst=True)
+    _index('ix_reminders_active_time').create(conn, checkfirst=True)
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql('ANALYZE reminders')
+
+def _add_columns(conn: Connection, table: str, *columns: Column) -> None:
+    """ALTER TABLE ADD COLUMN for columns the table does not have yet"""
+    existing = {column['name'] for column in inspect(conn).get_columns(table)}
+    for column in columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column.name} {column_type}')
+
+def _add_delivery_lease(conn: Connection) -> None:
+    """Lease columns used by workers to claim due reminders"""
+    columns = Reminder.__table__.c
+    _add_columns(conn, 'reminders', columns.claimed_by, columns.lease_expires_at)
+
+def _add_user_settings(conn: Connection) -> None:
+    """Table holding per-user timezones"""
+    UserSettings.__table__.create(conn, checkfirst=True)
+
+def _add_recurrence(conn: Connection) -> None:
+    """Rule and timezone columns of recurring reminders"""
+    columns = Reminder.__table__.c
+    _add_columns(conn, 'reminders', columns.recurrence, columns.timezone)
+
+def _add_persisted_data(conn: Connection) -> None:
+    """Table backing the bot's conversation and user data persistence"""
+    PersistedData.__table__.create(conn, checkfirst=True)
+
+# Ordered (version, description, upgrade) steps; append only
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, 'hot path indexes on reminders', _add_hot_path_indexes),
+    (2, 'delivery lease columns', _add_delivery_lease),
+    (3, 'user settings', _add_user_settings),
+    (4, 'recurring reminders', _add_recurrence),
+    (5, 'persisted bot data', _add_persisted_data),
+]
+
+def current_version(conn: Connection) -> int:
+    """Return applied schema version, 0 for databases that predate migrations"""
+    schema_metadata.create_all(conn)
+    version = conn.execute(select(schema_version.c.version)).scalar()
+    if version is None:
+        conn.execute(schema_version.insert().values(version=0))
+        version = 0
+    return version
+
+def run_migrations(conn: Connection) -> int:
+    """Apply pending migrations inside the caller's transaction"""
+    version = current_version(conn)
+    for target, description, upgrade in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info("Applying migration %d: %s", target, description)
+        upgrade(conn)
+        conn.execute(schema_version.update().values(version=target))
+        version = target
+    return version
\ No newline at end of file
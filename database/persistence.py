@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+from telegram.ext import BasePersistence, PersistenceInput
+from config import Config
+from database.db_handler import DatabaseHandler
+
+logger = logging.getLogger(__name__)
+
+ConversationKey = Tuple[int, ...]
+ConversationDict = Dict[ConversationKey, object]
+
+# Namespaces of the persisted_data table
+USER, CHAT, BOT = 'user', 'chat', 'bot'
+CONVERSATION = 'conversation:'
+
+class DatabasePersistence(BasePersistence):
+    """Write-behind persistence for conversations, user and chat data
+
+    Stored in the reminders database. The application hands over changed
+    entries every `Config.PERSISTENCE_INTERVAL` seconds; they are only
+    recorded as dirty, which keeps the cost per update to a dict
+    assignment, and written in one transaction once
+    `Config.PERSISTENCE_FLUSH_SIZE` entries are pending or the flush
+    interval elapses. Whatever is pending is written on shutdown.
+    """
+
+    def __init__(self):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=True, chat_data=True, user_data=True, callback_data=False),
+            update_interval=Config.PERSISTENCE_INTERVAL
+        )
+        self.flush_interval = Config.PERSISTENCE_INTERVAL
+        self.flush_size = Config.PERSISTENCE_FLUSH_SIZE
+        self._dirty: Dict[Tuple[str, str], Any] = {}
+        self._conversations: Dict[str, ConversationDict] = {}
+        self._schema_ready = False
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Pending entries and flush latency"""
+        return {
+            'pending': len(self._dirty),
+            'flushes': self.flushes,
+            'flushed_entries': self.flushed_entries,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms,
+        }
+
+    async def _load(self, namespace: str) -> Dict[str, Any]:
+        if not self._schema_ready:
+            # Persistence is read while the application initializes, before post_init
+            await DatabaseHandler.init_db()
+            self._schema_ready = True
+            self._flush_lock = asyncio.Lock()
+            self._timer = asyncio.create_task(self._flush_loop(), name='persistence_flush')
+        async with DatabaseHandler() as db:
+            rows = await db.load_persisted(namespace)
+        return {key: json.loads(data) for key, data in rows.items()}
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return defaultdict(dict, {int(key): data for key, data in (await self._load(USER)).items()})
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return defaultdict(dict, {int(key): data for key, data in (await self._load(CHAT)).items()})
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return (await self._load(BOT)).get('', {})
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        if name not in self._conversations:
+            stored = await self._load(CONVERSATION + name)
+            self._conversations[name] = {
+                tuple(json.loads(key)): state for key, state in stored.items()
+            }
+        return dict(self._conversations[name])
+
+    async def update_conversation(
+        self,
+        name: str,
+        key: ConversationKey,
+        new_state: Optional[object]
+    ) -> None:
+        conversations = self._conversations.setdefault(name, {})
+        if conversations.get(key) == new_state:
+            return
+        if new_state is None:
+            conversations.pop(key, None)
+        else:
+            conversations[key] = new_state
+        self._mark(CONVERSATION + name, json.dumps(list(key)), new_state)
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._mark(USER, str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._mark(CHAT, str(chat_id), data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._mark(BOT, '', data)
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._mark(USER, str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._mark(CHAT, str(chat_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Write everything pending; called by the application on shutdown"""
+        # Let background flushes finish, so none is writing once this returns
+        pending = [task for task in (self._timer, self._flush_task) if task is not None]
+        if self._timer is not None:
+            self._timer.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._timer = self._flush_task = None
+        await self._flush()
+
+    def _mark(self, namespace: str, key: str, data: Any) -> None:
+        # The application hands over deep copies, so keeping references is safe
+        self._dirty[(namespace, key)] = data
+        if len(self._dirty) >= self.flush_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_logged(), name='persistence_flush_now')
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self._flush()
+        except Exception as e:
+            logger.error(f"Failed to flush persisted data: {e}")
+
+    async def _flush(self) -> None:
+        if not self._dirty or self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return
+            started = time.perf_counter()
+            entries = {
+                key: None if data is None else json.dumps(data, ensure_ascii=False)
+                for key, data in dirty.items()
+            }
+            try:
+                async with DatabaseHandler() as db:
+                    await db.store_persisted(entries)
+            except BaseException:
+                # Keep the entries unless they were superseded meanwhile, also
+                # when cancelled so the final flush on shutdown writes them
+                for key, data in dirty.items():
+                    self._dirty.setdefault(key, data)
+                raise
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed_entries += len(entries)
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            logger.debug("Flushed %d persisted entries in %.1f ms", len(entries), elapsed)
\ No newline at end of file
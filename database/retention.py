@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import DateTime, delete, insert, literal, select
+from config import Config
+from database.db_handler import ArchivedReminder, DatabaseHandler, Reminder, get_engine, get_sessionmaker, uses_memory_store
+
+logger = logging.getLogger(__name__)
+
+class RetentionService:
+    """Keeps the reminders table proportional to pending reminders
+
+    Periodically moves inactive rows into `reminders_archive` in short
+    chunked transactions once `Config.SNOOZE_WINDOW` has passed since they
+    fired (until then they can be snoozed back in place), trims archived rows older than
+    `Config.ARCHIVE_RETENTION_DAYS` and reclaims freed pages with SQLite's
+    incremental vacuum, on files that use incremental auto-vacuum. All database work runs on the async driver's
+    worker thread, so the event loop is never blocked. The embedded
+    memory:// store has no archive: expired rows are dropped instead.
+    """
+
+    def __init__(self):
+        self.interval = Config.ARCHIVE_INTERVAL
+        self.batch_size = Config.ARCHIVE_BATCH_SIZE
+        self.retention = timedelta(days=Config.ARCHIVE_RETENTION_DAYS)
+        self.snooze_window = timedelta(seconds=Config.SNOOZE_WINDOW)
+        self.vacuum_pages = Config.ARCHIVE_VACUUM_PAGES
+        self._task: Optional[asyncio.Task] = None
+        # Whether the file uses incremental auto-vacuum, checked on the first run
+        self._incremental: Optional[bool] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name='retention')
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> None:
+        """Archive, trim and vacuum once"""
+        archived = await self.archive_inactive()
+        trimmed = await self.trim_archive()
+        freed = await self.vacuum()
+        if archived or trimmed or freed:
+            logger.info(
+                "Retention: archived %d reminders, trimmed %d, freed %d pages",
+                archived, trimmed, freed
+            )
+
+    async def archive_inactive(self) -> int:
+        """Move inactive reminders past the snooze window to the archive in chunks"""
+        cutoff = datetime.utcnow() - self.snooze_window
+        moved = 0
+        if uses_memory_store():
+            db = DatabaseHandler()
+            while True:
+                purged = await db.purge_inactive(cutoff, self.batch_size)
+                moved += purged
+                if purged < self.batch_size:
+                    return moved
+                await asyncio.sleep(0)
+        session_factory = get_sessionmaker()
+        while True:
+            async with session_factory.begin() as session:
+                ids = list(await session.scalars(
+                    select(Reminder.id)
+                    .where(Reminder.is_active == False, Reminder.reminder_time < cutoff)
+                    .limit(self.batch_size)
+                ))
+                if not ids:
+                    return moved
+                await session.execute(
+                    insert(ArchivedReminder).from_select(
+                        ['id', 'user_id', 'text', 'reminder_time', 'created_at', 'archived_at'],
+                        select(
+                            Reminder.id, Reminder.user_id, Reminder.text,
+                            Reminder.reminder_time, Reminder.created_at,
+                            literal(datetime.utcnow(), DateTime)
+                        ).where(Reminder.id.in_(ids))
+                    )
+                )
+                await session.execute(delete(Reminder).where(Reminder.id.in_(ids)))
+            moved += len(ids)
+            # Let updates through between chunks
+            await asyncio.sleep(0)
+
+    async def trim_archive(self) -> int:
+        """Drop archived reminders past the retention period"""
+        if uses_memory_store():
+            return 0
+        cutoff = datetime.utcnow() - self.retention
+        session_factory = get_sessionmaker()
+        trimmed = 0
+        while True:
+            async with session_factory.begin() as session:
+                ids = list(await session.scalars(
+                    select(ArchivedReminder.id)
+                    .where(ArchivedReminder.archived_at < cutoff)
+                    .limit(self.batch_size)
+                ))
+                if not ids:
+                    return trimmed
+                await session.execute(delete(ArchivedReminder).where(ArchivedReminder.id.in_(ids)))
+            trimmed += len(ids)
+            await asyncio.sleep(0)
+
+    async def convert_to_incremental(self) -> bool:
+        """Switch an older SQLite file to incremental auto-vacuum
+
+        Takes a full VACUUM, which rewrites the whole file and holds off
+        every writer until it finishes, so it is only run at startup when
+        ARCHIVE_VACUUM_CONVERT is set, before updates are handled. Returns
+        whether the file was converted.
+        """
+        if uses_memory_store():
+            return False
+        engine = get_engine()
+        if engine.dialect.name != 'sqlite':
+            return False
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+            if (await conn.exec_driver_sql('PRAGMA auto_vacuum')).scalar() == 2:
+                return False
+            logger.info("Converting database to incremental auto-vacuum")
+            await conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+            await conn.exec_driver_sql('VACUUM')
+        self._incremental = None
+        return True
+
+    async def vacuum(self) -> int:
+        """Return free SQLite pages to the filesystem; returns pages freed"""
+        if uses_memory_store():
+            return 0
+        engine = get_engine()
+        if engine.dialect.name != 'sqlite' or not self.vacuum_pages or self._incremental is False:
+            return 0
+
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+            if self._incremental is None:
+                self._incremental = (await conn.exec_driver_sql('PRAGMA auto_vacuum')).scalar() == 2
+                if not self._incremental:
+                    logger.warning(
+                        "Database does not use incremental auto-vacuum, freed pages are kept; "
+                        "set ARCHIVE_VACUUM_CONVERT=1 for one start to convert it"
+                    )
+                    return 0
+
+            before = (await conn.exec_driver_sql('PRAGMA freelist_count')).scalar()
+            # A plain execute() steps the pragma once and frees a single page;
+            # executescript() runs it to completion
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(
+                f'PRAGMA incremental_vacuum({int(self.vacuum_pages)});'
+            )
+            after = (await conn.exec_driver_sql('PRAGMA freelist_count')).scalar()
+        return before - after
\ No newline at end of file
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from config import Config
+from database.db_handler import DatabaseHandler, Reminder
+from utils.profiling import trace_phase
+
+logger = logging.getLogger(__name__)
+
+# Kinds of queued write intents
+ADD, DEACTIVATE, DELETE, SNOOZE = 'add', 'deactivate', 'delete', 'snooze'
+
+# (kind, argument, future resolved with the outcome)
+WriteIntent = Tuple[str, Any, asyncio.Future]
+
+@trace_phase('db', skip=('stop',))
+class GroupCommitWriter:
+    """Single writer task committing the handlers' writes in batches
+
+    Handlers queue inserts, deactivations, deletions and snoozes and await
+    the outcome. The task collects whatever arrives within `window` seconds
+    of the first intent (and everything queued while the previous
+    transaction committed), up to `batch_size` intents, and applies them
+    in one transaction, so concurrent users share a single commit instead
+    of serializing on the database lock with one fsync each. If a batch
+    fails its intents are retried one by one so only the faulty one fails.
+    """
+
+    def __init__(self):
+        self.window = Config.WRITE_BATCH_WINDOW
+        self.batch_size = Config.WRITE_BATCH_SIZE
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        # Set once stop() has committed the queue; later writes are refused
+        self._stopped = False
+        self.commits = 0
+        self.written = 0
+        self.max_batch = 0
+        self.last_commit_ms = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopped = False
+            self._task = asyncio.create_task(self._run(), name='group_commit_writer')
+
+    async def stop(self) -> None:
+        """Commit everything queued, then stop; writes queued later fail"""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+            self._stopped = True
+            # Queued behind the sentinel, e.g. by handlers finishing during shutdown
+            while not self._queue.empty():
+                intent = self._queue.get_nowait()
+                if intent is not None and not intent[2].done():
+                    intent[2].set_exception(RuntimeError("Writer is stopped"))
+
+    def stats(self) -> Dict[str, float]:
+        """Commit counters and the size and latency of batches"""
+        return {
+            'queued': self._queue.qsize(),
+            'commits': self.commits,
+            'written': self.written,
+            'max_batch': self.max_batch,
+            'last_commit_ms': self.last_commit_ms,
+        }
+
+    async def add_reminder(
+        self,
+        user_id: int,
+        text: str,
+        reminder_time: datetime,
+        recurrence: Optional[str] = None,
+        timezone: Optional[str] = None
+    ) -> Reminder:
+        """Queue a new reminder; returns it once committed with its id"""
+        return await self._submit(ADD, Reminder(
+            user_id=user_id,
+            text=text,
+            reminder_time=reminder_time,
+            recurrence=recurrence,
+            timezone=timezone
+        ))
+
+    async def add_reminders(self, reminders: List[Reminder]) -> List[Reminder]:
+        """Queue many new reminders at once; returns them once committed with their ids
+
+        They share transactions of up to `batch_size` writes with whatever
+        the handlers queue meanwhile.
+        """
+        if self._stopped:
+            raise RuntimeError("Writer is stopped")
+        if self._task is None:
+            async with DatabaseHandler() as db:
+                return (await db.apply_writes(reminders, (), ()))[0]
+        loop = asyncio.get_running_loop()
+        futures = []
+        for reminder in reminders:
+            future = loop.create_future()
+            self._queue.put_nowait((ADD, reminder, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def deactivate_reminder(self, reminder_id: int) -> bool:
+        """Queue deactivation of a reminder"""
+        return await self._submit(DEACTIVATE, reminder_id)
+
+    async def delete_reminder(self, reminder_id: int, user_id: int) -> bool:
+        """Queue deletion of a user's reminder"""
+        return await self._submit(DELETE, (reminder_id, user_id))
+
+    async def snooze_reminder(
+        self,
+        reminder_id: int,
+        user_id: int,
+        snooze_until: datetime
+    ) -> Optional[Reminder]:
+        """Queue moving a user's reminder to a new time; returns it, None if not found"""
+        return await self._submit(SNOOZE, (reminder_id, user_id, snooze_until))
+
+    async def _submit(self, kind: str, argument: Any) -> Any:
+        if self._stopped:
+            raise RuntimeError("Writer is stopped")
+        if self._task is None:
+            # Not started (scripts, shutdown): commit on the caller's behalf
+            return await self._apply_one((kind, argument, None))
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((kind, argument, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            intent = await self._queue.get()
+            if intent is None:
+                break
+            batch = [intent]
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                intent = self._queue.get_nowait()
+                if intent is None:
+                    stopping = True
+                    break
+                batch.append(intent)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[WriteIntent]) -> None:
+        started = time.perf_counter()
+        try:
+            results = await self._apply(batch)
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} writes failed, retrying one by one: {e}")
+            for intent in batch:
+                try:
+                    self._resolve(intent, await self._apply_one(intent))
+                except Exception as error:
+                    if not intent[2].done():
+                        intent[2].set_exception(error)
+            return
+        for intent, result in zip(batch, results):
+            self._resolve(intent, result)
+        self.commits += 1
+        self.written += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+        self.last_commit_ms = (time.perf_counter() - started) * 1000
+
+    async def _apply(self, batch: List[WriteIntent]) -> List[Any]:
+        async with DatabaseHandler() as db:
+            _, deactivated, deleted, snoozed = await db.apply_writes(
+                [argument for kind, argument, _ in batch if kind == ADD],
+                [argument for kind, argument, _ in batch if kind == DEACTIVATE],
+                [argument for kind, argument, _ in batch if kind == DELETE],
+                [argument for kind, argument, _ in batch if kind == SNOOZE]
+            )
+        # Like separate calls, only the first intent for a row reports the change
+        results = []
+        for kind, argument, _ in batch:
+            if kind == ADD:
+                results.append(argument)
+            elif kind == DEACTIVATE:
+                results.append(argument in deactivated)
+                deactivated.discard(argument)
+            elif kind == SNOOZE:
+                results.append(snoozed.get(argument[0]))
+            else:
+                results.append(argument[0] in deleted)
+                deleted.discard(argument[0])
+        return results
+
+    async def _apply_one(self, intent: WriteIntent) -> Any:
+        return (await self._apply([intent]))[0]
+
+    @staticmethod
+    def _resolve(intent: WriteIntent, result: Any) -> None:
+        future = intent[2]
+        if not future.done():
+            future.set_result(result)
\ No newline at end of file
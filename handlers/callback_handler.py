@@ -2,7 +2,16 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from config import Config
 from database.db_handler import DatabaseHandler
-from utils.keyboard_maker import get_reminder_management_keyboard
+from database.writer import GroupCommitWriter
+from handlers.command_handler import ConversationStates
+from handlers.reminder_list import ReminderList
+from scheduler.reminder_scheduler import ReminderScheduler
+from utils.keyboard_maker import (
+    get_keyboard_reminder_ids, get_reminder_management_keyboard, remove_reminder_buttons
+)
+from utils.metrics import HANDLER_ERRORS, HANDLER_SECONDS, instrument
+from utils.profiling import trace_updates
+from utils.time_parser import SNOOZE_PRESETS, format_reminder_time, snooze_time
 from typing import Optional, Callable, Dict
 from dataclasses import dataclass
 
@@ -12,16 +21,29 @@ class CallbackTypes:
     TIME_TYPE: str = 'time_type'
     DELETE_REMINDER: str = 'delete_reminder'
     SNOOZE_REMINDER: str = 'snooze_reminder'
+    SNOOZE_PRESET: str = 'snooze_preset'
+    MANAGE_REMINDER: str = 'manage_reminder'
+    LIST_NEXT: str = 'list_next'
+    LIST_PREV: str = 'list_prev'
 
+@trace_updates
+@instrument(HANDLER_SECONDS, HANDLER_ERRORS)
 class CallbackHandlers:
     """Handler class for callback queries"""
 
-    def __init__(self):
+    def __init__(self, scheduler: ReminderScheduler, writer: GroupCommitWriter):
         """Initialize callback handlers mapping"""
+        self.scheduler = scheduler
+        self.writer = writer
+        self.reminder_list = ReminderList()
         self._handlers: Dict[str, Callable] = {
             CallbackTypes.TIME_TYPE: self.handle_time_type,
             CallbackTypes.DELETE_REMINDER: self.handle_delete_reminder,
-            CallbackTypes.SNOOZE_REMINDER: self.handle_snooze_reminder
+            CallbackTypes.SNOOZE_REMINDER: self.handle_snooze_reminder,
+            CallbackTypes.SNOOZE_PRESET: self.handle_snooze_preset,
+            CallbackTypes.MANAGE_REMINDER: self.handle_manage_reminder,
+            CallbackTypes.LIST_NEXT: self.handle_list_next,
+            CallbackTypes.LIST_PREV: self.handle_list_prev
         }
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -42,18 +64,26 @@ class CallbackHandlers:
         self,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
-        time_type: Optional[str]
-    ) -> None:
-        """Handle time type selection"""
+        time_type: Optional[str] = None
+    ) -> Optional[str]:
+        """Handle time type selection and move the conversation to the matching state"""
         query = update.callback_query
-        
-        if time_type == 'specific':
-            context.user_data['state'] = 'waiting_for_specific_time'
-            await query.message.edit_text(Config.MESSAGES['enter_specific_time'])
-        
-        elif time_type == 'delay':
-            context.user_data['state'] = 'waiting_for_delay_time'
-            await query.message.edit_text(Config.MESSAGES['enter_delay_time'])
+        if time_type is None:
+            # Called directly by the conversation handler
+            await query.answer()
+            time_type = query.data.split(':', 1)[1]
+
+        states = {
+            'specific': (ConversationStates.ENTERING_SPECIFIC_TIME, 'enter_specific_time'),
+            'delay': (ConversationStates.ENTERING_DELAY_TIME, 'enter_delay_time'),
+            'recurring': (ConversationStates.ENTERING_RECURRENCE, 'enter_recurrence'),
+        }
+        if time_type not in states:
+            return None
+        state, message = states[time_type]
+        context.user_data['state'] = state
+        await query.message.edit_text(Config.MESSAGES[message])
+        return state
 
     async def handle_delete_reminder(
         self,
@@ -66,26 +96,112 @@ class CallbackHandlers:
             return
             
         query = update.callback_query
-        async with DatabaseHandler() as db:
-            if await db.delete_reminder(int(reminder_id), query.from_user.id):
-                await query.message.edit_text(Config.MESSAGES['reminder_deleted'])
-            else:
-                await query.message.edit_text(Config.MESSAGES['reminder_not_found'])
+        if await self.writer.delete_reminder(int(reminder_id), query.from_user.id):
+            self.scheduler.cancel(int(reminder_id))
+            await query.message.edit_text(Config.MESSAGES['reminder_deleted'])
+        else:
+            await query.message.edit_text(Config.MESSAGES['reminder_not_found'])
 
     async def handle_snooze_reminder(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        reminder_id: Optional[str] = None
+    ) -> Optional[str]:
+        """Ask for a custom snooze time and move the conversation to its state"""
+        query = update.callback_query
+        if reminder_id is None:
+            # Called directly by the conversation handler
+            await query.answer()
+            reminder_id = query.data.split(':', 1)[1]
+
+        context.user_data['snooze_reminder_id'] = int(reminder_id)
+        context.user_data['state'] = ConversationStates.ENTERING_SNOOZE_TIME
+        # Reply rather than edit, so the reminder text stays visible
+        await query.message.reply_text(Config.MESSAGES['enter_snooze_time'])
+        return ConversationStates.ENTERING_SNOOZE_TIME
+
+    async def handle_snooze_preset(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        param: Optional[str]
+    ) -> None:
+        """Snooze a delivered reminder by one of the one-tap presets"""
+        if not param:
+            return
+        reminder_id, _, preset = param.partition('_')
+        if preset not in SNOOZE_PRESETS:
+            return
+
+        query = update.callback_query
+        async with DatabaseHandler() as db:
+            timezone = await db.get_user_timezone(query.from_user.id) or Config.DEFAULT_TIMEZONE
+        snooze_until = snooze_time(preset, timezone)
+        reminder = await self.writer.snooze_reminder(int(reminder_id), query.from_user.id, snooze_until)
+        if reminder is None:
+            await query.message.edit_text(Config.MESSAGES['reminder_not_found'])
+            return
+        self.scheduler.reschedule(reminder)
+        when = format_reminder_time(snooze_until, timezone)
+        markup = query.message.reply_markup
+        if len(get_keyboard_reminder_ids(markup)) > 1:
+            # Combined delivery: say which item moved and keep the others' buttons
+            snoozed = Config.MESSAGES['reminder_item_snoozed'].format(reminder.text, when)
+            markup = remove_reminder_buttons(markup, reminder.id)
+        else:
+            snoozed = Config.MESSAGES['reminder_snoozed'].format(when)
+            markup = None
+        await query.message.edit_text(f"{query.message.text}\n\n{snoozed}", reply_markup=markup)
+
+    async def handle_manage_reminder(
         self,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
         reminder_id: Optional[str]
     ) -> None:
-        """Handle reminder snooze request"""
+        """Offer actions for a reminder picked from /list, keeping the list intact"""
         if not reminder_id:
             return
-            
+
         query = update.callback_query
-        context.user_data['snooze_reminder_id'] = int(reminder_id)
-        context.user_data['state'] = 'waiting_for_snooze_time'
-        await query.message.edit_text(Config.MESSAGES['enter_snooze_time'])
+        async with DatabaseHandler() as db:
+            reminder = await db.get_user_reminder(query.from_user.id, int(reminder_id))
+        if reminder is None:
+            await query.message.reply_text(Config.MESSAGES['reminder_not_found'])
+            return
+        await query.message.reply_text(
+            f"{reminder.text}\n\n{Config.MESSAGES['reminder_management']}",
+            reply_markup=get_reminder_management_keyboard(reminder.id)
+        )
+
+    async def handle_list_next(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        cursor: Optional[str]
+    ) -> None:
+        """Show the /list page after the cursor in the same message"""
+        await self._show_list_page(update, after=cursor)
+
+    async def handle_list_prev(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        cursor: Optional[str]
+    ) -> None:
+        """Show the /list page before the cursor in the same message"""
+        await self._show_list_page(update, before=cursor)
+
+    async def _show_list_page(
+        self,
+        update: Update,
+        after: Optional[str] = None,
+        before: Optional[str] = None
+    ) -> None:
+        query = update.callback_query
+        text, keyboard = await self.reminder_list.render(query.from_user.id, after=after, before=before)
+        await query.message.edit_text(text, reply_markup=keyboard)
 
     async def handle_reminder_response(
         self,
@@ -1,12 +1,23 @@
 # command_handler.py
+import os
+import tempfile
 from telegram import Update
-from telegram.ext import ContextTypes
+from telegram.ext import ContextTypes, ConversationHandler
 from typing import Optional
 from database.db_handler import DatabaseHandler
+from database.writer import GroupCommitWriter
 from utils.keyboard_maker import get_time_choice_keyboard
-from utils.time_parser import format_reminder_time, parse_specific_time, parse_delay_time
+from utils.time_parser import (
+    format_reminder_time, normalize_timezone, parse_specific_time, parse_delay_time
+)
 from datetime import datetime
 from config import Config
+from scheduler.reminder_scheduler import ReminderScheduler
+from utils.metrics import HANDLER_ERRORS, HANDLER_SECONDS, instrument
+from utils.profiling import SamplingProfiler, trace_updates
+from utils.recurrence import next_occurrence, parse_recurrence
+from handlers.reminder_list import ReminderList
+from handlers.reminder_transfer import ReminderTransfer, file_format
 
 class ConversationStates:
     """States for conversation handling"""
@@ -15,13 +26,25 @@ class ConversationStates:
     ENTERING_SPECIFIC_TIME = 'entering_specific_time'
     ENTERING_DELAY_TIME = 'entering_delay_time'
     ENTERING_SNOOZE_TIME = 'entering_snooze_time'
+    ENTERING_RECURRENCE = 'entering_recurrence'
 
+@trace_updates
+@instrument(HANDLER_SECONDS, HANDLER_ERRORS)
 class CommandHandler:
     """Unified handler for all bot commands and message processing"""
     
-    def __init__(self):
-        self.db = DatabaseHandler()
+    def __init__(
+        self,
+        scheduler: ReminderScheduler,
+        writer: GroupCommitWriter,
+        profiler: Optional[SamplingProfiler] = None
+    ):
+        self.scheduler = scheduler
+        self.writer = writer
+        self.profiler = profiler
         self.messages = Config.MESSAGES
+        self.reminder_list = ReminderList()
+        self.transfer = ReminderTransfer(scheduler, writer)
 
     async def start_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command"""
@@ -51,12 +74,13 @@ class CommandHandler:
                               parse_func: callable) -> Optional[str]:
         """Generic handler for both specific and delay time inputs"""
         try:
-            reminder_time = parse_func(update.message.text)
-            await self._save_reminder(update, context, reminder_time)
-            return None
+            timezone = await self._get_timezone(update.effective_user.id)
+            reminder_time = parse_func(update.message.text, timezone)
+            await self._save_reminder(update, context, reminder_time, timezone)
+            return ConversationHandler.END
         except ValueError:
             await update.message.reply_text(self.messages['invalid_time'])
-            return context.user_data['state']
+            return context.user_data.get('state')
 
     async def specific_time_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
         """Handle specific time input"""
@@ -66,74 +90,179 @@ class CommandHandler:
         """Handle delay time input"""
         return await self.handle_time_input(update, context, parse_delay_time)
 
+    async def recurrence_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+        """Handle a repeat rule such as "щодня 9:00" or a cron expression"""
+        try:
+            recurrence = parse_recurrence(update.message.text)
+        except ValueError:
+            await update.message.reply_text(self.messages['invalid_recurrence'])
+            return ConversationStates.ENTERING_RECURRENCE
+
+        timezone = await self._get_timezone(update.effective_user.id)
+        reminder_time = next_occurrence(recurrence, timezone, datetime.utcnow())
+        await self._save_reminder(update, context, reminder_time, timezone, recurrence)
+        return ConversationHandler.END
+
+    async def snooze_time_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+        """Handle a custom snooze time: a delay such as "30хв" or a time of day"""
+        timezone = await self._get_timezone(update.effective_user.id)
+        try:
+            snooze_until = parse_delay_time(update.message.text, timezone)
+        except ValueError:
+            try:
+                snooze_until = parse_specific_time(update.message.text, timezone)
+            except ValueError:
+                await update.message.reply_text(self.messages['invalid_time'])
+                return ConversationStates.ENTERING_SNOOZE_TIME
+
+        try:
+            reminder = await self.writer.snooze_reminder(
+                context.user_data['snooze_reminder_id'], update.effective_user.id, snooze_until
+            )
+            if reminder is None:
+                await update.message.reply_text(self.messages['reminder_not_found'])
+                return ConversationHandler.END
+            self.scheduler.reschedule(reminder)
+            await update.message.reply_text(
+                self.messages['reminder_snoozed'].format(format_reminder_time(snooze_until, timezone))
+            )
+        finally:
+            context.user_data.clear()
+        return ConversationHandler.END
+
     async def list_reminders_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /list command"""
         try:
-            reminders = self.db.get_active_reminders(update.effective_user.id)
-            if not reminders:
+            text, keyboard = await self.reminder_list.render(update.effective_user.id)
+            await update.message.reply_text(text, reply_markup=keyboard)
+        except Exception as e:
+            await update.message.reply_text(f"Помилка при отриманні списку нагадувань: {str(e)}")
+
+    async def timezone_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /timezone command: show or change the user's timezone"""
+        user_id = update.effective_user.id
+        if not context.args:
+            timezone = await self._get_timezone(user_id)
+            await update.message.reply_text(self.messages['timezone_current'].format(timezone))
+            return
+
+        timezone = normalize_timezone(' '.join(context.args))
+        if timezone is None:
+            await update.message.reply_text(self.messages['timezone_invalid'])
+            return
+        async with DatabaseHandler() as db:
+            await db.set_user_timezone(user_id, timezone)
+        await update.message.reply_text(self.messages['timezone_set'].format(timezone))
+
+    async def export_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /export [csv|jsonl]: send the user's pending reminders as a file"""
+        user_id = update.effective_user.id
+        fmt = context.args[0].lower() if context.args else 'csv'
+        if fmt not in ('csv', 'jsonl'):
+            fmt = 'csv'
+        timezone = await self._get_timezone(user_id)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f'reminders.{fmt}')
+            count = await self.transfer.export(user_id, path, fmt, timezone)
+            if not count:
                 await update.message.reply_text(self.messages['no_active_reminders'])
                 return
+            with open(path, 'rb') as f:
+                await update.message.reply_document(
+                    f, filename=f'reminders.{fmt}', caption=self.messages['export_done'].format(count)
+                )
 
-            response = "Ваші активні нагадування:\n\n"
-            for reminder in reminders:
-                formatted_time = format_reminder_time(reminder.reminder_time)
-                response += f"🔔 {formatted_time}\n{reminder.text}\n\n"
+    async def import_prompt_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /import: explain the file format and accept the next file"""
+        context.user_data['import_pending'] = True
+        await update.message.reply_text(self.messages['import_prompt'])
 
-            await update.message.reply_text(response)
-        except Exception as e:
-            await update.message.reply_text(f"Помилка при отриманні списку нагадувань: {str(e)}")
+    async def import_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle a CSV or JSON Lines document sent after /import: add its rows as reminders"""
+        if not context.user_data.get('import_pending'):
+            # Files sent without /import are not taken for reminders
+            await update.message.reply_text(self.messages['import_not_requested'])
+            return
+        document = update.message.document
+        fmt = file_format(document.file_name)
+        if fmt is None:
+            await update.message.reply_text(self.messages['import_unsupported'])
+            return
+        del context.user_data['import_pending']
+        user_id = update.effective_user.id
+        timezone = await self._get_timezone(user_id)
+        file = await document.get_file()
+        with tempfile.TemporaryDirectory() as directory:
+            path = await file.download_to_drive(os.path.join(directory, f'import.{fmt}'))
+            result = await self.transfer.import_file(user_id, str(path), fmt, timezone)
+        lines = [self.messages['import_done'].format(result.imported)]
+        if result.failed:
+            shown = ', '.join(map(str, result.error_lines))
+            if result.failed > len(result.error_lines):
+                shown += '…'
+            lines.append(self.messages['import_errors'].format(result.failed, shown))
+        if result.truncated:
+            lines.append(self.messages['import_truncated'].format(self.transfer.max_rows))
+        await update.message.reply_text('\n'.join(lines))
+
+    async def profile_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /profile [seconds] from an admin: profile the bot and send the collapsed stacks"""
+        if self.profiler.running:
+            await update.message.reply_text(self.messages['profile_running'])
+            return
+        try:
+            seconds = float(context.args[0]) if context.args else Config.PROFILE_SECONDS
+        except ValueError:
+            seconds = Config.PROFILE_SECONDS
+        seconds = min(max(seconds, 1.0), Config.PROFILE_MAX_SECONDS)
+        await update.message.reply_text(self.messages['profile_started'].format(seconds))
+        # Sampling outlives the update, so the chat's next updates aren't held up
+        context.application.create_task(self._send_profile(update, seconds), update=update)
+
+    async def _send_profile(self, update: Update, seconds: float) -> None:
+        try:
+            path, samples = await self.profiler.run(seconds)
+        except RuntimeError:
+            await update.message.reply_text(self.messages['profile_running'])
+            return
+        with open(path, 'rb') as f:
+            await update.message.reply_document(
+                f, caption=self.messages['profile_done'].format(samples, path)
+            )
 
-    async def cancel_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    async def cancel_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Handle /cancel command"""
         if 'state' in context.user_data:
             context.user_data.clear()
             await update.message.reply_text(self.messages['operation_cancelled'])
         else:
             await update.message.reply_text(self.messages['invalid_operation'])
+        return ConversationHandler.END
 
     async def _save_reminder(self, update: Update, context: ContextTypes.DEFAULT_TYPE, 
-                           reminder_time: datetime) -> None:
+                           reminder_time: datetime, timezone: str,
+                           recurrence: Optional[str] = None) -> None:
         """Save reminder to database and schedule it"""
         try:
-            reminder = self.db.add_reminder(
+            reminder = await self.writer.add_reminder(
                 user_id=update.effective_user.id,
                 text=context.user_data['reminder_text'],
-                reminder_time=reminder_time
+                reminder_time=reminder_time,
+                recurrence=recurrence,
+                timezone=timezone if recurrence else None
             )
 
-            context.job_queue.run_once(
-                self._send_reminder,
-                when=reminder_time,
-                data={'chat_id': update.effective_chat.id, 'reminder_id': reminder.id}
-            )
+            self.scheduler.add(reminder)
 
             await update.message.reply_text(
-                self.messages['reminder_set'].format(format_reminder_time(reminder_time))
+                self.messages['reminder_set'].format(
+                    format_reminder_time(reminder_time, timezone)
+                )
             )
         finally:
             context.user_data.clear()
 
-    async def _send_reminder(self, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Send reminder message when time comes"""
-        job = context.job
-        chat_id = job.data['chat_id']
-        reminder_id = job.data['reminder_id']
-
-        try:
-            reminder = self.db.get_reminder(reminder_id)
-            if reminder and reminder.is_active:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=f"🔔 Нагадування!\n\n{reminder.text}"
-                )
-                self.db.deactivate_reminder(reminder_id)
-        except Exception as e:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"Помилка при відправці нагадування: {str(e)}"
-            )
-
-    def __del__(self):
-        """Cleanup database connection"""
-        if hasattr(self, 'db'):
-            self.db.close()
\ No newline at end of file
+    async def _get_timezone(self, user_id: int) -> str:
+        """User's timezone name, the default when none was chosen"""
+        async with DatabaseHandler() as db:
+            return await db.get_user_timezone(user_id) or Config.DEFAULT_TIMEZONE
\ No newline at end of file
@@ -0,0 +1,151 @@
+import asyncio
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ApplicationHandlerStop, BaseHandler
+
+class TokenBuckets:
+    """Token buckets for many keys in bounded memory
+
+    A bucket is a single float, the time it will be full again (the
+    generic cell rate algorithm), so a key without an entry has a full
+    bucket. Entries live in two generations of at most `capacity / 2`
+    keys each: when the recent one fills up it replaces the old one,
+    which is dropped. A key is thus forgotten, its bucket refilled, only
+    after `capacity / 2` other keys were used since its last update — an
+    approximate LRU without per-access bookkeeping.
+    """
+
+    def __init__(self, capacity: int):
+        self._half = max(capacity // 2, 1)
+        self._recent: Dict[int, float] = {}
+        self._old: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._old)
+
+    def take(self, key: int, interval: float, tolerance: float, now: float, max_delay: float = 0.0) -> Optional[float]:
+        """Take a token from a bucket refilled every `interval` seconds
+
+        `tolerance` is how far ahead of `now` the bucket may be, (burst - 1)
+        * interval. Returns the seconds until the token is available, 0 if
+        it is right away, or None if that is more than `max_delay` (nothing
+        is taken then).
+        """
+        recent = self._recent
+        full_at = recent.get(key)
+        if full_at is None:
+            full_at = self._old.get(key, now)
+            if len(recent) >= self._half:
+                self._old = recent
+                self._recent = recent = {}
+        if full_at < now:
+            full_at = now
+        wait = full_at - now - tolerance
+        if wait > max_delay:
+            # Keeps a flooding key in the recent generation
+            recent[key] = full_at
+            return None
+        recent[key] = full_at + interval
+        return wait if wait > 0 else 0.0
+
+class FloodControl(BaseHandler):
+    """Drops or delays a user's updates beyond per-kind rate limits
+
+    Added in a handler group before the others, it takes a token from
+    the user's bucket for the kind of update: a command by name ('new',
+    'list', ...), 'callback' for button presses, 'document' for files or
+    'default' for the rest.
+    The check runs in group -1, before any of the bot's own handlers;
+    updates within the limits cost a dict lookup on top of the context
+    the application builds for every update anyway. Excess updates are
+    held for up to `max_delay` seconds or stopped with
+    ApplicationHandlerStop, which saves the handler work: parsing,
+    database access and replies. Dropped button presses are still
+    answered, one answerCallbackQuery each.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]], tracked_users: int, max_delay: float = 0.0):
+        # Held updates sleep in handle_update; there is no user callback
+        super().__init__(asyncio.sleep)
+        self.max_delay = max_delay
+        self.buckets = TokenBuckets(tracked_users)
+        self._index: Dict[str, int] = {}
+        # Per kind: (seconds per token, tolerance) or None when unlimited
+        self._limits: List[Optional[Tuple[float, float]]] = []
+        for kind, (rate, burst) in limits.items():
+            self._index[kind] = len(self._limits)
+            if rate > 0:
+                interval = 1.0 / rate
+                self._limits.append((interval, (max(burst, 1) - 1) * interval))
+            else:
+                self._limits.append(None)
+        if 'default' not in self._index:
+            self._index['default'] = len(self._limits)
+            self._limits.append(None)
+        self.passed = 0
+        self.delayed = 0
+        self.dropped = 0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'passed': self.passed,
+            'delayed': self.delayed,
+            'dropped': self.dropped,
+            'tracked': len(self.buckets),
+        }
+
+    @staticmethod
+    def kind(update: Update) -> str:
+        if update.callback_query is not None:
+            return 'callback'
+        message = update.message
+        if message is not None:
+            text = message.text
+            if text and text[0] == '/':
+                parts = text[1:].split(None, 1)
+                if parts:
+                    return parts[0].partition('@')[0].lower()
+            elif message.document is not None:
+                return 'document'
+        return 'default'
+
+    def admit(self, update: object, now: float) -> Optional[float]:
+        """None to let the update through, seconds to hold it or math.inf to drop it"""
+        if not isinstance(update, Update):
+            return None
+        user = update.effective_user
+        if user is None:
+            return None
+        index = self._index.get(self.kind(update))
+        if index is None:
+            index = self._index['default']
+        limit = self._limits[index]
+        if limit is None:
+            self.passed += 1
+            return None
+        wait = self.buckets.take(user.id * len(self._limits) + index, limit[0], limit[1], now, self.max_delay)
+        if wait is None:
+            self.dropped += 1
+            return math.inf
+        self.passed += 1
+        if wait:
+            self.delayed += 1
+            return wait
+        return None
+
+    def check_update(self, update: object) -> Optional[float]:
+        return self.admit(update, time.monotonic())
+
+    async def handle_update(self, update: Any, application: Any, check_result: float, context: Any) -> None:
+        if check_result == math.inf:
+            if update.callback_query is not None:
+                # Otherwise the button spins until the client gives up
+                try:
+                    await update.callback_query.answer()
+                except TelegramError:
+                    pass
+            raise ApplicationHandlerStop
+        await self.callback(check_result)
\ No newline at end of file
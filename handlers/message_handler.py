@@ -4,9 +4,11 @@ from database.db_handler import DatabaseHandler
 from utils.keyboard_maker import get_time_choice_keyboard
 from utils.time_parser import parse_specific_time, parse_delay_time, format_reminder_time
 from datetime import datetime
-from config import MESSAGES
+from config import Config
 from typing import Optional, Dict, Any
 
+MESSAGES = Config.MESSAGES
+
 # State constants
 class States:
     WAITING_FOR_TEXT = 'waiting_for_reminder_text'
@@ -67,32 +69,29 @@ async def cancel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def list_reminders_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /list command"""
-    db = DatabaseHandler()
-    try:
-        reminders = db.get_active_reminders(update.effective_user.id)
-        if not reminders:
-            await update.message.reply_text(MESSAGES['no_active_reminders'])
-            return
-        
-        response = "Ваші активні нагадування:\n\n"
-        for reminder in reminders:
-            formatted_time = format_reminder_time(reminder.reminder_time)
-            response += f"🔔 {formatted_time}\n{reminder.text}\n\n"
-        
-        await update.message.reply_text(response)
-    finally:
-        db.close()
+    async with DatabaseHandler() as db:
+        reminders = await db.get_active_reminders(update.effective_user.id)
+    if not reminders:
+        await update.message.reply_text(MESSAGES['no_active_reminders'])
+        return
+    
+    response = "Ваші активні нагадування:\n\n"
+    for reminder in reminders:
+        formatted_time = format_reminder_time(reminder.reminder_time)
+        response += f"🔔 {formatted_time}\n{reminder.text}\n\n"
+    
+    await update.message.reply_text(response)
 
 async def save_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE, 
                        reminder_time: datetime) -> None:
     """Save reminder to database and schedule it"""
-    db = DatabaseHandler()
     try:
-        reminder = db.add_reminder(
-            user_id=update.effective_user.id,
-            text=context.user_data['reminder_text'],
-            reminder_time=reminder_time
-        )
+        async with DatabaseHandler() as db:
+            reminder = await db.add_reminder(
+                user_id=update.effective_user.id,
+                text=context.user_data['reminder_text'],
+                reminder_time=reminder_time
+            )
         
         context.job_queue.run_once(
             send_reminder,
@@ -104,7 +103,6 @@ async def save_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE,
             MESSAGES['reminder_set'].format(format_reminder_time(reminder_time))
         )
     finally:
-        db.close()
         context.user_data.clear()
 
 async def send_reminder(context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -113,17 +111,14 @@ async def send_reminder(context: ContextTypes.DEFAULT_TYPE) -> None:
     chat_id = job.data['chat_id']
     reminder_id = job.data['reminder_id']
     
-    db = DatabaseHandler()
-    try:
-        reminder = db.get_reminder(reminder_id)
+    async with DatabaseHandler() as db:
+        reminder = await db.get_reminder(reminder_id)
         if reminder and reminder.is_active:
             await context.bot.send_message(
                 chat_id=chat_id,
                 text=f"🔔 Нагадування!\n\n{reminder.text}"
             )
-            db.deactivate_reminder(reminder_id)
-    finally:
-        db.close()
+            await db.deactivate_reminder(reminder_id)
 
 def get_state_handler(state: str) -> callable:
     """Return appropriate handler based on state"""
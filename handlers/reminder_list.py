@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from telegram import InlineKeyboardMarkup
+from config import Config
+from database.db_handler import DatabaseHandler, ListCursor
+from utils.keyboard_maker import get_reminder_list_keyboard
+from utils.recurrence import describe_rule
+from utils.time_parser import format_many
+
+# Telegram rejects longer messages
+MESSAGE_LIMIT = 4096
+# Shortest item text kept on a page, however many items it holds
+MIN_TEXT_LIMIT = 20
+# Room per item for its number, time and repeat rule; rules are cut to fit
+ITEM_OVERHEAD = 60
+RULE_TEXT_LIMIT = 25
+EPOCH = datetime(1970, 1, 1)
+
+def encode_cursor(reminder_time: datetime, reminder_id: int) -> str:
+    """Compact, exact form of a list position for callback data"""
+    return f"{(reminder_time - EPOCH) // timedelta(microseconds=1)}_{reminder_id}"
+
+def decode_cursor(cursor: str) -> ListCursor:
+    micros, reminder_id = cursor.split('_')
+    return EPOCH + timedelta(microseconds=int(micros)), int(reminder_id)
+
+class ReminderList:
+    """Renders /list one keyset-paginated page at a time
+
+    Each page is a single bounded message with a manage button per
+    reminder and previous/next buttons carrying the cursors of its first
+    and last rows, so rendering costs the same however many reminders
+    the user has.
+    """
+
+    def __init__(self):
+        self.page_size = Config.LIST_PAGE_SIZE
+        self.messages = Config.MESSAGES
+        # Leave room for the header and the time line of every item
+        self.text_limit = max(MIN_TEXT_LIMIT, (MESSAGE_LIMIT - 100) // self.page_size - ITEM_OVERHEAD)
+
+    async def render(
+        self,
+        user_id: int,
+        after: Optional[str] = None,
+        before: Optional[str] = None
+    ) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+        """Text and keyboard of the page after or before a cursor"""
+        async with DatabaseHandler() as db:
+            reminders, more = await db.get_reminders_page(
+                user_id,
+                self.page_size,
+                after=decode_cursor(after) if after else None,
+                before=decode_cursor(before) if before else None
+            )
+            if not reminders and (after or before):
+                # The page emptied since it was shown; start over
+                after = before = None
+                reminders, more = await db.get_reminders_page(user_id, self.page_size)
+            if not reminders:
+                return self.messages['no_active_reminders'], None
+            timezone = await db.get_user_timezone(user_id) or Config.DEFAULT_TIMEZONE
+
+        times = format_many((reminder.reminder_time for reminder in reminders), timezone)
+        lines = [self.messages['list_header']]
+        for number, (reminder, formatted_time) in enumerate(zip(reminders, times), 1):
+            if reminder.recurrence:
+                # Raw cron rules can be long; they share the item's overhead with the time
+                rule = describe_rule(reminder.recurrence)
+                if len(rule) > RULE_TEXT_LIMIT:
+                    rule = rule[:RULE_TEXT_LIMIT - 1] + '…'
+                formatted_time += f" (🔁 {rule})"
+            text = reminder.text
+            if len(text) > self.text_limit:
+                text = text[:self.text_limit - 1] + '…'
+            lines.append(f"{number}. 🔔 {formatted_time}\n{text}\n")
+
+        has_prev = more if before else after is not None
+        has_next = more if not before else True
+        first, last = reminders[0], reminders[-1]
+        keyboard = get_reminder_list_keyboard(
+            [reminder.id for reminder in reminders],
+            encode_cursor(first.reminder_time, first.id) if has_prev else None,
+            encode_cursor(last.reminder_time, last.id) if has_next else None
+        )
+        return '\n'.join(lines), keyboard
\ No newline at end of file
@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from config import Config
+from database.db_handler import DatabaseHandler, Reminder, to_utc
+from database.writer import GroupCommitWriter
+from handlers.reminder_list import MESSAGE_LIMIT
+from scheduler.reminder_scheduler import ReminderScheduler
+from utils.recurrence import next_occurrence, parse_recurrence
+from utils.time_parser import format_many, format_reminder_time, get_parser, normalize_timezone
+
+# Columns of exported files; an imported row needs text and a time or a recurrence
+COLUMNS = ('time', 'text', 'recurrence', 'timezone')
+
+# File extensions accepted by /import mapped to their format
+FILE_FORMATS: Dict[str, str] = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'jsonl',
+}
+
+# Line numbers of invalid rows reported back to the user
+REPORTED_ERRORS = 10
+
+def file_format(file_name: Optional[str]) -> Optional[str]:
+    """Format of an uploaded file by its extension, None if unsupported"""
+    return FILE_FORMATS.get(os.path.splitext(file_name or '')[1].lower())
+
+class ImportResult:
+    """Outcome of one imported file"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        # First few line numbers of invalid rows
+        self.error_lines: List[int] = []
+        self.truncated = False
+
+    def fail(self, line: int) -> None:
+        self.failed += 1
+        if len(self.error_lines) < REPORTED_ERRORS:
+            self.error_lines.append(line)
+
+class ReminderTransfer:
+    """Streams a user's reminders to and from CSV and JSON Lines files
+
+    Export pages through the user's pending reminders with a keyset cursor
+    and writes each page straight to the file. Import validates the file
+    row by row with the time and recurrence parsers of the /new dialog and
+    hands every `batch_size` valid rows to the group-commit writer and the
+    scheduler at once, so memory is bounded by the batch, not the file.
+    """
+
+    def __init__(self, scheduler: ReminderScheduler, writer: GroupCommitWriter):
+        self.scheduler = scheduler
+        self.writer = writer
+        self.batch_size = Config.IMPORT_BATCH_SIZE
+        self.max_rows = Config.IMPORT_MAX_ROWS
+
+    async def export(self, user_id: int, path: str, fmt: str, timezone: str) -> int:
+        """Write the user's pending reminders to `path`; returns how many"""
+        count = 0
+        # The BOM lets spreadsheet programs recognize UTF-8 CSV
+        with open(path, 'w', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='') as f:
+            writer = csv.writer(f) if fmt == 'csv' else None
+            if writer is not None:
+                writer.writerow(COLUMNS)
+            async with DatabaseHandler() as db:
+                async for batch in db.iter_user_reminders(user_id, self.batch_size):
+                    times = format_many([reminder.reminder_time for reminder in batch], timezone)
+                    for reminder, time in zip(batch, times):
+                        if reminder.recurrence:
+                            # Recurring reminders keep the zone their rule runs in
+                            row = (
+                                format_reminder_time(reminder.reminder_time, reminder.timezone),
+                                reminder.text, reminder.recurrence, reminder.timezone
+                            )
+                        else:
+                            row = (time, reminder.text, '', timezone)
+                        if writer is not None:
+                            writer.writerow(row)
+                        else:
+                            f.write(json.dumps(
+                                {column: value for column, value in zip(COLUMNS, row) if value},
+                                ensure_ascii=False
+                            ) + '\n')
+                    count += len(batch)
+        return count
+
+    async def import_file(self, user_id: int, path: str, fmt: str, timezone: str) -> ImportResult:
+        """Add the valid rows of the file at `path` as the user's reminders"""
+        result = ImportResult()
+        batch: List[Reminder] = []
+        rows = 0
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            for line, row in self._rows(f, fmt):
+                if rows == self.max_rows:
+                    result.truncated = True
+                    break
+                rows += 1
+                try:
+                    batch.append(self._reminder(user_id, row, timezone))
+                except (ValueError, TypeError, AttributeError, OverflowError):
+                    # OverflowError: dates near datetime's limits once moved to UTC
+                    result.fail(line)
+                    continue
+                if len(batch) == self.batch_size:
+                    result.imported += await self._store(batch)
+                    batch = []
+        if batch:
+            result.imported += await self._store(batch)
+        return result
+
+    async def _store(self, batch: List[Reminder]) -> int:
+        reminders = await self.writer.add_reminders(batch)
+        self.scheduler.add_many(reminders)
+        return len(reminders)
+
+    @staticmethod
+    def _rows(f: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+        """(line number, row) pairs; a row is a dict, or None if it cannot be read"""
+        if fmt == 'jsonl':
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError:
+                    row = None
+                yield line, row if isinstance(row, dict) else None
+            return
+        header = f.readline()
+        # Spreadsheets in many locales separate fields with semicolons
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        columns = [column.strip().lower() for column in next(csv.reader([header], delimiter=delimiter), [])]
+        reader = csv.reader(f, delimiter=delimiter)
+        for fields in reader:
+            if fields:
+                # The header was line 1
+                yield reader.line_num + 1, dict(zip(columns, fields))
+
+    @staticmethod
+    def _reminder(user_id: int, row: Dict[str, Any], timezone: str) -> Reminder:
+        """Validate one row; raises ValueError if it is not a usable reminder"""
+        text = str(row.get('text') or '').strip()
+        if not text or len(text) > MESSAGE_LIMIT:
+            raise ValueError("Reminder text is empty or too long")
+        zone = str(row.get('timezone') or '').strip()
+        if zone:
+            timezone = normalize_timezone(zone)
+            if timezone is None:
+                raise ValueError("Unknown timezone")
+        rule = str(row.get('recurrence') or '').strip()
+        now = datetime.utcnow()
+        if rule:
+            recurrence = parse_recurrence(rule)
+            reminder_time = next_occurrence(recurrence, timezone, now)
+            return Reminder(
+                user_id=user_id, text=text, reminder_time=reminder_time,
+                recurrence=recurrence, timezone=timezone
+            )
+        reminder_time = to_utc(get_parser(timezone).parse_any(str(row.get('time') or '')))
+        if reminder_time <= now:
+            raise ValueError("Reminder time has passed")
+        return Reminder(user_id=user_id, text=text, reminder_time=reminder_time)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+class UpdateQueue(asyncio.Queue):
+    """Update queue that holds back updates while too many are in flight
+
+    The application takes updates off this queue and starts processing
+    each one right away. `get` waits while `limit` taken updates are
+    unfinished (task_done not called yet), so the queue fills up to its
+    `maxsize` and the updater's put blocks: polling stops calling
+    getUpdates and webhook requests wait, leaving the rest with Telegram.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__(maxsize=limit)
+        self.limit = limit
+        self.in_flight = 0
+        self._released = asyncio.Event()
+
+    async def get(self) -> Any:
+        while self.in_flight >= self.limit:
+            self._released.clear()
+            await self._released.wait()
+        item = await super().get()
+        self.in_flight += 1
+        return item
+
+    def task_done(self) -> None:
+        super().task_done()
+        # Updates dropped at shutdown are marked done without being taken
+        self.in_flight = max(0, self.in_flight - 1)
+        self._released.set()
+
+class _ChatSlot:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different chats concurrently, those of one chat in order
+
+    Up to `concurrency` handlers run at once. Updates of the same chat
+    wait for each other before taking a slot, so a chat sending many
+    updates cannot hold the slots other chats need, and the conversation
+    state machine sees each chat's updates one by one in arrival order
+    (the application starts them in that order and the chat lock is
+    FIFO). Updates without a chat or user are not serialized.
+    """
+
+    def __init__(self, concurrency: int, max_in_flight: int):
+        # The base semaphore bounds updates started, waiting for their chat included
+        super().__init__(max(concurrency, max_in_flight))
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._chats: Dict[Hashable, _ChatSlot] = {}
+        self.active = 0
+        self.waiting = 0
+        self.processed = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Updates running and waiting, chats with pending updates and total processed"""
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'chats': len(self._chats),
+            'processed': self.processed,
+        }
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.waiting += 1
+        key = self._chat_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        chat = self._chats.get(key)
+        if chat is None:
+            chat = self._chats[key] = _ChatSlot()
+        chat.users += 1
+        try:
+            async with chat.lock:
+                await self._run(coroutine)
+        finally:
+            chat.users -= 1
+            if not chat.users:
+                del self._chats[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self.waiting -= 1
+            self.active += 1
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+                self.processed += 1
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return ('user', update.effective_user.id)
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
\ No newline at end of file
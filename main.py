@@ -1,5 +1,9 @@
 # main.py
+import asyncio
 import logging
+import signal
+import time
+from typing import Any, Dict, List
 from telegram.ext import (
     Application,
     CommandHandler as TelegramCommandHandler,
@@ -11,10 +15,21 @@ from telegram.ext import (
 )
 
 from telegram import Update
+from telegram.request import HTTPXRequest
 
 from config import Config
 from handlers.command_handler import CommandHandler, ConversationStates
 from handlers.callback_handler import CallbackHandlers
+from handlers.flood_control import FloodControl
+from handlers.update_processor import ChatOrderedUpdateProcessor, UpdateQueue
+from database.cache import get_reminder_cache
+from database.db_handler import DatabaseHandler, dispose_engine, uses_memory_store
+from database.persistence import DatabasePersistence
+from database.retention import RetentionService
+from database.writer import GroupCommitWriter
+from scheduler.reminder_scheduler import ReminderScheduler
+from utils.metrics import REGISTRY, MetricsServer, StatsMetrics
+from utils.profiling import TRACER, SamplingProfiler, phase
 
 # Enable logging
 logging.basicConfig(
@@ -23,18 +38,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Update types each handler class can consume
+HANDLER_UPDATE_TYPES: Dict[type, List[str]] = {
+    TelegramCommandHandler: [Update.MESSAGE],
+    MessageHandler: [Update.MESSAGE],
+    CallbackQueryHandler: [Update.CALLBACK_QUERY],
+    # Only limits updates the other handlers consume
+    FloodControl: [],
+}
+
+class TracedRequest(HTTPXRequest):
+    """Bot API requests, counted as the send phase of traced updates"""
+
+    do_request = phase('send')(HTTPXRequest.do_request)
+
 class ReminderBot:
     """Main bot class that handles all setup and initialization"""
     
     def __init__(self):
         """Initialize bot with handlers"""
-        self.application = Application.builder().token(Config.BOT_TOKEN).build()
-        self.command_handler = CommandHandler()
-        self.callback_handlers = CallbackHandlers()
+        started = time.perf_counter()
+        Config.load()
+        TRACER.threshold = Config.SLOW_UPDATE_THRESHOLD
+        self.profiler = SamplingProfiler(Config.PROFILE_DIR, Config.PROFILE_INTERVAL)
+        self.persistence = DatabasePersistence()
+        self.update_processor = ChatOrderedUpdateProcessor(
+            Config.CONCURRENT_UPDATES, Config.MAX_PENDING_UPDATES
+        )
+        builder = (
+            Application.builder()
+            .token(Config.BOT_TOKEN)
+            .concurrent_updates(self.update_processor)
+            .update_queue(UpdateQueue(Config.MAX_PENDING_UPDATES))
+            .request(TracedRequest(connection_pool_size=Config.CONNECTION_POOL_SIZE))
+            .persistence(self.persistence)
+            # Reminders are dispatched by ReminderScheduler, not APScheduler
+            .job_queue(None)
+            .post_init(self._post_init)
+            .post_stop(self._post_stop)
+            .post_shutdown(self._post_shutdown)
+        )
+        if Config.BOT_API_BASE_URL:
+            builder = (
+                builder
+                .base_url(f"{Config.BOT_API_BASE_URL}/bot")
+                .base_file_url(f"{Config.BOT_API_BASE_URL}/file/bot")
+            )
+        self.application = builder.build()
+        self.scheduler = ReminderScheduler(self.application)
+        self.writer = GroupCommitWriter()
+        self.command_handler = CommandHandler(self.scheduler, self.writer, self.profiler)
+        self.callback_handlers = CallbackHandlers(self.scheduler, self.writer)
+        self.retention = RetentionService()
+        self.flood_control = None
+        if Config.FLOOD_TRACKED_USERS:
+            self.flood_control = FloodControl(
+                Config.FLOOD_LIMITS, Config.FLOOD_TRACKED_USERS, Config.FLOOD_MAX_DELAY
+            )
+        self.metrics_server = MetricsServer(REGISTRY, Config.METRICS_HOST, Config.METRICS_PORT)
         self._setup_handlers()
+        self._register_metrics()
+        # Milliseconds spent in each startup phase, logged once ready
+        self.startup: Dict[str, float] = {'init_ms': (time.perf_counter() - started) * 1000}
+        self._initializing_since = time.perf_counter()
 
     def _setup_handlers(self) -> None:
         """Setup all bot handlers"""
+        # Rate limits run first and stop excess updates before the handlers below
+        if self.flood_control is not None:
+            self.application.add_handler(self.flood_control, group=-1)
+
         # Add conversation handler
         self.application.add_handler(self._create_conversation_handler())
         
@@ -48,6 +121,23 @@ class ReminderBot:
         self.application.add_handler(
             TelegramCommandHandler('list', self.command_handler.list_reminders_handler)
         )
+        self.application.add_handler(
+            TelegramCommandHandler('timezone', self.command_handler.timezone_handler)
+        )
+        self.application.add_handler(
+            TelegramCommandHandler('export', self.command_handler.export_handler)
+        )
+        self.application.add_handler(
+            TelegramCommandHandler('import', self.command_handler.import_prompt_handler)
+        )
+        self.application.add_handler(
+            MessageHandler(filters.Document.ALL, self.command_handler.import_handler)
+        )
+        if Config.ADMIN_IDS:
+            self.application.add_handler(TelegramCommandHandler(
+                'profile', self.command_handler.profile_handler,
+                filters=filters.User(user_id=Config.ADMIN_IDS)
+            ))
         
         # Add callback query handler
         self.application.add_handler(
@@ -57,11 +147,49 @@ class ReminderBot:
         # Add error handler
         self.application.add_error_handler(self._error_handler)
 
+    def _register_metrics(self) -> None:
+        """Expose the counters of the storage components"""
+        REGISTRY.register(StatsMetrics(
+            'reminder_bot_writer', 'Group-commit writer', self.writer.stats,
+            counters=('commits', 'written')
+        ))
+        REGISTRY.register(StatsMetrics(
+            'reminder_bot_cache', 'Reminder cache', get_reminder_cache().stats,
+            counters=('hits', 'misses', 'evictions', 'invalidations')
+        ))
+        REGISTRY.register(StatsMetrics(
+            'reminder_bot_updates', 'Update processing', self.update_processor.stats,
+            counters=('processed',)
+        ))
+        REGISTRY.register(StatsMetrics(
+            'reminder_bot_persistence', 'Conversation persistence', self.persistence.stats,
+            counters=('flushes', 'flushed_entries')
+        ))
+        REGISTRY.register(StatsMetrics(
+            'reminder_bot_startup', 'Startup phases',
+            lambda: dict(self.startup, rehydrate_ms=self.scheduler.rehydrate_ms)
+        ))
+        if self.flood_control is not None:
+            REGISTRY.register(StatsMetrics(
+                'reminder_bot_flood', 'Inbound flood control', self.flood_control.stats,
+                counters=('passed', 'delayed', 'dropped')
+            ))
+        if uses_memory_store():
+            from database.memory_store import get_memory_store
+            REGISTRY.register(StatsMetrics(
+                'reminder_bot_memory_store', 'Embedded memory store', lambda: get_memory_store().stats(),
+                counters=('journal_records', 'journal_fsyncs', 'snapshots')
+            ))
+
     def _create_conversation_handler(self) -> ConversationHandler:
         """Create and return the conversation handler"""
         return ConversationHandler(
             entry_points=[
-                TelegramCommandHandler('new', self.command_handler.new_reminder_handler)
+                TelegramCommandHandler('new', self.command_handler.new_reminder_handler),
+                CallbackQueryHandler(
+                    self.callback_handlers.handle_snooze_reminder,
+                    pattern='^snooze_reminder:'
+                )
             ],
             states={
                 ConversationStates.WAITING_FOR_TEXT: [
@@ -87,11 +215,28 @@ class ReminderBot:
                         filters.TEXT & ~filters.COMMAND,
                         self.command_handler.delay_time_handler
                     )
+                ],
+                ConversationStates.ENTERING_RECURRENCE: [
+                    MessageHandler(
+                        filters.TEXT & ~filters.COMMAND,
+                        self.command_handler.recurrence_handler
+                    )
+                ],
+                ConversationStates.ENTERING_SNOOZE_TIME: [
+                    MessageHandler(
+                        filters.TEXT & ~filters.COMMAND,
+                        self.command_handler.snooze_time_handler
+                    )
                 ]
             },
             fallbacks=[
                 TelegramCommandHandler('cancel', self.command_handler.cancel_handler)
-            ]
+            ],
+            # Survives restarts together with user_data through DatabasePersistence
+            name='new_reminder',
+            persistent=True,
+            # /new or a snooze button starts over from any step
+            allow_reentry=True
         )
 
     async def _error_handler(self, update: object, context: object) -> None:
@@ -104,6 +249,46 @@ class ReminderBot:
                 text="Вибачте, сталася помилка при обробці вашого запиту."
             )
 
+    async def _post_init(self, application: Application) -> None:
+        """Prepare database schema and start the background services"""
+        await DatabaseHandler.init_db()
+        if Config.ARCHIVE_VACUUM_CONVERT:
+            # Blocks writers while the file is rewritten, so before anything runs
+            await self.retention.convert_to_incremental()
+        self.writer.start()
+        await self.scheduler.start()
+        self.retention.start()
+        if Config.METRICS_PORT:
+            await self.metrics_server.start()
+        if hasattr(signal, 'SIGUSR1'):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self._profile_on_signal)
+        # Includes get_me and loading persisted conversations in initialize()
+        self.startup['initialize_ms'] = (time.perf_counter() - self._initializing_since) * 1000
+        logger.info(
+            "Ready: handlers wired in %.0f ms, initialized in %.0f ms",
+            self.startup['init_ms'], self.startup['initialize_ms']
+        )
+
+    async def _post_stop(self, application: Application) -> None:
+        """Commit queued writes and drain delivery while the bot can still send"""
+        await self.writer.stop()
+        await self.scheduler.stop()
+        await self.retention.stop()
+
+    async def _post_shutdown(self, application: Application) -> None:
+        """Stop serving metrics and release pooled database connections"""
+        if hasattr(signal, 'SIGUSR1'):
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+        await self.metrics_server.stop()
+        await dispose_engine()
+
+    def _profile_on_signal(self) -> None:
+        """SIGUSR1: profile for PROFILE_SECONDS, unless a session is running"""
+        if self.profiler.running:
+            logger.info("Profiling already in progress")
+            return
+        self.application.create_task(self.profiler.run(Config.PROFILE_SECONDS))
+
     async def setup_commands(self) -> None:
         """Setup bot commands in Telegram interface"""
         await self.application.bot.set_my_commands([
@@ -111,12 +296,50 @@ class ReminderBot:
             for command, description in Config.COMMANDS.items()
         ])
 
+    def allowed_updates(self) -> List[str]:
+        """Update types consumed by the registered handlers"""
+        types = set()
+        pending = [h for group in self.application.handlers.values() for h in group]
+        while pending:
+            handler = pending.pop()
+            if isinstance(handler, ConversationHandler):
+                pending.extend(handler.entry_points)
+                pending.extend(handler.fallbacks)
+                for state_handlers in handler.states.values():
+                    pending.extend(state_handlers)
+                continue
+            for handler_type, update_types in HANDLER_UPDATE_TYPES.items():
+                if isinstance(handler, handler_type):
+                    types.update(update_types)
+                    break
+            else:
+                # Unknown handler: don't risk starving it of updates
+                return Update.ALL_TYPES
+        return sorted(types)
+
+    def webhook_options(self) -> Dict[str, Any]:
+        """Arguments shared by run_webhook and Updater.start_webhook"""
+        return {
+            'listen': Config.WEBHOOK_LISTEN,
+            'port': Config.WEBHOOK_PORT,
+            'url_path': Config.WEBHOOK_PATH,
+            'webhook_url': f"{Config.WEBHOOK_URL.rstrip('/')}/{Config.WEBHOOK_PATH}",
+            'secret_token': Config.WEBHOOK_SECRET_TOKEN,
+            'max_connections': Config.WEBHOOK_MAX_CONNECTIONS,
+            'allowed_updates': self.allowed_updates(),
+        }
+
     def run(self) -> None:
         """Start the bot"""
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        if Config.RUN_MODE == 'webhook':
+            self.application.run_webhook(**self.webhook_options())
+        else:
+            self.application.run_polling(allowed_updates=self.allowed_updates())
 
 def main() -> None:
     """Main function to run the bot"""
+    Config.load()
+    Config.validate()
     bot = ReminderBot()
     bot.run()
 
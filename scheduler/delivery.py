@@ -0,0 +1,392 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from telegram import Bot
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+from config import Config
+from database.db_handler import DatabaseHandler, Reminder
+from scheduler.dispatch_engine import DueBatch
+from utils.keyboard_maker import get_combined_snooze_keyboard, get_snooze_keyboard
+from utils.recurrence import next_occurrence
+
+logger = logging.getLogger(__name__)
+
+# Room left in a combined message for its header and item numbers
+COMBINED_HEADER_LENGTH = 32
+COMBINED_ITEM_OVERHEAD = 6
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of polling"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take one token and return how long to wait before using it"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class ChatSlot:
+    """Send serialization point for one chat"""
+    __slots__ = ('lock', 'next_at', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.next_at = 0.0
+        # Senders inside slot(), holding or waiting for the lock
+        self.users = 0
+
+class RateLimiter:
+    """Global plus per-chat outbound limits for the Bot API
+
+    Sends to one chat are serialized and spaced by the per-chat interval
+    measured from the previous send's completion; all sends share one
+    global token bucket.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, max_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, 1)
+        self.chat_interval = 1.0 / chat_rate
+        self.max_chats = max_chats
+        self._chats: Dict[int, ChatSlot] = {}
+
+    @asynccontextmanager
+    async def slot(self, chat_id: int) -> AsyncIterator[None]:
+        """Hold the right to send one message to `chat_id`"""
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if len(self._chats) >= self.max_chats:
+                self._prune()
+            chat = self._chats[chat_id] = ChatSlot()
+
+        # Counted before the first await, so the slot is never pruned under a sender
+        chat.users += 1
+        try:
+            async with chat.lock:
+                delay = chat.next_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                delay = self.global_bucket.reserve(time.monotonic())
+                if delay:
+                    await asyncio.sleep(delay)
+                try:
+                    yield
+                finally:
+                    chat.next_at = max(chat.next_at, time.monotonic() + self.chat_interval)
+        finally:
+            chat.users -= 1
+
+    def pause(self, chat_id: int, seconds: float) -> None:
+        """Hold the chat's next send after Telegram answered with retry_after"""
+        chat = self._chats.get(chat_id)
+        if chat is not None:
+            chat.next_at = max(chat.next_at, time.monotonic() + seconds)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for chat_id in [c for c, s in self._chats.items() if s.next_at < now and not s.users]:
+            del self._chats[chat_id]
+
+class DeliveryPipeline:
+    """Delivers due reminders in batches through the rate limiter
+
+    Batches handed over by the dispatch engine are queued, leased to this
+    worker in one atomic UPDATE and sent concurrently under the global and
+    per-chat limits, so several workers can share a database without
+    double delivery. Each message's reminders are deactivated as soon as
+    it is sent, sharing a transaction with those sent meanwhile, so a
+    crash only repeats the messages in flight.
+    Reminders due together for the same chat are combined into one
+    message with a row of buttons per item; the pipeline waits
+    `coalesce_window` seconds after a batch arrives to collect the ones
+    due right after it.
+    Recurring reminders are moved to their next occurrence instead and
+    reported through `on_advance`. Reminders that could not be sent are
+    handed back through `on_retry`, and settled like delivered ones once
+    they run out of attempts.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        on_retry: Callable[[int, int, float], None],
+        on_advance: Optional[Callable[[int, int, datetime], None]] = None
+    ):
+        self.bot = bot
+        self.on_retry = on_retry
+        self.on_advance = on_advance
+        self.limiter = RateLimiter(Config.DELIVERY_GLOBAL_RATE, Config.DELIVERY_CHAT_RATE)
+        self.batch_size = Config.SCHEDULER_BATCH_SIZE
+        self.max_retries = Config.DELIVERY_MAX_RETRIES
+        self.retry_delay = Config.DELIVERY_RETRY_DELAY
+        self.coalesce_window = Config.DELIVERY_COALESCE_WINDOW
+        self.coalesce_max = Config.DELIVERY_COALESCE_MAX
+        self.worker_id = Config.WORKER_ID
+        self.lease = timedelta(seconds=Config.CLAIM_LEASE)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=Config.DELIVERY_QUEUE_SIZE)
+        self._attempts: Dict[int, int] = {}
+        # Reminders queued or being sent, so sweeps don't hand them over again
+        self._pending: Set[int] = set()
+        # Given up after max_retries; kept from sweeps even if recording that failed
+        self._abandoned: Set[int] = set()
+        # Sent messages waiting for their reminders to be recorded as done
+        self._unsettled: List[Tuple[List[Reminder], int, asyncio.Future]] = []
+        self._settle_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stopping = False
+        self.delivered = 0
+        self.messages = 0
+        self.failed = 0
+        self.throughput = 0.0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name='delivery_pipeline')
+
+    async def stop(self) -> None:
+        """Finish the batch being sent, then stop"""
+        if self._task is not None:
+            self._stopping = True
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.lease.total_seconds())
+            except asyncio.TimeoutError:
+                logger.warning("Stopping delivery with a batch still in flight")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def __contains__(self, reminder_id: int) -> bool:
+        """Whether the reminder is queued, being sent, waiting to retry or given up"""
+        return reminder_id in self._pending or reminder_id in self._attempts or reminder_id in self._abandoned
+
+    async def submit(self, batch: DueBatch) -> None:
+        """Queue a due batch; waits when the pipeline is saturated"""
+        reminder_ids = [reminder_id for reminder_id, _ in batch]
+        self._pending.update(reminder_ids)
+        try:
+            await self.queue.put(batch)
+        except BaseException:
+            self._pending.difference_update(reminder_ids)
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        """Delivery counters and the latest batch throughput and lag"""
+        return {
+            'delivered': self.delivered,
+            'messages': self.messages,
+            'failed': self.failed,
+            'queued_batches': self.queue.qsize(),
+            'throughput': self.throughput,
+            'max_lag': self.max_lag,
+        }
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            batch = list(await self.queue.get())
+            self._idle.clear()
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.extend(self.queue.get_nowait())
+            try:
+                await self.process(batch)
+            except Exception as e:
+                logger.error(f"Delivery of {len(batch)} reminders failed: {e}")
+                for reminder_id, chat_id in batch:
+                    self._retry(reminder_id, chat_id)
+            finally:
+                # Retried reminders are back in the dispatch engine by now
+                self._pending.difference_update(reminder_id for reminder_id, _ in batch)
+                self._idle.set()
+
+    async def process(self, batch: DueBatch) -> None:
+        """Claim, send and settle one batch of due reminders"""
+        started = time.monotonic()
+        chats = dict(batch)
+        async with DatabaseHandler() as db:
+            reminders = await db.claim_reminders(list(chats), self.worker_id, self.lease)
+        if not reminders:
+            return
+
+        chat_ids = {reminder.id: chats.get(reminder.id) or reminder.user_id for reminder in reminders}
+        messages = self._group(reminders, chat_ids)
+        delivered = sum(await asyncio.gather(*(
+            self._deliver(group, chat_id) for chat_id, group in messages
+        )))
+
+        elapsed = time.monotonic() - started
+        now = datetime.utcnow()
+        self.delivered += delivered
+        self.throughput = delivered / elapsed if elapsed else float(delivered)
+        self.max_lag = max((now - r.reminder_time).total_seconds() for r in reminders)
+        logger.info(
+            "Delivered %d/%d reminders in %d messages, %.2fs (%.1f reminders/s, max lag %.1fs, %d batches queued)",
+            delivered, len(reminders), len(messages), elapsed, self.throughput, self.max_lag, self.queue.qsize()
+        )
+
+    async def _deliver(self, reminders: List[Reminder], chat_id: int) -> int:
+        """Send one message and record its outcome at once; returns reminders delivered
+
+        Settling each message right after it is sent, rather than the
+        whole batch at the end, limits what a crash can send twice to
+        the messages in flight and the ones waiting to be recorded.
+        """
+        if await self._send(reminders, chat_id):
+            settled, delivered = reminders, len(reminders)
+        else:
+            # Reminders out of attempts are settled as if sent, so sweeps leave them alone
+            settled = [reminder for reminder in reminders if not self._retry(reminder.id, chat_id)]
+            delivered = 0
+        if settled:
+            try:
+                await self._settle(settled, chat_id)
+                self._abandoned.difference_update(reminder.id for reminder in settled)
+            except Exception as e:
+                # Still leased to this worker; picked up again once a sweep finds them
+                logger.error(f"Failed to record delivery of reminders {[r.id for r in settled]}: {e}")
+        return delivered
+
+    async def _settle(self, reminders: List[Reminder], chat_id: int) -> None:
+        """Record reminders as done; messages settled together share one transaction
+
+        Settles arriving while a write is in flight are collected and
+        written by the next one, like the group-commit writer does for
+        the handlers' writes.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._unsettled.append((reminders, chat_id, future))
+        if self._settle_task is None:
+            self._settle_task = asyncio.create_task(self._flush_settled(), name='delivery_settle')
+        await future
+
+    async def _flush_settled(self) -> None:
+        try:
+            while self._unsettled:
+                entries, self._unsettled = self._unsettled, []
+                try:
+                    await self._write_settled(entries)
+                except Exception as e:
+                    for _, _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, _, future in entries:
+                        if not future.done():
+                            future.set_result(None)
+        finally:
+            self._settle_task = None
+
+    async def _write_settled(self, entries: List[Tuple[List[Reminder], int, asyncio.Future]]) -> None:
+        """Deactivate one-off reminders and move recurring ones to their next occurrence"""
+        reminders = [reminder for group, _, _ in entries for reminder in group]
+        chat_ids = {reminder.id: chat_id for group, chat_id, _ in entries for reminder in group}
+        finished = [reminder.id for reminder in reminders if not reminder.recurrence]
+        next_times = self._next_occurrences(reminder for reminder in reminders if reminder.recurrence)
+        async with DatabaseHandler() as db:
+            if finished:
+                await db.deactivate_reminders(finished, claimed_by=self.worker_id)
+            if next_times:
+                await db.advance_reminders(next_times, claimed_by=self.worker_id)
+        if self.on_advance is not None:
+            for fire_at, reminder_ids in next_times.items():
+                for reminder_id in reminder_ids:
+                    self.on_advance(reminder_id, chat_ids[reminder_id], fire_at)
+
+    def _next_occurrences(self, reminders: Iterable[Reminder]) -> Dict[datetime, List[int]]:
+        """Group recurring reminders by their next fire time"""
+        now = datetime.utcnow()
+        next_times: Dict[datetime, List[int]] = {}
+        for reminder in reminders:
+            fire_at = next_occurrence(reminder.recurrence, reminder.timezone, max(reminder.reminder_time, now))
+            next_times.setdefault(fire_at, []).append(reminder.id)
+        return next_times
+
+    def _group(
+        self,
+        reminders: List[Reminder],
+        chat_ids: Dict[int, int]
+    ) -> List[Tuple[int, List[Reminder]]]:
+        """Split reminders into messages: one per chat, within Telegram's size limits"""
+        by_chat: Dict[int, List[Reminder]] = {}
+        for reminder in reminders:
+            by_chat.setdefault(chat_ids[reminder.id], []).append(reminder)
+
+        budget = MessageLimit.MAX_TEXT_LENGTH - COMBINED_HEADER_LENGTH
+        messages = []
+        for chat_id, chat_reminders in by_chat.items():
+            group, length = [], 0
+            for reminder in chat_reminders:
+                item_length = len(reminder.text) + COMBINED_ITEM_OVERHEAD
+                if group and (len(group) >= self.coalesce_max or length + item_length > budget):
+                    messages.append((chat_id, group))
+                    group, length = [], 0
+                group.append(reminder)
+                length += item_length
+            messages.append((chat_id, group))
+        return messages
+
+    @staticmethod
+    def _render(reminders: List[Reminder]):
+        """Text and keyboard of the message delivering `reminders`"""
+        if len(reminders) == 1:
+            return f"🔔 Нагадування!\n\n{reminders[0].text}", get_snooze_keyboard(reminders[0].id)
+        items = '\n'.join(f"{number}. {reminder.text}" for number, reminder in enumerate(reminders, 1))
+        return (
+            f"🔔 Нагадування ({len(reminders)})!\n\n{items}",
+            get_combined_snooze_keyboard([reminder.id for reminder in reminders])
+        )
+
+    async def _send(self, reminders: List[Reminder], chat_id: int) -> bool:
+        """Send one message for reminders of a chat; True when they no longer need delivery"""
+        text, reply_markup = self._render(reminders)
+        reminder_ids = [reminder.id for reminder in reminders]
+        for _ in range(self.max_retries):
+            try:
+                async with self.limiter.slot(chat_id):
+                    await self.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+                self.messages += 1
+                for reminder_id in reminder_ids:
+                    self._attempts.pop(reminder_id, None)
+                return True
+            except RetryAfter as e:
+                self.limiter.pause(chat_id, e.retry_after)
+            except (Forbidden, BadRequest) as e:
+                # Chat is gone or the bot was blocked; retrying cannot help
+                logger.warning(f"Dropping reminders {reminder_ids} for chat {chat_id}: {e}")
+                for reminder_id in reminder_ids:
+                    self._attempts.pop(reminder_id, None)
+                return True
+            except TelegramError as e:
+                logger.warning(f"Failed to send reminders {reminder_ids}: {e}")
+                break
+
+        self.failed += len(reminder_ids)
+        return False
+
+    def _retry(self, reminder_id: int, chat_id: int) -> bool:
+        """Hand a reminder back for a later attempt; False once it is given up"""
+        attempts = self._attempts.get(reminder_id, 0) + 1
+        if attempts > self.max_retries:
+            logger.error(f"Giving up on reminder {reminder_id} after {attempts - 1} attempts")
+            self._attempts.pop(reminder_id, None)
+            self._abandoned.add(reminder_id)
+            return False
+        self._attempts[reminder_id] = attempts
+        self.on_retry(reminder_id, chat_id, self.retry_delay * attempts)
+        return True
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# (reminder_id, chat_id) pairs handed to the sender
+DueBatch = List[Tuple[int, int]]
+
+def to_timestamp(dt: datetime) -> float:
+    """Convert datetime (naive values are UTC) to a POSIX timestamp"""
+    if dt.tzinfo is None:
+        dt = pytz.utc.localize(dt)
+    return dt.timestamp()
+
+class DispatchEngine:
+    """Min-heap of pending reminders served by a single asyncio task
+
+    Every pending reminder costs one heap tuple and one dict slot. Cancelling
+    or rescheduling only touches the dict; stale heap entries are skipped
+    when popped and purged once they outnumber live ones. The task sleeps
+    until the earliest deadline (or at most `tick` seconds) and hands
+    everything that became due to `on_due` as one batch.
+    """
+
+    def __init__(
+        self,
+        on_due: Callable[[DueBatch], Awaitable[None]],
+        tick: float = 1.0,
+        max_batch: int = 1000
+    ):
+        self.on_due = on_due
+        self.tick = tick
+        self.max_batch = max_batch
+        self._heap: List[Tuple[float, int]] = []
+        self._pending: Dict[int, Tuple[float, int]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, reminder_id: int) -> bool:
+        return reminder_id in self._pending
+
+    def schedule(self, reminder_id: int, chat_id: int, when: float) -> None:
+        """Add or move a reminder; `when` is a POSIX timestamp"""
+        self._pending[reminder_id] = (when, chat_id)
+        heapq.heappush(self._heap, (when, reminder_id))
+        if self._heap[0][1] == reminder_id:
+            self._wakeup.set()
+
+    def schedule_many(self, entries: List[Tuple[int, int, float]]) -> None:
+        """Add or move many (reminder_id, chat_id, when) entries at once
+
+        A batch that is large next to the heap is merged with one heapify
+        instead of a push per entry.
+        """
+        if not entries:
+            return
+        pending = self._pending
+        heap = self._heap
+        for reminder_id, chat_id, when in entries:
+            pending[reminder_id] = (when, chat_id)
+        if len(entries) * 8 > len(heap):
+            heap.extend((when, reminder_id) for reminder_id, _, when in entries)
+            heapq.heapify(heap)
+        else:
+            for reminder_id, _, when in entries:
+                heapq.heappush(heap, (when, reminder_id))
+        if heap[0][0] <= min(when for _, _, when in entries):
+            self._wakeup.set()
+
+    def cancel(self, reminder_id: int) -> bool:
+        """Forget a pending reminder"""
+        if self._pending.pop(reminder_id, None) is None:
+            return False
+        if len(self._heap) > 2 * len(self._pending) + 1024:
+            self._compact()
+        return True
+
+    def pop_due(self, now: float) -> DueBatch:
+        """Remove and return reminders due at `now`, up to `max_batch`"""
+        heap = self._heap
+        pending = self._pending
+        batch: DueBatch = []
+        while heap and heap[0][0] <= now and len(batch) < self.max_batch:
+            when, reminder_id = heapq.heappop(heap)
+            entry = pending.get(reminder_id)
+            if entry is None or entry[0] != when:
+                continue
+            del pending[reminder_id]
+            batch.append((reminder_id, entry[1]))
+        return batch
+
+    def next_deadline(self) -> Optional[float]:
+        """Timestamp of the earliest live entry"""
+        heap = self._heap
+        while heap:
+            when, reminder_id = heap[0]
+            entry = self._pending.get(reminder_id)
+            if entry is not None and entry[0] == when:
+                return when
+            heapq.heappop(heap)
+        return None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name='dispatch_engine')
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _compact(self) -> None:
+        self._heap = [(when, reminder_id) for reminder_id, (when, _) in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    async def _run(self) -> None:
+        while True:
+            batch = self.pop_due(time.time())
+            if batch:
+                try:
+                    await self.on_due(batch)
+                except Exception as e:
+                    logger.error(f"Dispatch of {len(batch)} reminders failed: {e}")
+                continue
+
+            deadline = self.next_deadline()
+            timeout = self.tick if deadline is None else min(self.tick, deadline - time.time())
+            self._wakeup.clear()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
\ No newline at end of file
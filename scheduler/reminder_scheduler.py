@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+from telegram.ext import Application
+from config import Config
+from database.db_handler import DatabaseHandler, Reminder, to_utc
+from scheduler.delivery import DeliveryPipeline
+from scheduler.dispatch_engine import DispatchEngine, to_timestamp
+from utils.metrics import REGISTRY, Gauge, StatsMetrics
+from utils.recurrence import next_occurrence
+
+logger = logging.getLogger(__name__)
+
+class ReminderScheduler:
+    """Restart-safe scheduler backed by the reminders table
+
+    Only reminders due within the next `Config.SCHEDULER_WINDOW` seconds are
+    kept in the dispatch engine; the window is advanced lazily, so memory
+    stays bounded by near-term load rather than by the total number of
+    pending reminders. With several workers each one rehydrates its own
+    shard of users and periodically sweeps the database for due reminders
+    it may claim, including those of workers that stopped responding.
+    """
+
+    def __init__(self, application: Application):
+        self.application = application
+        self.window = timedelta(seconds=Config.SCHEDULER_WINDOW)
+        self.grace = timedelta(seconds=Config.SCHEDULER_MISSED_GRACE)
+        self.batch_size = Config.SCHEDULER_BATCH_SIZE
+        self.shard = (Config.WORKER_COUNT, Config.WORKER_INDEX)
+        self.sweep_interval = Config.CLAIM_SWEEP_INTERVAL
+        self.takeover_after = timedelta(seconds=Config.CLAIM_LEASE)
+        self.pipeline = DeliveryPipeline(
+            application.bot,
+            on_retry=self._retry,
+            on_advance=self._schedule_next
+        )
+        self.engine = DispatchEngine(
+            self.pipeline.submit,
+            tick=Config.DISPATCH_TICK,
+            max_batch=Config.SCHEDULER_BATCH_SIZE
+        )
+        self._horizon: Optional[datetime] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        # Reminders cancelled while rehydrating, None once it has finished
+        self._cancelled: Optional[Set[int]] = None
+        self.rehydrate_ms = 0.0
+        REGISTRY.register(Gauge(
+            'reminder_bot_scheduler_pending', 'Reminders waiting in the dispatch engine',
+            lambda: self.pending_count
+        ))
+        REGISTRY.register(Gauge(
+            'reminder_bot_scheduler_due_lag_seconds', 'How long the earliest due reminder has waited to be handed to delivery',
+            self.due_lag
+        ))
+        REGISTRY.register(StatsMetrics(
+            'reminder_bot_delivery', 'Delivery pipeline', self.pipeline.stats,
+            counters=('delivered', 'messages', 'failed')
+        ))
+
+    async def start(self) -> None:
+        """Start dispatching; pending reminders are rehydrated in the background
+
+        Updates are served while the window loads. Reminders the handlers
+        add, move or cancel meanwhile keep what the handlers did.
+        """
+        self._horizon = datetime.utcnow() + self.window
+        self._cancelled = set()
+        self.pipeline.start()
+        self.engine.start()
+        self._refill_task = asyncio.create_task(self._refill_loop(), name='scheduler_refill')
+        self._sweep_task = asyncio.create_task(self._sweep_loop(), name='scheduler_sweep')
+
+    async def _rehydrate(self) -> None:
+        """Load reminders due within the window and settle those missed while offline"""
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        fired = missed = scheduled = 0
+
+        async with DatabaseHandler() as db:
+            async for batch in db.iter_active_reminders(
+                self._horizon, batch_size=self.batch_size, shard=self.shard
+            ):
+                overdue: List[Reminder] = []
+                for reminder in batch:
+                    if reminder.id in self.engine or reminder.id in self._cancelled:
+                        continue
+                    if reminder.reminder_time > now:
+                        scheduled += 1
+                    elif now - reminder.reminder_time <= self.grace:
+                        fired += 1
+                    else:
+                        overdue.append(reminder)
+                        continue
+                    self._register(reminder)
+                if overdue:
+                    missed += await db.deactivate_reminders(r.id for r in overdue if not r.recurrence)
+                    await self._skip_missed(db, [r for r in overdue if r.recurrence], now)
+
+        self.rehydrate_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            "Scheduler rehydrated in %.0f ms: %d scheduled, %d fired late, %d marked missed",
+            self.rehydrate_ms, scheduled, fired, missed
+        )
+
+    async def stop(self) -> None:
+        """Stop dispatching; pending reminders stay in the database"""
+        tasks = [task for task in (self._refill_task, self._sweep_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        # A sweep cut short must release its connection before the engine is disposed
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refill_task = self._sweep_task = None
+        await self.engine.stop()
+        await self.pipeline.stop()
+
+    def add(self, reminder: Reminder) -> None:
+        """Schedule a freshly stored reminder if it falls inside the window"""
+        if self._horizon is None or to_utc(reminder.reminder_time) < self._horizon:
+            self._register(reminder)
+
+    def add_many(self, reminders: Iterable[Reminder]) -> None:
+        """Schedule a batch of freshly stored reminders, those inside the window at once"""
+        entries = []
+        for reminder in reminders:
+            reminder_time = to_utc(reminder.reminder_time)
+            if self._horizon is None or reminder_time < self._horizon:
+                entries.append((reminder.id, reminder.user_id, to_timestamp(reminder_time)))
+        self.engine.schedule_many(entries)
+
+    def cancel(self, reminder_id: int) -> None:
+        """Drop a pending reminder from the dispatch engine"""
+        if self._cancelled is not None:
+            # Rehydration may still hold the reminder as it was before
+            self._cancelled.add(reminder_id)
+        self.engine.cancel(reminder_id)
+
+    def reschedule(self, reminder: Reminder) -> None:
+        """Move a pending reminder to its new time"""
+        self.cancel(reminder.id)
+        self.add(reminder)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.engine)
+
+    def due_lag(self) -> float:
+        """Seconds the earliest reminder in the engine is overdue, 0 if none is"""
+        deadline = self.engine.next_deadline()
+        return 0.0 if deadline is None else max(0.0, time.time() - deadline)
+
+    def _register(self, reminder: Reminder) -> None:
+        self.engine.schedule(
+            reminder.id,
+            reminder.user_id,
+            to_timestamp(to_utc(reminder.reminder_time))
+        )
+
+    async def _refill_loop(self) -> None:
+        try:
+            await self._rehydrate()
+        except Exception as e:
+            logger.error(f"Failed to rehydrate reminders: {e}")
+        finally:
+            self._cancelled = None
+        interval = self.window.total_seconds() / 2
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._advance_window()
+            except Exception as e:
+                logger.error(f"Failed to advance scheduler window: {e}")
+
+    async def _advance_window(self) -> None:
+        """Pull the next slice of reminders into the dispatch engine"""
+        since = self._horizon
+        self._horizon = datetime.utcnow() + self.window
+        async with DatabaseHandler() as db:
+            async for batch in db.iter_active_reminders(
+                self._horizon, since=since, batch_size=self.batch_size, shard=self.shard
+            ):
+                for reminder in batch:
+                    if reminder.id not in self.engine:
+                        self._register(reminder)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self._sweep()
+            except Exception as e:
+                logger.error(f"Failed to sweep due reminders: {e}")
+
+    async def _sweep(self) -> None:
+        """Hand due reminders not tracked by the engine or the pipeline to the pipeline
+
+        Rows this worker claimed stay claimable by it, so the ids it is
+        sending or waiting to retry must be left out here.
+        """
+        async with DatabaseHandler() as db:
+            ids = await db.get_claimable_ids(
+                self.pipeline.worker_id,
+                self.batch_size,
+                shard=self.shard,
+                takeover_after=self.takeover_after
+            )
+        batch = [
+            (reminder_id, 0) for reminder_id in ids
+            if reminder_id not in self.engine and reminder_id not in self.pipeline
+        ]
+        if batch:
+            await self.pipeline.submit(batch)
+
+    async def _skip_missed(self, db: DatabaseHandler, reminders: List[Reminder], now: datetime) -> None:
+        """Move recurring reminders past occurrences missed while offline"""
+        next_times = {}
+        for reminder in reminders:
+            fire_at = next_occurrence(reminder.recurrence, reminder.timezone, now)
+            next_times.setdefault(fire_at, []).append(reminder.id)
+            reminder.reminder_time = fire_at
+            if fire_at < self._horizon:
+                self._register(reminder)
+        if next_times:
+            await db.advance_reminders(next_times)
+
+    def _schedule_next(self, reminder_id: int, chat_id: int, fire_at: datetime) -> None:
+        """Track the next occurrence of a delivered recurring reminder"""
+        if fire_at < self._horizon and reminder_id not in self.engine:
+            self.engine.schedule(reminder_id, chat_id, to_timestamp(fire_at))
+
+    def _retry(self, reminder_id: int, chat_id: int, delay: float) -> None:
+        """Put a reminder that could not be sent back into the engine"""
+        if reminder_id not in self.engine:
+            self.engine.schedule(reminder_id, chat_id, time.time() + delay)
\ No newline at end of file
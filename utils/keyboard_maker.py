@@ -1,3 +1,4 @@
+from typing import List, Optional
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 def get_time_choice_keyboard():
@@ -8,6 +9,9 @@ def get_time_choice_keyboard():
         [
             InlineKeyboardButton("Конкретний час", callback_data="time_type:specific"),
             InlineKeyboardButton("Через проміжок часу", callback_data="time_type:delay")
+        ],
+        [
+            InlineKeyboardButton("Повторювати", callback_data="time_type:recurring")
         ]
     ]
     return InlineKeyboardMarkup(keyboard)
@@ -24,6 +28,65 @@ def get_reminder_management_keyboard(reminder_id: int):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+def get_snooze_keyboard(reminder_id: int):
+    """
+    Create keyboard with one-tap snooze presets for a delivered reminder
+    """
+    keyboard = [
+        [
+            InlineKeyboardButton("⏰ 10 хв", callback_data=f"snooze_preset:{reminder_id}_10m"),
+            InlineKeyboardButton("1 год", callback_data=f"snooze_preset:{reminder_id}_1h"),
+            InlineKeyboardButton("Завтра", callback_data=f"snooze_preset:{reminder_id}_tomorrow")
+        ],
+        [
+            InlineKeyboardButton("Інший час", callback_data=f"snooze_reminder:{reminder_id}")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+def get_combined_snooze_keyboard(reminder_ids: List[int]):
+    """
+    Create keyboard for several reminders delivered in one message: a row of snooze presets per item
+    """
+    keyboard = [
+        [
+            InlineKeyboardButton(f"⏰ {number}: 10 хв", callback_data=f"snooze_preset:{reminder_id}_10m"),
+            InlineKeyboardButton("1 год", callback_data=f"snooze_preset:{reminder_id}_1h"),
+            InlineKeyboardButton("Завтра", callback_data=f"snooze_preset:{reminder_id}_tomorrow"),
+            InlineKeyboardButton("Інший", callback_data=f"snooze_reminder:{reminder_id}")
+        ]
+        for number, reminder_id in enumerate(reminder_ids, 1)
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+def _button_reminder_id(button: InlineKeyboardButton) -> Optional[int]:
+    """Reminder a snooze button acts on, e.g. 12 for "snooze_preset:12_1h\""""
+    _, _, param = (button.callback_data or '').partition(':')
+    reminder_id = param.split('_', 1)[0]
+    return int(reminder_id) if reminder_id.isdigit() else None
+
+def get_keyboard_reminder_ids(markup: Optional[InlineKeyboardMarkup]) -> List[int]:
+    """
+    Distinct reminders a delivered message's buttons refer to, in order
+    """
+    reminder_ids = {}
+    for row in (markup.inline_keyboard if markup else ()):
+        for button in row:
+            reminder_id = _button_reminder_id(button)
+            if reminder_id is not None:
+                reminder_ids[reminder_id] = None
+    return list(reminder_ids)
+
+def remove_reminder_buttons(markup: Optional[InlineKeyboardMarkup], reminder_id: int):
+    """
+    Drop the rows acting on one reminder; None when no buttons are left
+    """
+    keyboard = [
+        row for row in (markup.inline_keyboard if markup else ())
+        if all(_button_reminder_id(button) != reminder_id for button in row)
+    ]
+    return InlineKeyboardMarkup(keyboard) if keyboard else None
+
 def get_confirmation_keyboard(action: str, reminder_id: int):
     """
     Create confirmation keyboard
@@ -34,4 +97,22 @@ def get_confirmation_keyboard(action: str, reminder_id: int):
             InlineKeyboardButton("Ні", callback_data=f"cancel_{action}:{reminder_id}")
         ]
     ]
+    return InlineKeyboardMarkup(keyboard)
+
+def get_reminder_list_keyboard(reminder_ids: List[int], prev_cursor: Optional[str], next_cursor: Optional[str]):
+    """
+    Create keyboard for one /list page: a manage button per reminder and page navigation
+    """
+    buttons = [
+        InlineKeyboardButton(f"⚙️ {number}", callback_data=f"manage_reminder:{reminder_id}")
+        for number, reminder_id in enumerate(reminder_ids, 1)
+    ]
+    keyboard = [buttons[row:row + 5] for row in range(0, len(buttons), 5)]
+    navigation = []
+    if prev_cursor:
+        navigation.append(InlineKeyboardButton("◀️ Назад", callback_data=f"list_prev:{prev_cursor}"))
+    if next_cursor:
+        navigation.append(InlineKeyboardButton("Далі ▶️", callback_data=f"list_next:{next_cursor}"))
+    if navigation:
+        keyboard.append(navigation)
     return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
@@ -0,0 +1,239 @@
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of latency histogram buckets, seconds
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+# (metric name, labels, value) lines of the text exposition format
+Sample = Tuple[str, str, float]
+
+def _labels(name: str, value: str, extra: str = '') -> str:
+    value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'{{{name}="{value}"{extra}}}'
+
+class Counter:
+    """Monotonic counter per label value"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, label: str):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values: Dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1.0) -> None:
+        self._values[label_value] = self._values.get(label_value, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for label_value, value in self._values.items():
+            yield self.name, _labels(self.label, label_value), value
+
+class Histogram:
+    """Latency distribution per label value with fixed buckets
+
+    Observing is a bisect and two list updates; buckets are only made
+    cumulative when scraped.
+    """
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label: str,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = buckets
+        # Per label value: a count per bucket, the +Inf overflow, then the sum
+        self._series: Dict[str, List[float]] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for label_value, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f'{self.name}_bucket', _labels(self.label, label_value, f',le="{le}"'), cumulative
+            yield f'{self.name}_sum', _labels(self.label, label_value), series[-1]
+            yield f'{self.name}_count', _labels(self.label, label_value), cumulative
+
+class Gauge:
+    """Value read from a callback when scraped, so updating it costs nothing"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def samples(self) -> Iterable[Sample]:
+        yield self.name, '', self.read()
+
+class StatsMetrics:
+    """Exposes a component's stats() dict, one metric per key
+
+    Keys listed in `counters` are cumulative and exported as counters,
+    the rest as gauges.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], Dict[str, float]],
+        counters: Iterable[str] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.counters = frozenset(counters)
+
+    def families(self) -> Iterable[Tuple[str, str, str, List[Sample]]]:
+        for key, value in self.read().items():
+            if key in self.counters:
+                name = f'{self.name}_{key}_total'
+                yield name, 'counter', f'{self.documentation}: {key}', [(name, '', value)]
+            else:
+                name = f'{self.name}_{key}'
+                yield name, 'gauge', f'{self.documentation}: {key}', [(name, '', value)]
+
+class Registry:
+    """Named metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Add a metric, replacing one registered under the same name"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                if isinstance(metric, StatsMetrics):
+                    families = list(metric.families())
+                else:
+                    families = [(metric.name, metric.kind, metric.documentation, list(metric.samples()))]
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.extend(f'{sample}{labels} {value:g}' for sample, labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+HANDLER_SECONDS = REGISTRY.register(Histogram(
+    'reminder_bot_handler_seconds', 'Time spent in update handlers', 'handler'
+))
+HANDLER_ERRORS = REGISTRY.register(Counter(
+    'reminder_bot_handler_errors_total', 'Update handlers that raised', 'handler'
+))
+SLOW_UPDATES = REGISTRY.register(Counter(
+    'reminder_bot_slow_updates_total', 'Updates handled slower than SLOW_UPDATE_THRESHOLD', 'handler'
+))
+DB_SECONDS = REGISTRY.register(Histogram(
+    'reminder_bot_db_operation_seconds', 'Time spent in database operations', 'operation'
+))
+DB_ERRORS = REGISTRY.register(Counter(
+    'reminder_bot_db_operation_errors_total', 'Database operations that raised', 'operation'
+))
+
+def timed(histogram: Histogram, errors: Counter, label: str):
+    """Decorator recording the duration and failures of a coroutine function"""
+    observe = histogram.observe
+    perf_counter = time.perf_counter
+
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc(label)
+                raise
+            finally:
+                observe(label, perf_counter() - started)
+        return wrapper
+    return decorate
+
+def instrument(histogram: Histogram, errors: Counter, skip: Iterable[str] = ()):
+    """Class decorator timing every public coroutine method, labelled by its name"""
+    skip = frozenset(skip)
+    def decorate(cls):
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith('_') or name in skip:
+                continue
+            if inspect.iscoroutinefunction(attribute):
+                setattr(cls, name, timed(histogram, errors, name)(attribute))
+        return cls
+    return decorate
+
+class MetricsServer:
+    """Serves a registry on GET /metrics over plain HTTP/1.1"""
+
+    def __init__(self, registry: Registry, host: str, port: int):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving metrics on http://%s:%d/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b'GET' and parts[1].split(b'?')[0] == b'/metrics':
+                status = '200 OK'
+                body = self.registry.render().encode()
+            else:
+                status = '404 Not Found'
+                body = b'Not found\n'
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
\ No newline at end of file
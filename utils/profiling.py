@@ -0,0 +1,229 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from types import CodeType
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+from utils.metrics import SLOW_UPDATES
+
+logger = logging.getLogger(__name__)
+
+class UpdateTrace:
+    """Time one update spent per phase (parse, db, send)"""
+
+    __slots__ = ('handler', 'update', 'phases', 'current')
+
+    def __init__(self, handler: str, update: Any):
+        self.handler = handler
+        self.update = update
+        # Per phase: [seconds, calls]
+        self.phases: Dict[str, List[float]] = {}
+        # Phase being timed; calls nested in it are not counted again
+        self.current: Optional[str] = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+# Trace of the update handled by the current task, None when not tracing
+_current: ContextVar[Optional[UpdateTrace]] = ContextVar('update_trace', default=None)
+
+class SlowUpdateTracer:
+    """Records updates whose handling took longer than `threshold` seconds
+
+    A threshold of 0 disables tracing; handlers then only pay for reading
+    it. Slow updates are logged with their per-phase timings, counted in
+    reminder_bot_slow_updates_total and the latest ones kept in `recent`.
+    """
+
+    def __init__(self, threshold: float = 0.0, keep: int = 20):
+        self.threshold = threshold
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=keep)
+
+    def finish(self, trace: UpdateTrace, seconds: float) -> None:
+        if seconds < self.threshold:
+            return
+        user = getattr(trace.update, 'effective_user', None)
+        phases = {
+            phase: {'ms': spent * 1000, 'calls': calls}
+            for phase, (spent, calls) in trace.phases.items()
+        }
+        record = {
+            'handler': trace.handler,
+            'user_id': user.id if user is not None else None,
+            'total_ms': seconds * 1000,
+            'phases': phases,
+            'other_ms': (seconds - sum(spent for spent, _ in trace.phases.values())) * 1000,
+        }
+        self.recent.append(record)
+        SLOW_UPDATES.inc(trace.handler)
+        logger.warning(
+            "Slow update in %s for user %s: %.0f ms (%s; other %.1f ms)",
+            trace.handler, record['user_id'], record['total_ms'],
+            ', '.join(f"{phase} {entry['ms']:.1f} ms in {entry['calls']}" for phase, entry in phases.items()) or 'no phases',
+            record['other_ms']
+        )
+
+TRACER = SlowUpdateTracer()
+
+def _traced_update(handler: str, func):
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not TRACER.threshold or _current.get() is not None:
+            return await func(*args, **kwargs)
+        # Handler methods are called as (self, update, context)
+        trace = UpdateTrace(handler, args[1] if len(args) > 1 else None)
+        token = _current.set(trace)
+        started = perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+            TRACER.finish(trace, perf_counter() - started)
+    return wrapper
+
+def trace_updates(cls):
+    """Class decorator tracing the updates handled by every public coroutine method"""
+    for name, attribute in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.iscoroutinefunction(attribute):
+            setattr(cls, name, _traced_update(name, attribute))
+    return cls
+
+def phase(name: str):
+    """Decorator adding a function's or coroutine's duration to the current trace
+
+    Costs a context variable lookup when no update is being traced.
+    """
+    perf_counter = time.perf_counter
+
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                trace = _current.get()
+                if trace is None or trace.current is not None:
+                    return await func(*args, **kwargs)
+                trace.current = name
+                started = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    trace.current = None
+                    trace.add(name, perf_counter() - started)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                trace = _current.get()
+                if trace is None or trace.current is not None:
+                    return func(*args, **kwargs)
+                trace.current = name
+                started = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    trace.current = None
+                    trace.add(name, perf_counter() - started)
+        return wrapper
+    return decorate
+
+def trace_phase(name: str, skip: Iterable[str] = ()):
+    """Class decorator counting every public coroutine method towards phase `name`"""
+    skip = frozenset(skip)
+    def decorate(cls):
+        for attribute_name, attribute in list(vars(cls).items()):
+            if attribute_name.startswith('_') or attribute_name in skip:
+                continue
+            if inspect.iscoroutinefunction(attribute):
+                setattr(cls, attribute_name, phase(name)(attribute))
+        return cls
+    return decorate
+
+# (stack from the outermost frame, samples)
+Stacks = Dict[Tuple[CodeType, ...], int]
+
+class SamplingProfiler:
+    """On-demand sampling profiler of the event loop thread
+
+    While a session runs, a helper thread reads the loop thread's stack
+    every `interval` seconds and counts identical stacks; the result is
+    written in the collapsed-stack format read by flamegraph.pl and
+    speedscope. Nothing runs between sessions. Time the loop waits on
+    SQLite threads or the network shows up under its selector.
+    """
+
+    def __init__(self, directory: str, interval: float = 0.01):
+        self.directory = directory
+        self.interval = interval
+        self.sessions = 0
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def run(self, seconds: float) -> Tuple[str, int]:
+        """Sample the calling loop's thread for `seconds`; returns the file written and the sample count"""
+        if self._running:
+            raise RuntimeError("A profiling session is already running")
+        self._running = True
+        try:
+            target = threading.get_ident()
+            stacks = await asyncio.to_thread(self._sample, target, seconds)
+            path = await asyncio.to_thread(self._write, stacks)
+        finally:
+            self._running = False
+        self.sessions += 1
+        samples = sum(stacks.values())
+        logger.info("Profiled %d samples in %.0f s to %s", samples, seconds, path)
+        return path, samples
+
+    def _sample(self, target: int, seconds: float) -> Stacks:
+        stacks: Stacks = {}
+        current_frames = sys._current_frames
+        sleep = time.sleep
+        interval = self.interval
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = current_frames().get(target)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            key = tuple(codes)
+            stacks[key] = stacks.get(key, 0) + 1
+            sleep(interval)
+        return stacks
+
+    def _write(self, stacks: Stacks) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.folded"
+        )
+        labels: Dict[CodeType, str] = {}
+        with open(path, 'w', encoding='utf-8') as f:
+            for codes, count in sorted(stacks.items(), key=lambda item: -item[1]):
+                names = []
+                for code in codes:
+                    label = labels.get(code)
+                    if label is None:
+                        # ';' separates frames in the format
+                        label = labels[code] = (
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        ).replace(';', ':')
+                    names.append(label)
+                f.write(f"{';'.join(names)} {count}\n")
+        return path
\ No newline at end of file
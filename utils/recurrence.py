@@ -0,0 +1,168 @@
+from calendar import monthrange
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+import re
+import pytz
+from utils.profiling import phase
+from utils.time_parser import DEFAULT_TIMEZONE, SPECIFIC_TIME_PATTERN, get_timezone
+
+# Ukrainian weekday abbreviations mapped to cron day-of-week numbers
+WEEKDAYS = {'нд': 0, 'пн': 1, 'вт': 2, 'ср': 3, 'чт': 4, 'пт': 5, 'сб': 6}
+
+DAILY_PATTERN = re.compile(r'\s*(?:щодня|щоденно|кожен день|кожного дня)\s+(.+)', re.IGNORECASE)
+WEEKDAYS_PATTERN = re.compile(r'\s*(?:по буднях|щобудня|у будні|в будні)\s+(.+)', re.IGNORECASE)
+WEEKLY_PATTERN = re.compile(r'\s*(?:щотижня|кожного тижня)\s+(нд|пн|вт|ср|чт|пт|сб)\s+(.+)', re.IGNORECASE)
+MONTHLY_PATTERN = re.compile(r'\s*(?:щомісяця|кожного місяця)\s+(\d{1,2})\s+(.+)', re.IGNORECASE)
+
+# Occurrences searched before a rule is considered unsatisfiable
+MAX_SEARCH_DAYS = 5 * 366
+# Longest cron expression accepted; it is shown in /list next to the reminder
+MAX_RULE_LENGTH = 100
+
+class CronRule:
+    """Five-field cron rule (minute hour day-of-month month day-of-week)"""
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError("Cron rule needs five fields")
+        fields = [self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)]
+        self.expression = ' '.join(parts)
+        self.minutes: Tuple[int, ...] = tuple(sorted(fields[0]))
+        self.hours: Tuple[int, ...] = tuple(sorted(fields[1]))
+        self.days: FrozenSet[int] = frozenset(fields[2])
+        self.months: FrozenSet[int] = frozenset(fields[3])
+        # Cron allows 7 for Sunday; Python counts weekdays from Monday
+        self.weekdays: FrozenSet[int] = frozenset((day - 1) % 7 for day in fields[4])
+        # Standard cron: when both day fields are restricted either may match
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+        values = set()
+        for item in field.split(','):
+            body, _, step = item.partition('/')
+            try:
+                if body == '*':
+                    start, end = low, high
+                elif '-' in body:
+                    start, end = map(int, body.split('-', 1))
+                else:
+                    start = end = int(body)
+                step = int(step) if step else 1
+            except ValueError:
+                raise ValueError(f"Invalid cron field: {item}")
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"Cron field out of range: {item}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day = dt.day in self.days
+        weekday = dt.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after a naive local datetime"""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=MAX_SEARCH_DAYS)
+        while dt < limit:
+            if dt.month not in self.months:
+                days_left = monthrange(dt.year, dt.month)[1] - dt.day + 1
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=days_left)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            else:
+                hour = next((h for h in self.hours if h >= dt.hour), None)
+                if hour is None:
+                    dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                    continue
+                if hour != dt.hour:
+                    dt = dt.replace(hour=hour, minute=0)
+                minute = next((m for m in self.minutes if m >= dt.minute), None)
+                if minute is not None:
+                    return dt.replace(minute=minute)
+                if hour == 23:
+                    dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                else:
+                    dt = dt.replace(hour=hour + 1, minute=0)
+        raise ValueError(f"Cron rule never fires: {self.expression}")
+
+@lru_cache(maxsize=1024)
+def parse_rule(expression: str) -> CronRule:
+    """Parsed rule, shared by every reminder using the same expression"""
+    return CronRule(expression)
+
+@lru_cache(maxsize=4096)
+def _next_occurrence(expression: str, timezone: str, after_minute: datetime) -> datetime:
+    tz = get_timezone(timezone)
+    rule = parse_rule(expression)
+    local = tz.fromutc(after_minute.replace(tzinfo=tz)).replace(tzinfo=None)
+    while True:
+        local = rule.next_after(local)
+        # Local times skipped or repeated by DST changes resolve to standard time
+        fire_at = tz.normalize(tz.localize(local, is_dst=False)).astimezone(pytz.utc).replace(tzinfo=None)
+        if fire_at > after_minute:
+            return fire_at
+
+@phase('parse')
+def next_occurrence(expression: str, timezone: Optional[str], after: datetime) -> datetime:
+    """Next fire time (naive UTC) of a rule evaluated in `timezone`, strictly after `after`
+
+    Rules have minute resolution, so results are cached per minute: many
+    reminders sharing a rule and a fire time cost one computation.
+    """
+    after_minute = after.replace(second=0, microsecond=0)
+    return _next_occurrence(expression, timezone or DEFAULT_TIMEZONE, after_minute)
+
+@phase('parse')
+def parse_recurrence(text: str) -> str:
+    """Turn user input such as "щодня 9:00" or a cron rule into a cron expression"""
+    text = text.strip()
+    for pattern, build in (
+        (DAILY_PATTERN, lambda m, h, mi: f'{mi} {h} * * *'),
+        (WEEKDAYS_PATTERN, lambda m, h, mi: f'{mi} {h} * * 1-5'),
+        (WEEKLY_PATTERN, lambda m, h, mi: f'{mi} {h} * * {WEEKDAYS[m.group(1).lower()]}'),
+        (MONTHLY_PATTERN, lambda m, h, mi: f'{mi} {h} {int(m.group(1))} * *'),
+    ):
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        time_match = SPECIFIC_TIME_PATTERN.fullmatch(match.group(match.lastindex))
+        if time_match is None:
+            raise ValueError("Invalid time format")
+        expression = build(match, int(time_match.group(1)), int(time_match.group(2)))
+        break
+    else:
+        expression = text
+    if len(expression) > MAX_RULE_LENGTH:
+        raise ValueError("Cron rule is too long")
+    # Validates the fields and that the rule fires at all
+    parse_rule(expression).next_after(datetime(2000, 1, 1))
+    return parse_rule(expression).expression
+
+def describe_rule(expression: str) -> str:
+    """Short human readable form of rules produced by parse_recurrence"""
+    parts = expression.split()
+    if len(parts) != 5 or not (parts[0].isdigit() and parts[1].isdigit()):
+        return expression
+    at = f'{int(parts[1]):02d}:{int(parts[0]):02d}'
+    day, month, weekday = parts[2:]
+    if month != '*':
+        return expression
+    if day == '*' and weekday == '*':
+        return f'щодня о {at}'
+    if day == '*' and weekday == '1-5':
+        return f'по буднях о {at}'
+    if day == '*' and weekday.isdigit():
+        names = {number: name for name, number in WEEKDAYS.items()}
+        return f'щотижня ({names[int(weekday) % 7]}) о {at}'
+    if day.isdigit() and weekday == '*':
+        return f'щомісяця {day}-го о {at}'
+    return expression
\ No newline at end of file
@@ -1,75 +1,216 @@
-from datetime import datetime, timedelta
+from bisect import bisect_right
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
 import re
 import pytz
-from config import DEFAULT_TIMEZONE
+from config import Config
+from utils.profiling import phase
 
-def parse_specific_time(time_str: str) -> datetime:
-    """
-    Parse specific time string (HH:MM) and return datetime object
-    """
+DEFAULT_TIMEZONE = Config.DEFAULT_TIMEZONE
+
+# Ukrainian unit spellings accepted in delays, mapped to their length in seconds
+UNIT_SECONDS: Dict[str, int] = {
+    **dict.fromkeys(('т', 'тиж', 'тижд', 'тиждень', 'тижні', 'тижня', 'тижнів'), 7 * 24 * 3600),
+    **dict.fromkeys(('д', 'дн', 'день', 'дні', 'дня', 'днів', 'доба', 'добу', 'доби'), 24 * 3600),
+    **dict.fromkeys(('г', 'год', 'година', 'годину', 'години', 'годин'), 3600),
+    **dict.fromkeys(('хв', 'хвилина', 'хвилину', 'хвилини', 'хвилин', 'м', 'мін'), 60),
+    **dict.fromkeys(('с', 'сек', 'секунда', 'секунду', 'секунди', 'секунд'), 1),
+}
+
+# Longest delay accepted, so the sum stays far from datetime's range
+MAX_DELAY_SECONDS = 10 * 366 * 24 * 3600
+
+# One pass over the input: longest spellings first, a unit may not run into a letter
+DELAY_PATTERN = re.compile(
+    r'(\d+)\s*(' + '|'.join(sorted(map(re.escape, UNIT_SECONDS), key=len, reverse=True)) + r')(?![^\W\d_])',
+    re.IGNORECASE
+)
+SPECIFIC_TIME_PATTERN = re.compile(r'\s*(\d{1,2})[:.](\d{2})\s*')
+# Date and time either way round: "ДД.ММ.РРРР ГГ:ХХ" (as shown to users) or "ГГ:ХХ ДД.ММ.РРРР"
+DATE_TIME_PATTERN = re.compile(
+    r'\s*(?:(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4})\s+(?P<hour>\d{1,2}):(?P<minute>\d{2})'
+    r'|(?P<hour2>\d{1,2}):(?P<minute2>\d{2})\s+(?P<day2>\d{1,2})\.(?P<month2>\d{1,2})\.(?P<year2>\d{4}))\s*'
+)
+
+# One-tap snooze choices offered under a delivered reminder
+SNOOZE_PRESETS: Dict[str, timedelta] = {
+    '10m': timedelta(minutes=10),
+    '1h': timedelta(hours=1),
+    'tomorrow': timedelta(days=1),
+}
+
+# Zones resolved per process; users share a handful of them in practice
+TIMEZONE_CACHE_SIZE = 256
+
+@lru_cache(maxsize=TIMEZONE_CACHE_SIZE)
+def get_timezone(name: str = DEFAULT_TIMEZONE) -> tzinfo:
+    """Resolve a timezone name, falling back to the default for unknown ones"""
     try:
-        # Get current date
-        tz = pytz.timezone(DEFAULT_TIMEZONE)
-        current_time = datetime.now(tz)
-        
-        # Parse hours and minutes
-        hours, minutes = map(int, time_str.split(':'))
-        
-        # Create new datetime object
-        reminder_time = current_time.replace(
-            hour=hours,
-            minute=minutes,
-            second=0,
-            microsecond=0
-        )
-        
+        return pytz.timezone(name or DEFAULT_TIMEZONE)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(DEFAULT_TIMEZONE)
+
+@lru_cache(maxsize=1)
+def _zone_names() -> Dict[str, str]:
+    return {name.lower(): name for name in pytz.all_timezones}
+
+@phase('parse')
+def normalize_timezone(name: str) -> Optional[str]:
+    """Canonical IANA name for user input such as "europe/warsaw", or None"""
+    return _zone_names().get(name.strip().lower())
+
+class TimeParser:
+    """Parses user time input and formats reminder times for one timezone"""
+
+    def __init__(self, timezone: str = DEFAULT_TIMEZONE):
+        self.tz = get_timezone(timezone)
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def parse_specific(self, time_str: str, now: Optional[datetime] = None) -> datetime:
+        """Next occurrence of HH:MM, today or tomorrow"""
+        match = SPECIFIC_TIME_PATTERN.fullmatch(time_str or '')
+        if match is None:
+            raise ValueError("Invalid time format")
+        current_time = now or self.now()
+        try:
+            reminder_time = current_time.replace(
+                hour=int(match.group(1)),
+                minute=int(match.group(2)),
+                second=0,
+                microsecond=0
+            )
+        except ValueError:
+            raise ValueError("Invalid time format")
         # If the time is already passed today, set it for tomorrow
         if reminder_time <= current_time:
             reminder_time += timedelta(days=1)
-            
         return reminder_time
-    except (ValueError, TypeError):
-        raise ValueError("Invalid time format")
 
-def parse_delay_time(delay_str: str) -> datetime:
+    def parse_date(self, time_str: str) -> datetime:
+        """Absolute local date and time, or ISO 8601 (an offset in it wins over the timezone)"""
+        match = DATE_TIME_PATTERN.fullmatch(time_str or '')
+        try:
+            if match is None:
+                moment = datetime.fromisoformat((time_str or '').strip())
+                if moment.tzinfo is not None:
+                    return moment
+                return self.tz.localize(moment)
+            parts = [int(value) for value in match.groups() if value is not None]
+            if match.group('day') is not None:
+                day, month, year, hour, minute = parts
+            else:
+                hour, minute, day, month, year = parts
+            return self.tz.localize(datetime(year, month, day, hour, minute))
+        except ValueError:
+            raise ValueError("Invalid date format")
+
+    def parse_any(self, time_str: str, now: Optional[datetime] = None) -> datetime:
+        """A date and time, a time of day or a delay, tried in that order"""
+        try:
+            return self.parse_date(time_str)
+        except ValueError:
+            pass
+        try:
+            return self.parse_specific(time_str, now)
+        except ValueError:
+            return self.parse_delay(time_str, now)
+
+    def parse_delay_seconds(self, delay_str: str) -> int:
+        """Total delay in seconds, e.g. "1г 30хв" or "2 дні 3 години\""""
+        seconds = sum(
+            int(amount) * UNIT_SECONDS[unit.lower()]
+            for amount, unit in DELAY_PATTERN.findall(delay_str or '')
+        )
+        if not 0 < seconds <= MAX_DELAY_SECONDS:
+            raise ValueError("Invalid delay format")
+        return seconds
+
+    def parse_delay(self, delay_str: str, now: Optional[datetime] = None) -> datetime:
+        return (now or self.now()) + timedelta(seconds=self.parse_delay_seconds(delay_str))
+
+    def shift(self, delta: timedelta, now: Optional[datetime] = None) -> datetime:
+        """`delta` from now; whole days keep the local wall-clock time across DST changes"""
+        current_time = now or self.now()
+        if delta.days and not delta.seconds and not delta.microseconds:
+            return self.tz.localize(current_time.replace(tzinfo=None) + delta)
+        return current_time + delta
+
+    def localize(self, dt: datetime) -> datetime:
+        """Naive datetimes are stored in UTC; show them in this timezone"""
+        if dt.tzinfo is None:
+            return self.tz.fromutc(dt.replace(tzinfo=self.tz))
+        return dt.astimezone(self.tz)
+
+    @staticmethod
+    def _format_local(dt: datetime) -> str:
+        return f"{dt.day:02d}.{dt.month:02d}.{dt.year} {dt.hour:02d}:{dt.minute:02d}"
+
+    def format(self, dt: datetime) -> str:
+        return self._format_local(self.localize(dt))
+
+    def format_many(self, datetimes: Iterable[datetime]) -> List[str]:
+        """Format a batch of reminder times, e.g. for /list
+
+        The UTC offset is looked up in pytz's transition table only when a
+        row leaves the interval of the previous one; time-ordered lists
+        mostly share a single offset.
+        """
+        transitions = getattr(self.tz, '_utc_transition_times', None)
+        if not transitions:
+            return [self.format(dt) for dt in datetimes]
+
+        result = []
+        start = end = offset = None
+        for dt in datetimes:
+            if dt.tzinfo is None:
+                if start is None or not start <= dt < end:
+                    index = bisect_right(transitions, dt)
+                    start = transitions[index - 1] if index else datetime.min
+                    end = transitions[index] if index < len(transitions) else datetime.max
+                    offset = self.tz._transition_info[max(0, index - 1)][0]
+                dt = dt + offset
+            else:
+                dt = dt.astimezone(self.tz)
+            result.append(self._format_local(dt))
+        return result
+
+@lru_cache(maxsize=TIMEZONE_CACHE_SIZE)
+def get_parser(timezone: str = DEFAULT_TIMEZONE) -> TimeParser:
+    """Shared parser for a timezone"""
+    return TimeParser(timezone)
+
+@phase('parse')
+def parse_specific_time(time_str: str, timezone: str = DEFAULT_TIMEZONE) -> datetime:
+    """
+    Parse specific time string (HH:MM) in the user's timezone and return datetime object
+    """
+    return get_parser(timezone).parse_specific(time_str)
+
+@phase('parse')
+def parse_delay_time(delay_str: str, timezone: str = DEFAULT_TIMEZONE) -> datetime:
     """
     Parse delay time string (e.g., "1г 30хв" or "2 години") and return datetime object
     """
-    try:
-        tz = pytz.timezone(DEFAULT_TIMEZONE)
-        current_time = datetime.now(tz)
-        
-        # Convert Ukrainian time units to hours and minutes
-        hours = 0
-        minutes = 0
-        
-        # Pattern for hours
-        hours_pattern = r'(\d+)\s*(?:г|год|година|години|годин)'
-        hours_match = re.search(hours_pattern, delay_str, re.IGNORECASE)
-        if hours_match:
-            hours = int(hours_match.group(1))
-            
-        # Pattern for minutes
-        minutes_pattern = r'(\d+)\s*(?:хв|хвилина|хвилини|хвилин)'
-        minutes_match = re.search(minutes_pattern, delay_str, re.IGNORECASE)
-        if minutes_match:
-            minutes = int(minutes_match.group(1))
-            
-        if hours == 0 and minutes == 0:
-            raise ValueError("No valid time units found")
-            
-        # Calculate reminder time
-        reminder_time = current_time + timedelta(hours=hours, minutes=minutes)
-        return reminder_time
-        
-    except (ValueError, TypeError):
-        raise ValueError("Invalid delay format")
+    return get_parser(timezone).parse_delay(delay_str)
+
+@phase('parse')
+def snooze_time(preset: str, timezone: str = DEFAULT_TIMEZONE) -> datetime:
+    """
+    Time a snooze preset (see SNOOZE_PRESETS) points to in the user's timezone
+    """
+    return get_parser(timezone).shift(SNOOZE_PRESETS[preset])
+
+def format_reminder_time(dt: datetime, timezone: str = DEFAULT_TIMEZONE) -> str:
+    """
+    Format datetime object to readable string in the user's timezone
+    """
+    return get_parser(timezone).format(dt)
 
-def format_reminder_time(dt: datetime) -> str:
+def format_many(datetimes: Iterable[datetime], timezone: str = DEFAULT_TIMEZONE) -> List[str]:
     """
-    Format datetime object to readable string
+    Format many datetime objects at once
     """
-    tz = pytz.timezone(DEFAULT_TIMEZONE)
-    if dt.tzinfo is None:
-        dt = pytz.utc.localize(dt).astimezone(tz)
-    return dt.strftime("%d.%m.%Y %H:%M")
\ No newline at end of file
+    return get_parser(timezone).format_many(datetimes)
\ No newline at end of file